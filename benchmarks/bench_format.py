@@ -0,0 +1,43 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Progress-tick formatting: sizes, durations and the progress template."""
+
+from time import time
+
+import pytest
+
+from helpers.files import get_readable_file_size, get_readable_time
+from helpers.progress import render_progress, render_template
+from helpers.utils import PROGRESS_BAR
+
+SIZES = [0, 512, 1536, 10 * 1024 ** 2 + 1, 3 * 1024 ** 3, 2 * 1024 ** 4]
+DURATIONS = [0, 7, 65, 3_725, 200_000]
+CUSTOM_TEMPLATE = "{bar} {percentage:.0f}% | {current}/{total} @ {speed}/s | ETA {eta} {unknown}"
+
+
+@pytest.mark.benchmark(group="formatting")
+def test_get_readable_file_size(benchmark):
+    benchmark(lambda: [get_readable_file_size(size) for size in SIZES])
+
+
+@pytest.mark.benchmark(group="formatting")
+def test_get_readable_time(benchmark):
+    benchmark(lambda: [get_readable_time(seconds) for seconds in DURATIONS])
+
+
+@pytest.mark.benchmark(group="progress")
+@pytest.mark.parametrize("template", [PROGRESS_BAR, CUSTOM_TEMPLATE], ids=["default", "custom"])
+def test_render_progress(benchmark, template):
+    started = time() - 42
+    benchmark(render_progress, 734 * 1024 ** 2, 2 * 1024 ** 3, "📥 Downloading", started, template)
+
+
+@pytest.mark.benchmark(group="progress")
+def test_render_template(benchmark):
+    values = {
+        "bar": "█" * 7 + "░" * 13, "percentage": 35.8, "current": "734.00 MiB",
+        "total": "2.00 GiB", "speed": "17.48 MiB", "elapsed": "42s", "eta": "1m19s",
+        "status_emoji": "⏳", "status_message": "In progress...",
+    }
+    benchmark(render_template, PROGRESS_BAR, values)
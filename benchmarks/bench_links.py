@@ -0,0 +1,78 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Post link parsing: the pure-Python ``parse_post_link`` against rewrites.
+
+``regex_post_link`` is a precompiled-regex candidate kept here so a rewrite
+has to win on these numbers, and agree on every link shape, before it
+replaces the split-based parser.
+"""
+
+import re
+
+import pytest
+from pyrogram.utils import get_channel_id
+
+from helpers.msg import getChatMsgID, parse_post_link
+
+LINKS = {
+    "public": "https://t.me/itsSmartDev/547",
+    "public_thread": "https://t.me/itsSmartDev/12/547",
+    "private": "https://t.me/c/1234567890/547",
+    "private_thread": "https://t.me/c/1234567890/12/547",
+    "business": "https://t.me/b/itsSmartDev/547",
+    "no_scheme": "t.me/itsSmartDev/547",
+    "trailing_slash": "https://t.me/itsSmartDev/547/",
+    "not_numeric": "https://t.me/itsSmartDev/latest",
+    "plain_text": "hello there",
+}
+
+# Shapes getChatMsgID accepts: two leading segments and the host, then
+# c/<channel>[/<thread>]/<id> or <username>[/<thread>]/<id>
+POST_LINK = re.compile(r"[^/]*/[^/]*/[^/]*/(?:c/([0-9]+)|([^/]+))/(?:[0-9]+/)?([1-9][0-9]*)")
+
+
+def regex_post_link(link: str):
+    if "t.me/b/" in link:
+        parts = [p for p in link.split("/") if p]
+        if len(parts) >= 5 and parts[2] == "b":
+            return parts[3], int(parts[4])
+        raise ValueError("Invalid business link format")
+    match = POST_LINK.fullmatch(link)
+    if match is None or match[2] == "m":
+        # Same errors as the current parser for everything else
+        return getChatMsgID(link)
+    channel, username, message_id = match.groups()
+    return (get_channel_id(int(channel)) if channel else username), int(message_id)
+
+
+PARSERS = {"split": parse_post_link, "regex": regex_post_link}
+
+
+def parse_quietly(parser, link):
+    try:
+        return parser(link)
+    except ValueError as e:
+        return e
+
+
+@pytest.mark.parametrize("shape", LINKS)
+def test_parsers_agree(shape):
+    link = LINKS[shape]
+    results = {repr(parse_quietly(parser, link)) for parser in PARSERS.values()}
+    assert len(results) == 1, results
+
+
+@pytest.mark.benchmark(group="post links")
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("shape", LINKS)
+def test_post_link(benchmark, parser, shape):
+    benchmark(parse_quietly, PARSERS[parser], LINKS[shape])
+
+
+@pytest.mark.benchmark(group="post links")
+@pytest.mark.parametrize("parser", PARSERS)
+def test_post_link_mixed(benchmark, parser):
+    links = list(LINKS.values()) * 20
+    parse = PARSERS[parser]
+    benchmark(lambda: [parse_quietly(parse, link) for link in links])
@@ -0,0 +1,93 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Per-message helpers: caption unparsing and file naming."""
+
+import random
+
+import pytest
+from pyrogram import enums, types
+from pyrogram.parser import Parser
+
+from helpers.msg import get_file_name, get_parsed_msg
+
+SIMPLE_ENTITIES = (
+    enums.MessageEntityType.BOLD,
+    enums.MessageEntityType.ITALIC,
+    enums.MessageEntityType.UNDERLINE,
+    enums.MessageEntityType.STRIKETHROUGH,
+    enums.MessageEntityType.SPOILER,
+    enums.MessageEntityType.CODE,
+)
+WORDS = ("Episode", "1080p", "HEVC", "subtitles", "🔥", "download", "mirror", "русский",
+         "日本語", "changelog", "👉", "channel", "archive", "part", "✅")
+
+
+def utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def caption(words: int, entity_every: int, seed: int = 1):
+    """Caption text with an entity on every ``entity_every``-th word, UTF-16 offsets."""
+    rng = random.Random(seed)
+    pieces, entities, offset = [], [], 0
+    for index in range(words):
+        word = rng.choice(WORDS)
+        if index % entity_every == 0:
+            kind = rng.choice(SIMPLE_ENTITIES + (enums.MessageEntityType.TEXT_LINK,))
+            url = "https://t.me/itsSmartDev" if kind == enums.MessageEntityType.TEXT_LINK else None
+            entities.append(types.MessageEntity(type=kind, offset=offset, length=utf16_len(word), url=url))
+        pieces.append(word)
+        offset += utf16_len(word) + 1
+    return " ".join(pieces), entities
+
+
+CAPTIONS = {
+    "plain": ("Just a short caption without formatting", []),
+    "short": caption(20, 4),
+    "long_dense": caption(180, 2),
+    "max_length": caption(400, 3),
+}
+
+
+def media_messages():
+    """One message per kind get_file_name distinguishes."""
+    common = dict(file_id="x", file_unique_id="y")
+    kinds = {
+        "document": dict(document=types.Document(file_name="archive.zip", **common)),
+        "document_unnamed": dict(document=types.Document(**common)),
+        "video": dict(video=types.Video(width=1, height=1, duration=1, file_name="clip.mp4", **common)),
+        "audio": dict(audio=types.Audio(duration=1, file_name="song.mp3", **common)),
+        "voice": dict(voice=types.Voice(duration=1, **common)),
+        "video_note": dict(video_note=types.VideoNote(length=1, duration=1, **common)),
+        "animation": dict(animation=types.Animation(width=1, height=1, duration=1, **common)),
+        "sticker_animated": dict(sticker=types.Sticker(width=1, height=1, is_animated=True, is_video=False, **common)),
+        "sticker_video": dict(sticker=types.Sticker(width=1, height=1, is_animated=False, is_video=True, **common)),
+        "sticker_static": dict(sticker=types.Sticker(width=1, height=1, is_animated=False, is_video=False, **common)),
+        "photo": dict(photo=types.Photo(width=1, height=1, file_size=1, date=None, **common)),
+        "text": dict(text="hello"),
+    }
+    return {name: types.Message(id=547, **fields) for name, fields in kinds.items()}
+
+
+MESSAGES = media_messages()
+
+
+@pytest.mark.benchmark(group="captions")
+@pytest.mark.parametrize("name", CAPTIONS)
+def test_parser_unparse(benchmark, name):
+    text, entities = CAPTIONS[name]
+    benchmark(Parser.unparse, text, entities, False)
+
+
+@pytest.mark.benchmark(group="captions")
+@pytest.mark.parametrize("name", CAPTIONS)
+def test_get_parsed_msg(benchmark, loop, name):
+    text, entities = CAPTIONS[name]
+    benchmark(lambda: loop.run_until_complete(get_parsed_msg(text, entities)))
+
+
+@pytest.mark.benchmark(group="file names")
+@pytest.mark.parametrize("kind", MESSAGES)
+def test_get_file_name(benchmark, kind):
+    benchmark(get_file_name, 547, MESSAGES[kind])
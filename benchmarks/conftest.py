@@ -0,0 +1,72 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Shared setup for the ``bench_*.py`` microbenchmarks.
+
+Run them with ``python -m pytest benchmarks/bench_*.py``. With the
+pytest-benchmark plugin installed its ``benchmark`` fixture is used as is;
+without it a small timeit-based stand-in reports the best time per call.
+"""
+
+import os
+import sys
+import asyncio
+import timeit
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("FILE_ID_CACHE", "")
+os.environ.setdefault("PEER_CACHE", "")
+os.environ.setdefault("JOB_JOURNAL", "")
+# Importing the bot's modules creates folders and logs.txt in the working directory
+os.chdir(tempfile.mkdtemp(prefix="rcdl-microbench-"))
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAVE_PLUGIN = True
+except ImportError:
+    HAVE_PLUGIN = False
+
+_results = []
+
+
+class _Benchmark:
+    """The subset of pytest-benchmark's fixture the suite uses."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, func, *args, **kwargs):
+        timer = timeit.Timer(lambda: func(*args, **kwargs))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(5, number)) / number
+        _results.append((self.name, best))
+        return func(*args, **kwargs)
+
+
+if not HAVE_PLUGIN:
+    @pytest.fixture
+    def benchmark(request):
+        return _Benchmark(request.node.nodeid.split("::", 1)[-1])
+
+    def pytest_configure(config):
+        config.addinivalue_line("markers", "benchmark(group): pytest-benchmark grouping")
+
+    def pytest_terminal_summary(terminalreporter):
+        if not _results:
+            return
+        terminalreporter.section("microbenchmarks (best of 5, per call)")
+        width = max(len(name) for name, _ in _results)
+        for name, best in _results:
+            terminalreporter.write_line(f"{name:<{width}}  {best * 1e6:10.3f} us")
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
@@ -0,0 +1,297 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Offline end-to-end throughput benchmark.
+
+Drives the real ``main.py`` handlers against ``FakeClient`` stand-ins for the
+bot and user sessions, so changes to the download pipeline can be measured
+without live accounts:
+
+    python -m benchmarks.e2e --output results.json
+    python -m benchmarks.e2e --baseline results.json --max-regression 0.1
+
+Workloads:
+    single  single posts sent as links by several users at once
+    album   album links, each handled as one job
+    range   one /dlrange over a long mixed range of posts
+
+Each workload reports posts and bytes per second, p50/p95 job latency (from
+the job traces), FloodWaits and peak RSS as JSON.
+"""
+
+import os
+import sys
+import json
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from time import perf_counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_client import FakeClient, FakeTelegram, NetworkProfile, Requests  # noqa: E402
+
+# Settings the benchmark needs regardless of config.env
+BENCH_ENV = {
+    "BOT_TOKEN": "123456:benchmark",
+    "SESSION_STRING": "benchmark",
+    "METRICS_PORT": "0",
+    "JANITOR_INTERVAL": "0",
+    "TRACE_EXPORT": "",
+    # Every job of the largest workload must stay in the trace buffer
+    "TRACE_BUFFER": "100000",
+}
+
+WORKLOADS = ("single", "album", "range")
+# Compared against a baseline; higher is better unless listed in LOWER_IS_BETTER
+COMPARED = ("posts_per_sec", "download_bytes_per_sec", "p50_latency", "p95_latency", "peak_rss_mb")
+LOWER_IS_BETTER = {"p50_latency", "p95_latency", "peak_rss_mb"}
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+async def sample_rss(peak: list, interval: float = 0.05):
+    process = psutil.Process()
+    while True:
+        peak[0] = max(peak[0], process.memory_info().rss)
+        await asyncio.sleep(interval)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class Bench:
+    """One fake Telegram plus the bot module wired to it."""
+
+    def __init__(self, main, args):
+        self.main = main
+        self.args = args
+        profile = NetworkProfile(
+            latency=args.latency,
+            download_bps=args.download_mbps * 1024 * 1024,
+            upload_bps=args.upload_mbps * 1024 * 1024,
+            flood_rate=args.flood_rate,
+            flood_seconds=args.flood_seconds,
+            transmissions=main.PyroConf.MAX_CONCURRENT_TRANSMISSIONS,
+            seed=args.seed,
+        )
+        self.server = FakeTelegram(profile)
+        self.user = FakeClient(self.server, "user", 1)
+        self.bot = FakeClient(self.server, "bot", 2, is_bot=True)
+        main.RateLimiter().install(self.user)
+        main.RateLimiter().install(self.bot)
+        # The handlers reach the user session through the module global
+        main.user = self.user
+        self.requests = Requests(self.bot, users=args.users)
+
+    def link(self, message_id: int) -> str:
+        return f"https://t.me/{self.server.chat.username}/{message_id}"
+
+    async def single(self):
+        posts = [self.server.random_post(self.user, self.args.size_scale) for _ in range(self.args.posts)]
+        await asyncio.gather(*(
+            self.main.schedule_download(self.bot, self.requests.command(self.link(post.id), i), self.link(post.id))
+            for i, post in enumerate(posts)
+        ))
+        return len(posts)
+
+    async def album(self):
+        albums = [
+            self.server.add_album(self.user, self.args.album_size, self.args.size_scale)
+            for _ in range(self.args.albums)
+        ]
+        await asyncio.gather(*(
+            self.main.schedule_download(self.bot, self.requests.command(self.link(album[0].id), i),
+                                        self.link(album[0].id))
+            for i, album in enumerate(albums)
+        ))
+        return sum(len(album) for album in albums)
+
+    async def range(self):
+        first = self.server.next_id
+        random = self.server.random
+        while self.server.next_id - first < self.args.range_posts:
+            if random.random() < 0.05:
+                self.server.add_album(self.user, random.randint(2, 6), self.args.size_scale)
+            else:
+                self.server.random_post(self.user, self.args.size_scale)
+        last = self.server.next_id - 1
+        command = self.requests.command(f"/dlrange {self.link(first)} {self.link(last)}")
+        await self.main.download_range(self.bot, command)
+        return last - first + 1
+
+    async def run(self, name: str) -> dict:
+        main, counters = self.main, self.server.counters
+        main.tracer.traces.clear()
+        before = dict(vars(counters))
+        peak = [0]
+        sampler = asyncio.create_task(sample_rss(peak))
+        started = perf_counter()
+        try:
+            posts = await getattr(self, name)()
+        finally:
+            elapsed = perf_counter() - started
+            sampler.cancel()
+
+        delta = {key: value - before[key] for key, value in vars(counters).items()}
+        traces = list(main.tracer.traces)
+        latencies = [trace.duration for trace in traces]
+        return {
+            "posts": posts,
+            "jobs": len(traces),
+            "failed_jobs": sum(1 for trace in traces if trace.error),
+            "seconds": round(elapsed, 4),
+            "posts_per_sec": round(posts / elapsed, 3),
+            "download_bytes": delta["downloaded_bytes"],
+            "upload_bytes": delta["uploaded_bytes"],
+            "download_bytes_per_sec": round(delta["downloaded_bytes"] / elapsed),
+            "upload_bytes_per_sec": round(delta["uploaded_bytes"] / elapsed),
+            "p50_latency": round(percentile(latencies, 50), 4),
+            "p95_latency": round(percentile(latencies, 95), 4),
+            "rpcs": delta["rpcs"],
+            "edits": delta["edits"],
+            "flood_waits": delta["flood_waits"],
+            "peak_rss_mb": round(peak[0] / 1024 ** 2, 1),
+        }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Metrics that got worse than ``baseline`` by more than ``max_regression``."""
+    regressions = []
+    for name, current in results["workloads"].items():
+        old = baseline.get("workloads", {}).get(name)
+        if not old:
+            continue
+        for metric in COMPARED:
+            before, after = old.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change > max_regression if metric in LOWER_IS_BETTER else change < -max_regression
+            print(f"{name:>7} {metric:<24} {before:>14} -> {after:<14} {change:+.1%}"
+                  + ("  REGRESSION" if worse else ""), file=sys.stderr)
+            if worse:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+async def run(args) -> dict:
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    import main
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    bench = Bench(main, args)
+    results = {
+        "version": 1,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "settings": {
+            "latency": args.latency,
+            "download_mbps": args.download_mbps,
+            "upload_mbps": args.upload_mbps,
+            "flood_rate": args.flood_rate,
+            "size_scale": args.size_scale,
+            "seed": args.seed,
+            "batch_concurrency": main.PyroConf.BATCH_CONCURRENCY,
+            "max_active_jobs": main.PyroConf.MAX_ACTIVE_JOBS,
+            "max_concurrent_transmissions": main.PyroConf.MAX_CONCURRENT_TRANSMISSIONS,
+            "in_memory_threshold_mb": main.PyroConf.IN_MEMORY_THRESHOLD_MB,
+        },
+        "workloads": {},
+    }
+    for name in args.workloads:
+        results["workloads"][name] = await bench.run(name)
+        print(f"{name}: {json.dumps(results['workloads'][name])}", file=sys.stderr)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workloads", nargs="*", metavar="workload",
+                        help="single, album and/or range (default: all)")
+    parser.add_argument("--posts", type=int, default=50, help="single posts to request")
+    parser.add_argument("--albums", type=int, default=20, help="albums to request")
+    parser.add_argument("--album-size", type=int, default=6, help="items per album")
+    parser.add_argument("--range-posts", type=int, default=1000, help="posts in the /dlrange workload")
+    parser.add_argument("--users", type=int, default=8, help="distinct users sending requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per RPC")
+    parser.add_argument("--download-mbps", type=float, default=50, help="MiB/s per download")
+    parser.add_argument("--upload-mbps", type=float, default=20, help="MiB/s per upload")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="chance of a FloodWait per RPC")
+    parser.add_argument("--flood-seconds", type=int, default=1, help="FloodWait length")
+    parser.add_argument("--size-scale", type=float, default=1.0, help="multiplier on media sizes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="allowed relative slowdown before exiting with status 1")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's INFO logs")
+    args = parser.parse_args(argv)
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+    args.workloads = args.workloads or list(WORKLOADS)
+    # Resolved before the benchmark moves into its scratch directory
+    for name in ("output", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="rcdl-bench-")
+    # downloads/, the journal, caches and logs.txt all land in the scratch dir
+    os.chdir(workdir)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Scratch directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if compare(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""In-process stand-in for the two Pyrogram clients.
+
+``FakeTelegram`` holds a synthetic source channel built from real Pyrogram
+``Message``/``Video``/``Document``/... objects, and ``FakeClient`` answers
+the client methods the bot calls with simulated latency, bandwidth and
+FloodWait errors. Nothing touches the network.
+"""
+
+import io
+import os
+import math
+import random
+import asyncio
+from datetime import datetime
+from dataclasses import dataclass, field
+
+from PIL import Image
+from pyrogram import enums, raw, types
+from pyrogram.errors import FloodWait
+
+# Pyrogram transfers files in 1 MiB download and 512 KiB upload parts
+DOWNLOAD_PART = 1024 * 1024
+UPLOAD_PART = 512 * 1024
+
+# kind -> (weight in the default mix, min size, max size) in bytes
+MEDIA_MIX = {
+    "text": (15, 0, 0),
+    "photo": (35, 50 * 1024, 1024 * 1024),
+    "document": (20, 100 * 1024, 8 * 1024 * 1024),
+    "video": (20, 1024 * 1024, 16 * 1024 * 1024),
+    "audio": (10, 1024 * 1024, 8 * 1024 * 1024),
+}
+
+CAPTION_WORDS = (
+    "release", "notes", "episode", "season", "download", "mirror", "channel",
+    "update", "changelog", "quality", "subtitles", "archive", "backup",
+)
+
+
+def _thumbnail_jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 180), (40, 90, 160)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+THUMB_JPEG = _thumbnail_jpeg()
+
+
+@dataclass
+class NetworkProfile:
+    """How the fake Telegram behaves.
+
+    Bandwidth is per transfer, and at most ``transmissions`` transfers per
+    direction run at once, like Pyrogram's own transmission semaphores.
+    ``flood_rate`` is the chance that an RPC answers with a FloodWait of
+    ``flood_seconds``.
+    """
+    latency: float = 0.05
+    download_bps: float = 50 * 1024 * 1024
+    upload_bps: float = 20 * 1024 * 1024
+    flood_rate: float = 0.0
+    flood_seconds: int = 1
+    transmissions: int = 4
+    seed: int = 1
+
+
+@dataclass
+class Counters:
+    rpcs: int = 0
+    flood_waits: int = 0
+    downloaded_bytes: int = 0
+    uploaded_bytes: int = 0
+    sent_messages: int = 0
+    edits: int = 0
+
+
+class FakeTelegram:
+    """The server side: one protected source channel and its posts."""
+
+    def __init__(self, profile: NetworkProfile, username: str = "benchchannel",
+                 chat_id: int = -1001234567890):
+        self.profile = profile
+        self.random = random.Random(profile.seed)
+        self.counters = Counters()
+        self.chat = types.Chat(
+            id=chat_id,
+            type=enums.ChatType.CHANNEL,
+            title="Benchmark Channel",
+            username=username,
+            has_protected_content=True,
+        )
+        self.posts = {}
+        self.groups = {}
+        self.next_id = 1
+        self.next_file = 1
+
+    def _file_ids(self):
+        self.next_file += 1
+        return f"src-file-{self.next_file}", f"src-unique-{self.next_file}"
+
+    def _caption(self):
+        words = [self.random.choice(CAPTION_WORDS) for _ in range(self.random.randint(8, 60))]
+        text = " ".join(words)
+        entities = []
+        offset = 0
+        for word in words:
+            if self.random.random() < 0.15:
+                entity_type = self.random.choice(
+                    (enums.MessageEntityType.BOLD, enums.MessageEntityType.ITALIC,
+                     enums.MessageEntityType.CODE)
+                )
+                entities.append(types.MessageEntity(type=entity_type, offset=offset, length=len(word)))
+            offset += len(word) + 1
+        return text, entities
+
+    def _media(self, kind: str, size: int, client):
+        file_id, unique_id = self._file_ids()
+        date = datetime.now()
+        if kind == "photo":
+            return types.Photo(client=client, file_id=file_id, file_unique_id=unique_id,
+                               width=1280, height=720, file_size=size, date=date)
+        if kind == "video":
+            thumb_id, thumb_unique = self._file_ids()
+            thumbs = [types.Thumbnail(client=client, file_id=thumb_id, file_unique_id=thumb_unique,
+                                      width=320, height=180, file_size=len(THUMB_JPEG))]
+            return types.Video(client=client, file_id=file_id, file_unique_id=unique_id,
+                               width=1280, height=720, duration=max(1, size // (256 * 1024)),
+                               file_name=f"video_{self.next_file}.mp4", mime_type="video/mp4",
+                               file_size=size, date=date, thumbs=thumbs)
+        if kind == "audio":
+            return types.Audio(client=client, file_id=file_id, file_unique_id=unique_id,
+                               duration=max(1, size // (16 * 1024)), performer="Bench",
+                               title=f"Track {self.next_file}", file_name=f"track_{self.next_file}.mp3",
+                               mime_type="audio/mpeg", file_size=size, date=date)
+        return types.Document(client=client, file_id=file_id, file_unique_id=unique_id,
+                              file_name=f"file_{self.next_file}.zip", mime_type="application/zip",
+                              file_size=size, date=date)
+
+    def add_post(self, client, kind: str, size: int = 0, media_group_id: str = None) -> types.Message:
+        """Append one post of ``kind`` to the channel."""
+        message_id = self.next_id
+        self.next_id += 1
+        text, entities = self._caption()
+        fields = dict(
+            client=client, id=message_id, chat=self.chat, date=datetime.now(),
+            has_protected_content=True, media_group_id=media_group_id,
+        )
+        if kind == "text":
+            fields.update(text=text, entities=entities)
+        else:
+            fields.update(
+                media=getattr(enums.MessageMediaType, kind.upper()),
+                caption=text, caption_entities=entities,
+            )
+            fields[kind] = self._media(kind, size, client)
+        message = types.Message(**fields)
+        self.posts[message_id] = message
+        if media_group_id:
+            self.groups.setdefault(media_group_id, []).append(message)
+        return message
+
+    def random_post(self, client, size_scale: float = 1.0) -> types.Message:
+        kinds = list(MEDIA_MIX)
+        kind = self.random.choices(kinds, weights=[MEDIA_MIX[k][0] for k in kinds])[0]
+        _, low, high = MEDIA_MIX[kind]
+        return self.add_post(client, kind, int(self.random.randint(low, high) * size_scale))
+
+    def add_album(self, client, items: int, size_scale: float = 1.0):
+        group_id = f"album-{self.next_id}"
+        members = []
+        for _ in range(items):
+            kind = self.random.choice(("photo", "video"))
+            _, low, high = MEDIA_MIX[kind]
+            members.append(self.add_post(
+                client, kind, int(self.random.randint(low, high) * size_scale), media_group_id=group_id
+            ))
+        return members
+
+
+def _size_of(media) -> int:
+    if isinstance(media, str):
+        return os.path.getsize(media) if os.path.exists(media) else 0
+    if hasattr(media, "getbuffer"):
+        return media.getbuffer().nbytes
+    return 0
+
+
+async def _report(progress, progress_args, current, total):
+    if progress is None:
+        return
+    result = progress(current, total, *progress_args)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+class FakeClient:
+    """The user or bot client, backed by a ``FakeTelegram``.
+
+    Implements every method in ``helpers.ratelimit.METHOD_BUCKETS`` plus the
+    few others the handlers use, so a ``RateLimiter`` installs on it as on a
+    real client.
+    """
+
+    def __init__(self, server: FakeTelegram, name: str, user_id: int, is_bot: bool = False):
+        self.server = server
+        self.name = name
+        self.me = types.User(id=user_id, is_self=True, is_bot=is_bot, is_premium=True,
+                             first_name=name)
+        transmissions = max(1, server.profile.transmissions)
+        self.download_slots = asyncio.Semaphore(transmissions)
+        self.upload_slots = asyncio.Semaphore(transmissions)
+        self.next_id = 1
+
+    # Simulation primitives
+
+    async def _rpc(self, flood: bool = True):
+        server = self.server
+        server.counters.rpcs += 1
+        await asyncio.sleep(server.profile.latency)
+        if flood and server.profile.flood_rate and server.random.random() < server.profile.flood_rate:
+            server.counters.flood_waits += 1
+            raise FloodWait(value=server.profile.flood_seconds)
+
+    async def _transfer(self, size, part, bps, progress=None, progress_args=()):
+        done = 0
+        while done < size:
+            step = min(part, size - done)
+            await asyncio.sleep(step / bps)
+            done += step
+            await _report(progress, progress_args, done, size)
+
+    def _reply(self, chat_id, **fields) -> types.Message:
+        self.next_id += 1
+        self.server.counters.sent_messages += 1
+        chat = types.Chat(id=chat_id, type=enums.ChatType.PRIVATE)
+        return types.Message(client=self, id=self.next_id, chat=chat, date=datetime.now(), **fields)
+
+    def _sent_media(self, chat_id, kind, size):
+        media = self.server._media(kind, size, self)
+        return self._reply(chat_id, media=getattr(enums.MessageMediaType, kind.upper()), **{kind: media})
+
+    async def invoke(self, query, *args, **kwargs):
+        raise NotImplementedError(f"raw {type(query).__name__} calls are not simulated")
+
+    # Reads
+
+    async def get_messages(self, chat_id=None, message_ids=None, **kwargs):
+        await self._rpc()
+        ids = message_ids if isinstance(message_ids, (list, tuple, range)) else [message_ids]
+        found = [
+            self.server.posts.get(i) or types.Message(client=self, id=i, empty=True)
+            for i in ids
+        ]
+        return found if isinstance(message_ids, (list, tuple, range)) else found[0]
+
+    async def get_media_group(self, chat_id, message_id):
+        await self._rpc()
+        post = self.server.posts[message_id]
+        return list(self.server.groups.get(post.media_group_id, [post]))
+
+    async def get_chat(self, chat_id):
+        await self._rpc()
+        return self.server.chat
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self._rpc(flood=False)
+        return True
+
+    async def resolve_peer(self, peer_id):
+        return raw.types.InputPeerChannel(
+            channel_id=abs(self.server.chat.id) - 1000000000000, access_hash=1
+        )
+
+    async def download_media(self, message, file_name="", in_memory=False, block=True,
+                             progress=None, progress_args=()):
+        if isinstance(message, str):
+            # A thumbnail's file_id
+            await self._rpc()
+            path = os.path.abspath(file_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(THUMB_JPEG)
+            return path
+
+        media = getattr(message, message.media.value)
+        size = media.file_size or 0
+        async with self.download_slots:
+            await self._rpc()
+            await self._transfer(size, DOWNLOAD_PART, self.server.profile.download_bps,
+                                 progress, progress_args)
+        self.server.counters.downloaded_bytes += size
+
+        name = os.path.basename(file_name) or getattr(media, "file_name", None) or f"{message.id}"
+        if in_memory:
+            buffer = io.BytesIO(bytes(size))
+            buffer.name = name
+            return buffer
+        path = os.path.abspath(file_name if file_name and not file_name.endswith("/")
+                               else os.path.join(file_name or "downloads", name))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Sparse, so large workloads cost no real disk writes
+        with open(path, "wb") as f:
+            f.truncate(size)
+        return path
+
+    async def stream_media(self, message, limit: int = 0, offset: int = 0):
+        media = getattr(message, message.media.value)
+        size = media.file_size or 0
+        total = math.ceil(size / DOWNLOAD_PART)
+        last = total if not limit else min(total, offset + limit)
+        async with self.download_slots:
+            await self._rpc()
+            for index in range(offset, last):
+                chunk = min(DOWNLOAD_PART, size - index * DOWNLOAD_PART)
+                await asyncio.sleep(chunk / self.server.profile.download_bps)
+                self.server.counters.downloaded_bytes += chunk
+                yield bytes(chunk)
+
+    # Writes
+
+    async def _upload(self, chat_id, kind, media, progress=None, progress_args=()):
+        size = _size_of(media)
+        async with self.upload_slots:
+            await self._transfer(size, UPLOAD_PART, self.server.profile.upload_bps,
+                                 progress, progress_args)
+        await self._rpc()
+        self.server.counters.uploaded_bytes += size
+        return self._sent_media(chat_id, kind, size)
+
+    async def send_photo(self, chat_id, photo, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "photo", photo, progress, progress_args)
+
+    async def send_video(self, chat_id, video, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "video", video, progress, progress_args)
+
+    async def send_audio(self, chat_id, audio, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "audio", audio, progress, progress_args)
+
+    async def send_document(self, chat_id, document, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "document", document, progress, progress_args)
+
+    async def send_animation(self, chat_id, animation, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "document", animation, progress, progress_args)
+
+    async def send_voice(self, chat_id, voice, progress=None, progress_args=(), **kwargs):
+        return await self._upload(chat_id, "audio", voice, progress, progress_args)
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        sizes = [_size_of(item.media) for item in media]
+        async with self.upload_slots:
+            for size in sizes:
+                await self._transfer(size, UPLOAD_PART, self.server.profile.upload_bps)
+        await self._rpc()
+        self.server.counters.uploaded_bytes += sum(sizes)
+        kinds = ["photo" if isinstance(item, types.InputMediaPhoto) else "video" for item in media]
+        return [self._sent_media(chat_id, kind, size) for kind, size in zip(kinds, sizes)]
+
+    async def send_cached_media(self, chat_id, file_id, **kwargs):
+        await self._rpc()
+        return self._reply(chat_id, text=kwargs.get("caption", ""))
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._rpc()
+        return self._reply(chat_id, text="")
+
+    async def copy_media_group(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._rpc()
+        return [self._reply(chat_id, text="")]
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._rpc()
+        return self._reply(chat_id, text=text)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self._rpc()
+        self.server.counters.edits += 1
+        return self._reply(chat_id, text=text)
+
+    async def delete_messages(self, chat_id, message_ids, revoke=True):
+        await self._rpc(flood=False)
+        return 1
+
+
+@dataclass
+class Requests:
+    """Builds the private-chat messages that users send to the bot."""
+    bot: FakeClient
+    users: int = 8
+    next_id: int = field(default=1_000_000)
+
+    def command(self, text: str, index: int = 0) -> types.Message:
+        self.next_id += 1
+        user_id = 10_000 + index % max(1, self.users)
+        return types.Message(
+            client=self.bot,
+            id=self.next_id,
+            chat=types.Chat(id=user_id, type=enums.ChatType.PRIVATE),
+            from_user=types.User(id=user_id, first_name=f"user{user_id}"),
+            date=datetime.now(),
+            text=text,
+        )
@@ -11,6 +11,8 @@ COMMANDS = [
     "dlrange",
     "stats",
     "logs",
+    "trace",
+    "slowest",
     "killall",
     "eval",
     "bash",
@@ -31,3 +31,71 @@ class PyroConf(object):
     OWNER_ID = int(getenv("OWNER_ID", "790841356"))
     # OWNER_ID = 790841356
     BOT_START_TIME = time()
+    # Posts kept in flight by /bdl and /dlrange
+    BATCH_CONCURRENCY = int(getenv("BATCH_CONCURRENCY", "4"))
+    # Album members downloaded and prepared at once
+    ALBUM_CONCURRENCY = int(getenv("ALBUM_CONCURRENCY", "4"))
+    # Parallel file transfers per client (Pyrogram defaults to 1)
+    MAX_CONCURRENT_TRANSMISSIONS = int(getenv("MAX_CONCURRENT_TRANSMISSIONS", "4"))
+    # Files at least this big are downloaded as DOWNLOAD_SEGMENTS parallel ranges
+    SEGMENTED_DOWNLOAD_THRESHOLD_MB = int(getenv("SEGMENTED_DOWNLOAD_THRESHOLD_MB", "64"))
+    DOWNLOAD_SEGMENTS = int(getenv("DOWNLOAD_SEGMENTS", "4"))
+    # FloodWaits up to this many seconds are slept inside Pyrogram on calls the
+    # rate limiter doesn't wrap; wrapped calls hand them to the limiter
+    FLOOD_SLEEP_THRESHOLD = int(getenv("FLOOD_SLEEP_THRESHOLD", "10"))
+    # Stream media from the user session into the bot upload without touching disk
+    RELAY_MODE = getenv("RELAY_MODE", "False").lower() == "true"
+    # MiB of streamed chunks held in memory per relayed transfer
+    RELAY_BUFFER_MB = int(getenv("RELAY_BUFFER_MB", "4"))
+    # Copy posts from chats without content protection instead of re-uploading
+    COPY_FAST_PATH = getenv("COPY_FAST_PATH", "True").lower() == "true"
+    # Progress messages are re-rendered every PROGRESS_INTERVAL seconds, with
+    # at most PROGRESS_EDIT_BUDGET edits per second across all chats
+    PROGRESS_INTERVAL = float(getenv("PROGRESS_INTERVAL", "5"))
+    PROGRESS_EDIT_BUDGET = float(getenv("PROGRESS_EDIT_BUDGET", "5"))
+    # SQLite index of source file_unique_id -> bot file_id (empty to disable)
+    FILE_ID_CACHE = getenv("FILE_ID_CACHE", "file_ids.db")
+    FILE_ID_CACHE_SIZE = int(getenv("FILE_ID_CACHE_SIZE", "50000"))
+    # Concurrent ffmpeg thumbnail jobs (0 = one per two CPU cores)
+    THUMBNAIL_WORKERS = int(getenv("THUMBNAIL_WORKERS", "0"))
+    # Take the first keyframe instead of running ffmpeg's thumbnail filter
+    THUMBNAIL_FAST_MODE = getenv("THUMBNAIL_FAST_MODE", "False").lower() == "true"
+    # Disk space for reusable thumbnails in default_thumbs/cache (0 = disabled)
+    THUMBNAIL_CACHE_MB = int(getenv("THUMBNAIL_CACHE_MB", "256"))
+    # JSON file of resolved chats and access hashes (empty to keep in memory only)
+    PEER_CACHE = getenv("PEER_CACHE", "peers.json")
+    PEER_CACHE_TTL = int(getenv("PEER_CACHE_TTL", "21600"))
+    # Dialogs of the user session recorded at startup (0 = all)
+    PEER_WARMUP_DIALOGS = int(getenv("PEER_WARMUP_DIALOGS", "1000"))
+    # SQLite journal of /bdl and /dlrange progress (empty to keep it in memory only)
+    JOB_JOURNAL = getenv("JOB_JOURNAL", "jobs.db")
+    # Seconds to wait for running downloads on shutdown before cancelling them
+    SHUTDOWN_TIMEOUT = int(getenv("SHUTDOWN_TIMEOUT", "60"))
+    # Posts processed at once across all users, and per user
+    MAX_ACTIVE_JOBS = int(getenv("MAX_ACTIVE_JOBS", "8"))
+    USER_JOB_QUOTA = int(getenv("USER_JOB_QUOTA", "4"))
+    # Downloads wait while they would fill the downloads/ volume past this percentage
+    DISK_HIGH_WATER = float(getenv("DISK_HIGH_WATER", "90"))
+    # Media up to this size is downloaded into memory instead of downloads/
+    IN_MEMORY_THRESHOLD_MB = int(getenv("IN_MEMORY_THRESHOLD_MB", "10"))
+    # Total MiB held by in-memory downloads; larger ones go to disk meanwhile
+    IN_MEMORY_BUDGET_MB = int(getenv("IN_MEMORY_BUDGET_MB", "128"))
+    # Unowned files in downloads/, assets/ and default_thumbs/ older than this many seconds are removed
+    JANITOR_TTL = int(getenv("JANITOR_TTL", "3600"))
+    # Seconds between janitor sweeps (0 = disabled)
+    JANITOR_INTERVAL = int(getenv("JANITOR_INTERVAL", "600"))
+    # Port of the Prometheus /metrics endpoint (0 = disabled)
+    METRICS_PORT = int(getenv("METRICS_PORT", "0"))
+    # Address the metrics endpoint listens on
+    METRICS_HOST = getenv("METRICS_HOST", "127.0.0.1")
+    # Finished job traces kept in memory for /trace and /slowest
+    TRACE_BUFFER = int(getenv("TRACE_BUFFER", "500"))
+    # Append every finished trace to this JSONL file (empty = disabled)
+    TRACE_EXPORT = getenv("TRACE_EXPORT", "")
+    # Write logs as one JSON object per line
+    LOG_JSON = getenv("LOG_JSON", "False").lower() == "true"
+    # INFO/DEBUG lines let through per logger every LOG_RATE_WINDOW seconds (0 = unlimited)
+    LOG_RATE_LIMIT = int(getenv("LOG_RATE_LIMIT", "50"))
+    LOG_RATE_WINDOW = float(getenv("LOG_RATE_WINDOW", "10"))
+    # Seconds between the CPU/memory/disk/network samples /stats reads
+    SYSSTATS_INTERVAL = float(getenv("SYSSTATS_INTERVAL", "5"))
@@ -0,0 +1,67 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+from pyrogram.errors import (
+    ChannelPrivate,
+    ChatForwardsRestricted,
+    FloodWait,
+    PeerIdInvalid,
+    UsernameNotOccupied,
+)
+
+from logger import LOGGER
+
+# Source chat id -> whether the bot can copy its posts server-side.
+# Filled on the first attempt per chat so later posts skip the probe.
+COPY_MODE_CACHE = {}
+
+# Errors that mean the bot can't copy from the chat at all
+NOT_COPYABLE = (ChatForwardsRestricted, ChannelPrivate, PeerIdInvalid, UsernameNotOccupied)
+
+
+def can_copy(chat_message) -> bool:
+    """Whether the post is worth trying to copy instead of transferring."""
+    if not chat_message.media:
+        return False
+    chat = chat_message.chat
+    if chat_message.has_protected_content or getattr(chat, "has_protected_content", False):
+        COPY_MODE_CACHE[chat.id] = False
+        return False
+    return COPY_MODE_CACHE.get(chat.id, True)
+
+
+async def copy_post(bot, message, chat_message) -> bool:
+    """Send the post with copy_message / copy_media_group.
+
+    Returns False when the bot cannot see the source chat, in which case the
+    chat is remembered and its posts go through the transfer pipeline. Other
+    failures also return False, but only for this post.
+    """
+    chat = chat_message.chat
+    # Bots can only reach chats they are not a member of through a public username
+    from_chat_id = chat.username or chat.id
+
+    try:
+        if chat_message.media_group_id:
+            await bot.copy_media_group(
+                chat_id=message.chat.id, from_chat_id=from_chat_id, message_id=chat_message.id
+            )
+        else:
+            await bot.copy_message(
+                chat_id=message.chat.id, from_chat_id=from_chat_id, message_id=chat_message.id
+            )
+    except FloodWait as e:
+        # Says nothing about whether the chat is copyable
+        LOGGER(__name__).warning(f"Copy of {from_chat_id}/{chat_message.id} hit FloodWait: {e.value}s")
+        return False
+    except NOT_COPYABLE as e:
+        LOGGER(__name__).info(f"Chat {from_chat_id} is not copyable, using transfer: {e}")
+        COPY_MODE_CACHE[chat.id] = False
+        return False
+    except Exception as e:
+        LOGGER(__name__).warning(f"Copy of {from_chat_id}/{chat_message.id} failed, using transfer: {e}")
+        return False
+
+    COPY_MODE_CACHE[chat.id] = True
+    LOGGER(__name__).info(f"Copied {from_chat_id}/{chat_message.id} server-side")
+    return True
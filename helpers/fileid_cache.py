@@ -0,0 +1,113 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import sqlite3
+from time import time
+from typing import Optional, Tuple
+
+from logger import LOGGER
+from config import PyroConf
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_ids (
+    file_unique_id TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_file_ids_last_used ON file_ids (last_used);
+"""
+
+# Inserts between eviction passes, so the table is not counted on every upload
+EVICT_EVERY = 100
+
+
+def get_media(chat_message):
+    """The Photo/Video/Document/... object of a message, if it has one."""
+    if not chat_message or not chat_message.media:
+        return None
+    return getattr(chat_message, chat_message.media.value, None)
+
+
+class FileIdCache:
+    """Persistent source ``file_unique_id`` -> bot ``file_id`` index.
+
+    ``file_unique_id`` is the same for every account that sees a file, so
+    once the bot has uploaded a file it can re-send it by ``file_id`` to
+    anyone. Entries are evicted least-recently-used beyond ``max_entries``
+    (checked every ``EVICT_EVERY`` inserts) and dropped with ``invalidate``
+    when Telegram rejects a stored id.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.puts = 0
+        self.evict()
+
+    def get(self, file_unique_id: str) -> Optional[Tuple[str, str]]:
+        row = self.conn.execute(
+            "SELECT file_id, media_type FROM file_ids WHERE file_unique_id = ?",
+            (file_unique_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute(
+            "UPDATE file_ids SET last_used = ? WHERE file_unique_id = ?",
+            (time(), file_unique_id)
+        )
+        return row
+
+    def put(self, file_unique_id: str, file_id: str, media_type: str) -> None:
+        self.conn.execute(
+            "REPLACE INTO file_ids (file_unique_id, file_id, media_type, last_used) VALUES (?, ?, ?, ?)",
+            (file_unique_id, file_id, media_type, time())
+        )
+        self.puts += 1
+        if self.puts % EVICT_EVERY == 0:
+            self.evict()
+
+    def invalidate(self, file_unique_id: str) -> None:
+        LOGGER(__name__).info(f"Invalidating cached file_id for {file_unique_id}")
+        self.conn.execute("DELETE FROM file_ids WHERE file_unique_id = ?", (file_unique_id,))
+
+    def evict(self) -> None:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM file_ids").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM file_ids WHERE file_unique_id IN "
+                "(SELECT file_unique_id FROM file_ids ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def lookup(self, chat_message) -> Optional[str]:
+        """Cached bot file_id for a source message's media, if any."""
+        media = get_media(chat_message)
+        if media is None or not getattr(media, "file_unique_id", None):
+            return None
+        row = self.get(media.file_unique_id)
+        return row[0] if row else None
+
+    def remember(self, chat_message, sent_message) -> None:
+        """Record the bot-side file_id of an upload made for ``chat_message``."""
+        source, sent = get_media(chat_message), get_media(sent_message)
+        if source is None or sent is None:
+            return
+        try:
+            self.put(source.file_unique_id, sent.file_id, sent_message.media.value)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Failed to cache file_id: {e}")
+
+    def forget(self, chat_message) -> None:
+        media = get_media(chat_message)
+        if media is not None:
+            self.invalidate(media.file_unique_id)
+
+
+file_id_cache = (
+    FileIdCache(PyroConf.FILE_ID_CACHE, PyroConf.FILE_ID_CACHE_SIZE)
+    if PyroConf.FILE_ID_CACHE
+    else None
+)
@@ -2,21 +2,192 @@
 # Channel: https://t.me/itsSmartDev
 
 import os
-from typing import Optional
+import shutil
+import asyncio
+from time import monotonic
+from contextvars import ContextVar
+from typing import BinaryIO, Optional, Union
 
 from logger import LOGGER
+from config import PyroConf
 
 SIZE_UNITS = ["B", "KB", "MB", "GB", "TB", "PB"]
+# Waiting downloads re-check the volume this often, other processes free space too
+DISK_RECHECK_INTERVAL = 5
+# Longest a download waits for space before it fails
+DISK_WAIT_TIMEOUT = 600
+
+# (queue, position) of the job downloading in this context. A job's own
+# reservations, and those of jobs behind it in the same queue, are only
+# released after it has finished, so it must never wait on them.
+disk_owner = ContextVar("disk_owner", default=None)
+
+
+def _allocated(path: str) -> int:
+    """Bytes a file (and its ``.temp`` download) actually occupies on disk."""
+    allocated = 0
+    for candidate in (path, path + ".temp"):
+        try:
+            allocated += os.stat(candidate).st_blocks * 512
+        except OSError:
+            pass
+    return allocated
+
+
+class DiskLedger:
+    """Space reservations for downloads on the ``downloads/`` volume.
+
+    A download reserves its ``file_size`` before it starts and waits while
+    that would take the volume past ``high_water`` percent used. Bytes
+    already written count as used, so only the unwritten rest of every
+    reservation is added on top of the current usage. ``cleanup_download``
+    releases the reservation.
+
+    A download only waits while some other job's reservation could be
+    released first (see ``disk_owner``) and for at most ``wait_timeout``
+    seconds; otherwise it fails with ``IOError`` instead of deadlocking.
+    """
+
+    def __init__(self, root: str = "downloads", high_water: float = 90,
+                 wait_timeout: float = DISK_WAIT_TIMEOUT):
+        self.root = root
+        self.high_water = high_water
+        self.wait_timeout = wait_timeout
+        self.reservations = {}  # absolute path -> reserved bytes
+        self.owners = {}  # absolute path -> disk_owner of its download
+        self.waiters = []
+
+    @property
+    def reserved(self) -> int:
+        return sum(self.reservations.values())
+
+    def pending(self) -> int:
+        """Reserved bytes that aren't on disk yet."""
+        return sum(
+            max(0, size - _allocated(path)) for path, size in self.reservations.items()
+        )
+
+    def usage(self):
+        os.makedirs(self.root, exist_ok=True)
+        return shutil.disk_usage(self.root)
+
+    def fits(self, size: int) -> bool:
+        total, used, _ = self.usage()
+        return used + self.pending() + size <= total * self.high_water / 100
+
+    def can_free(self, owner) -> bool:
+        """Whether a reservation exists that may be released before ``owner``'s job ends."""
+        for other in self.owners.values():
+            if owner is None or other is None or other[0] is not owner[0] or other[1] < owner[1]:
+                return True
+        return False
 
-def get_download_path(folder_id: int, filename: str, root_dir: str = "downloads") -> str:
+    async def reserve(self, path: str, size: int) -> None:
+        path = os.path.abspath(path)
+        owner = disk_owner.get()
+        deadline = monotonic() + self.wait_timeout
+        while not self.fits(size):
+            if not self.can_free(owner) or monotonic() >= deadline:
+                total, used, _ = self.usage()
+                raise IOError(
+                    f"Not enough disk space for {get_readable_file_size(size)}: "
+                    f"{get_readable_file_size(used)} of {get_readable_file_size(total)} used"
+                )
+            LOGGER(__name__).info(f"Waiting for disk space for {path} ({get_readable_file_size(size)})")
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(
+                    waiter, min(DISK_RECHECK_INTERVAL, max(0, deadline - monotonic()))
+                )
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+        self.reservations[path] = self.reservations.get(path, 0) + size
+        self.owners.setdefault(path, owner)
+
+    def move(self, path: str, new_path: str) -> None:
+        """Carry a reservation over to the path the download actually used."""
+        size = self.reservations.pop(os.path.abspath(path), None)
+        if size is not None:
+            self.reservations[os.path.abspath(new_path)] = size
+            self.owners[os.path.abspath(new_path)] = self.owners.pop(os.path.abspath(path), None)
+
+    def release(self, path: str) -> None:
+        if self.reservations.pop(os.path.abspath(path), None) is None:
+            return
+        self.owners.pop(os.path.abspath(path), None)
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.waiters.clear()
+
+
+class MemoryBudget:
+    """Cap on the bytes held by downloads kept in memory instead of on disk."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.buffers = {}  # id(buffer) -> size
+
+    def try_reserve(self, size: int) -> bool:
+        if self.used + size > self.limit:
+            return False
+        self.used += size
+        return True
+
+    def attach(self, buffer, size: int) -> None:
+        """Tie a reservation to the buffer the download returned."""
+        self.buffers[id(buffer)] = size
+
+    def cancel(self, size: int) -> None:
+        self.used -= size
+
+    def release(self, buffer) -> None:
+        size = self.buffers.pop(id(buffer), None)
+        if size is not None:
+            self.used -= size
+        buffer.close()
+
+
+disk_ledger = DiskLedger("downloads", PyroConf.DISK_HIGH_WATER)
+memory_budget = MemoryBudget(PyroConf.IN_MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+def media_size(media) -> int:
+    """Size of a downloaded file, on disk or in memory."""
+    if isinstance(media, str):
+        return os.path.getsize(media)
+    return media.getbuffer().nbytes
+
+def get_download_path(folder_id: Union[int, str], filename: str, root_dir: str = "downloads", create: bool = True) -> str:
     folder = os.path.join(root_dir, str(folder_id))
-    os.makedirs(folder, exist_ok=True)
+    if create:
+        os.makedirs(folder, exist_ok=True)
     return os.path.join(folder, filename)
 
 
-def cleanup_download(path: str) -> None:
+def post_folder(message, chat_message) -> str:
+    """Download folder of one source post within one request.
+
+    Keyed by both, so concurrent posts of a batch, and the same post
+    requested twice, never share a file.
+    """
+    return f"{message.chat.id}_{message.id}_{chat_message.chat.id}_{chat_message.id}"
+
+
+def cleanup_download(path: Union[str, BinaryIO]) -> None:
+    if not isinstance(path, str):
+        # Downloaded in memory, nothing on disk to remove
+        memory_budget.release(path)
+        return
+
     try:
         LOGGER(__name__).info(f"Cleaning Download: {path}")
+        disk_ledger.release(path)
         
         if os.path.exists(path):
             os.remove(path)
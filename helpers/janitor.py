@@ -0,0 +1,110 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import asyncio
+from time import time
+from collections import Counter
+from typing import Iterable, Optional
+
+from logger import LOGGER
+from config import PyroConf
+from helpers.files import disk_ledger, get_readable_file_size
+from helpers.thumbcache import THUMB_CACHE_DIR
+
+JANITOR_DIRS = ("downloads", "assets", "default_thumbs")
+
+
+class Janitor:
+    """Periodic sweep of files that failed or cancelled jobs left behind.
+
+    A file is removed once it is older than ``ttl`` seconds and no live job
+    owns it. Downloads are owned while their disk reservation is held;
+    other paths, like thumbnails, are registered with ``track``. The
+    thumbnail cache manages its own directory and is skipped. The periodic
+    sweep runs in a worker thread and only reads the ownership tables.
+    """
+
+    def __init__(self, directories: Iterable[str], ttl: float = 3600, interval: float = 600,
+                 skip: Iterable[str] = ()):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.skip = {os.path.abspath(d) for d in skip}
+        self.ttl = ttl
+        self.interval = interval
+        self.owned = Counter()
+        self.reclaimed_bytes = 0
+        self.reclaimed_files = 0
+        self.last_sweep = 0.0
+        self._task = None
+
+    def track(self, path) -> None:
+        if isinstance(path, str):
+            self.owned[os.path.abspath(path)] += 1
+
+    def untrack(self, path) -> None:
+        if not isinstance(path, str):
+            return
+        path = os.path.abspath(path)
+        self.owned[path] -= 1
+        if self.owned[path] <= 0:
+            del self.owned[path]
+
+    def is_owned(self, path: str) -> bool:
+        base = path[:-len(".temp")] if path.endswith(".temp") else path
+        return path in self.owned or base in self.owned or base in disk_ledger.reservations
+
+    def sweep(self, now: Optional[float] = None):
+        """Remove expired unowned files. Returns ``(files, bytes)`` reclaimed."""
+        now = now or time()
+        files = reclaimed = 0
+
+        for root_dir in self.directories:
+            if not os.path.isdir(root_dir):
+                continue
+            for folder, subdirs, names in os.walk(root_dir, topdown=False):
+                if any(folder == skip or folder.startswith(skip + os.sep) for skip in self.skip):
+                    continue
+                for name in names:
+                    path = os.path.join(folder, name)
+                    try:
+                        st = os.stat(path)
+                        if now - st.st_mtime < self.ttl or self.is_owned(path):
+                            continue
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    files += 1
+                    reclaimed += st.st_size
+                # Per-request download folders; the top-level ones stay
+                if folder != root_dir and folder not in self.skip:
+                    try:
+                        os.rmdir(folder)
+                    except OSError:
+                        pass
+
+        self.reclaimed_files += files
+        self.reclaimed_bytes += reclaimed
+        self.last_sweep = now
+        if files:
+            LOGGER(__name__).info(
+                f"Janitor reclaimed {get_readable_file_size(reclaimed)} in {files} file(s)"
+            )
+        return files, reclaimed
+
+    async def _run(self):
+        while True:
+            try:
+                # Walking and stat-ing a big tree would stall the event loop
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                LOGGER(__name__).error(f"Janitor sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+
+janitor = Janitor(
+    JANITOR_DIRS, PyroConf.JANITOR_TTL, PyroConf.JANITOR_INTERVAL, skip=[THUMB_CACHE_DIR]
+)
@@ -0,0 +1,146 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import sqlite3
+from time import time
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple, Union
+
+from logger import LOGGER
+from config import PyroConf
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    source_chat TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    start_id INTEGER NOT NULL,
+    end_id INTEGER NOT NULL,
+    cursor INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+    batch_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    media_group_id TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (batch_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS idx_batches_state ON batches (state);
+"""
+
+BATCH_COLUMNS = "id, command, chat_id, message_id, source_chat, prefix, start_id, end_id, cursor, state"
+
+
+def _chat_ref(value: str) -> Union[int, str]:
+    """Numeric chat ids are stored as text next to usernames."""
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+@dataclass
+class Batch:
+    """One journaled /bdl or /dlrange run."""
+    id: int
+    command: str
+    chat_id: int
+    message_id: int
+    source_chat: Union[int, str]
+    prefix: str
+    start_id: int
+    end_id: int
+    cursor: int
+    state: str
+
+    @property
+    def next_id(self) -> int:
+        """First message ID that still has to be processed."""
+        return max(self.start_id, self.cursor + 1)
+
+
+class JobJournal:
+    """SQLite record of batch ranges, cursors and per-post outcomes.
+
+    Batch uploads happen in message order, so ``cursor`` is the highest ID
+    whose outcome is known and everything up to it is finished. A batch
+    left ``running`` by a restart resumes from ``cursor + 1``.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _batch(self, row) -> Batch:
+        row = list(row)
+        row[4] = _chat_ref(row[4])
+        return Batch(*row)
+
+    def start(self, command: str, chat_id: int, message_id: int, source_chat, prefix: str,
+              start_id: int, end_id: int) -> Batch:
+        now = time()
+        cur = self.conn.execute(
+            "INSERT INTO batches (command, chat_id, message_id, source_chat, prefix, start_id, "
+            "end_id, cursor, state, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'running', ?, ?)",
+            (command, chat_id, message_id, str(source_chat), prefix, start_id, end_id, start_id - 1, now, now)
+        )
+        return self.get(cur.lastrowid)
+
+    def get(self, batch_id: int) -> Optional[Batch]:
+        row = self.conn.execute(
+            f"SELECT {BATCH_COLUMNS} FROM batches WHERE id = ?", (batch_id,)
+        ).fetchone()
+        return self._batch(row) if row else None
+
+    def unfinished(self) -> List[Batch]:
+        rows = self.conn.execute(
+            f"SELECT {BATCH_COLUMNS} FROM batches WHERE state = 'running' ORDER BY id"
+        ).fetchall()
+        return [self._batch(row) for row in rows]
+
+    def record(self, batch: Batch, message_id: int, outcome: str,
+               media_group_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Store a post's outcome and move the batch cursor past it."""
+        now = time()
+        batch.cursor = max(batch.cursor, message_id)
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "REPLACE INTO posts (batch_id, message_id, outcome, media_group_id, error, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (batch.id, message_id, outcome, media_group_id, error, now)
+            )
+            self.conn.execute(
+                "UPDATE batches SET cursor = ?, updated = ? WHERE id = ?",
+                (batch.cursor, now, batch.id)
+            )
+
+    def finished(self, batch: Batch) -> Tuple[Set[int], Set[str]]:
+        """IDs and album ids already sent by an earlier run of the batch."""
+        rows = self.conn.execute(
+            "SELECT message_id, media_group_id FROM posts WHERE batch_id = ? AND outcome = 'done'",
+            (batch.id,)
+        ).fetchall()
+        return {row[0] for row in rows}, {row[1] for row in rows if row[1]}
+
+    def finish(self, batch: Batch, state: str) -> None:
+        batch.state = state
+        self.conn.execute(
+            "UPDATE batches SET state = ?, updated = ? WHERE id = ?", (state, time(), batch.id)
+        )
+
+    def checkpoint(self) -> None:
+        """Fold the WAL into the database file before exiting."""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            LOGGER(__name__).warning(f"Journal checkpoint failed: {e}")
+
+
+journal = JobJournal(PyroConf.JOB_JOURNAL)
@@ -0,0 +1,205 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from bisect import bisect_left
+from time import monotonic
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from logger import LOGGER
+from config import PyroConf
+
+SIZE_BUCKETS = tuple(2 ** power for power in range(16, 33, 2))  # 64 KiB .. 4 GiB
+RATE_BUCKETS = tuple(2 ** power for power in range(16, 29, 2))  # 64 KiB/s .. 256 MiB/s
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self):
+        return []
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(names, values)} {value}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        return [("", self.labelnames, key, value) for key, value in self.values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[index] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def samples(self):
+        samples = []
+        names = self.labelnames + ("le",)
+        for key, entry in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                samples.append(("_bucket", names, key + (bound,), cumulative))
+            samples.append(("_bucket", names, key + ("+Inf",), entry[-1]))
+            samples.append(("_sum", self.labelnames, key, entry[-2]))
+            samples.append(("_count", self.labelnames, key, entry[-1]))
+        return samples
+
+
+class Collected(Metric):
+    """Gauge or counter read from existing state at scrape time."""
+
+    def __init__(self, name, documentation, labelnames=(), kind="gauge",
+                 collect: Callable[[], Iterable[Tuple[Dict, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        try:
+            return [
+                ("", self.labelnames, self._key(labels), value) for labels, value in self.collect()
+            ]
+        except Exception as e:
+            LOGGER(__name__).warning(f"Collecting {self.name} failed: {e}")
+            return []
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collected(self, name, documentation, collect, labelnames=(), kind="gauge") -> Metric:
+        return self.register(Collected(name, documentation, labelnames, kind, collect))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+jobs_total = registry.register(Counter(
+    "rcd_jobs_total", "Posts processed, by job kind and final state.", ("kind", "state")
+))
+transfer_bytes = registry.register(Histogram(
+    "rcd_transfer_bytes", "Size of each completed transfer.",
+    ("direction", "media_type"), SIZE_BUCKETS
+))
+transfer_throughput = registry.register(Histogram(
+    "rcd_transfer_throughput_bytes_per_second", "Average speed of each completed transfer.",
+    ("direction", "media_type"), RATE_BUCKETS
+))
+subprocess_seconds = registry.register(Histogram(
+    "rcd_subprocess_seconds", "Wall time of ffprobe and ffmpeg runs.", ("tool",)
+))
+
+
+def observe_transfer(direction: str, media_type: str, size: int, seconds: float) -> None:
+    media_type = media_type or "unknown"
+    transfer_bytes.observe(size, direction=direction, media_type=media_type)
+    transfer_throughput.observe(size / max(seconds, 1e-6), direction=direction, media_type=media_type)
+
+
+@contextmanager
+def transfer(direction: str, media_type: str, size: int):
+    """Record a transfer of ``size`` bytes if the block succeeds."""
+    started = monotonic()
+    yield
+    observe_transfer(direction, media_type, size, monotonic() - started)
+
+
+@contextmanager
+def timed(tool: str):
+    """Record how long a subprocess took."""
+    started = monotonic()
+    try:
+        yield
+    finally:
+        subprocess_seconds.observe(monotonic() - started, tool=tool)
+
+
+async def _handle(reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers, nothing in them matters here
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", registry.render().encode()
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.0 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = None, port: int = None) -> Optional[asyncio.AbstractServer]:
+    """Serve ``/metrics`` in Prometheus text format; port 0 disables it."""
+    host = host or PyroConf.METRICS_HOST
+    port = PyroConf.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle, host, port)
+    LOGGER(__name__).info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
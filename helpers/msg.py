@@ -4,10 +4,24 @@
 from pyrogram.parser import Parser
 from pyrogram.utils import get_channel_id
 
+# Telegram caps messages.getMessages / channels.getMessages at 200 IDs per call
+MAX_MESSAGES_PER_REQUEST = 200
+
 
 async def get_parsed_msg(text, entities):
     return Parser.unparse(text, entities or [], is_html=False)
-    
+
+
+async def get_messages_in_chunks(client, chat_id, start_id: int, end_id: int, chunk_size: int = MAX_MESSAGES_PER_REQUEST):
+    """Yield the messages of an ID range in ascending order, fetching up to
+    ``chunk_size`` of them per round trip."""
+    chunk_size = max(1, min(chunk_size, MAX_MESSAGES_PER_REQUEST))
+    for chunk_start in range(start_id, end_id + 1, chunk_size):
+        message_ids = list(range(chunk_start, min(chunk_start + chunk_size, end_id + 1)))
+        messages = await client.get_messages(chat_id=chat_id, message_ids=message_ids)
+        for msg in sorted(messages, key=lambda m: m.id):
+            yield msg
+
 
 def getChatMsgID(link: str):
     linkps = link.split("/")
@@ -40,6 +54,16 @@ def getChatMsgID(link: str):
     return chat_id, message_id
 
 
+def parse_post_link(link: str):
+    """``(chat_id, message_id)`` of a post link, including t.me/b/ links."""
+    if "t.me/b/" in link:
+        parts = [p for p in link.split("/") if p]  # Split and remove empty parts
+        if len(parts) >= 5 and parts[2] == "b":
+            return parts[3], int(parts[4])
+        raise ValueError("Invalid business link format")
+    return getChatMsgID(link)
+
+
 def get_file_name(message_id: int, chat_message) -> str:
     if chat_message.document:
         return chat_message.document.file_name or f"{message_id}.bin"
@@ -0,0 +1,162 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import json
+import asyncio
+from time import time
+from typing import Optional, Union
+
+from pyrogram.raw.types import InputPeerUser, InputPeerChat, InputPeerChannel
+from pyrogram.errors import UserNotParticipant
+
+from logger import LOGGER
+from config import PyroConf
+from helpers.fastpath import COPY_MODE_CACHE
+
+
+def peer_type(input_peer) -> Optional[str]:
+    """Pyrogram storage type of a resolved ``InputPeer``."""
+    if isinstance(input_peer, InputPeerChannel):
+        return "channel"
+    if isinstance(input_peer, InputPeerChat):
+        return "group"
+    if isinstance(input_peer, InputPeerUser):
+        return "user"
+    return None
+
+
+class PeerCache:
+    """Chat metadata for the user session, persisted between restarts.
+
+    Keeps each chat's id, access hash, storage type, username,
+    ``has_protected_content`` and whether the account is a member. Entries
+    older than ``ttl`` seconds are resolved again on next use. Session
+    strings use in-memory storage, so the cached access hashes are pushed
+    back into Pyrogram's peer table at startup; numeric links then resolve
+    without an RPC instead of failing with ``PeerIdInvalid``.
+    """
+
+    def __init__(self, path: str, ttl: float = 21600):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}  # chat id -> entry dict
+        self.usernames = {}  # lowercase username -> chat id
+        self.load()
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                for entry in json.load(f):
+                    self._index(entry)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            LOGGER(__name__).warning(f"Ignoring unreadable peer cache {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(list(self.entries.values()), f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            LOGGER(__name__).warning(f"Failed to save peer cache: {e}")
+
+    def _index(self, entry: dict) -> None:
+        old = self.entries.get(entry["id"])
+        if old and old.get("username"):
+            self.usernames.pop(old["username"].lower(), None)
+        self.entries[entry["id"]] = entry
+        if entry.get("username"):
+            self.usernames[entry["username"].lower()] = entry["id"]
+        if entry.get("has_protected_content"):
+            COPY_MODE_CACHE[entry["id"]] = False
+
+    def fresh(self, entry: dict) -> bool:
+        return time() - entry["updated"] < self.ttl
+
+    def get(self, chat: Union[int, str]) -> Optional[dict]:
+        """Fresh entry for a chat id or username, if cached."""
+        if isinstance(chat, str):
+            chat_id = self.usernames.get(chat.lstrip("@").lower())
+        else:
+            chat_id = chat
+        entry = self.entries.get(chat_id)
+        return entry if entry and self.fresh(entry) else None
+
+    async def remember(self, client, chat, is_member: Optional[bool] = None) -> dict:
+        """Record a ``Chat``; the access hash comes from the client's storage."""
+        try:
+            input_peer = await client.resolve_peer(chat.id)
+        except (KeyError, ValueError):
+            input_peer = None
+        entry = {
+            "id": chat.id,
+            "access_hash": getattr(input_peer, "access_hash", 0),
+            "type": peer_type(input_peer),
+            "username": chat.username,
+            "has_protected_content": bool(chat.has_protected_content),
+            "is_member": is_member,
+            "updated": time(),
+        }
+        self._index(entry)
+        return entry
+
+    async def resolve(self, client, chat: Union[int, str]) -> dict:
+        """Cached entry for a chat, calling ``get_chat`` only on a miss."""
+        entry = self.get(chat)
+        if entry is not None:
+            return entry
+
+        resolved = await client.get_chat(chat)
+        try:
+            await client.get_chat_member(resolved.id, "me")
+            is_member = True
+        except UserNotParticipant:
+            is_member = False
+        except Exception:
+            is_member = None
+
+        entry = await self.remember(client, resolved, is_member)
+        self.save()
+        return entry
+
+    async def install(self, client) -> int:
+        """Push every cached access hash into the client's peer storage."""
+        peers = [
+            (
+                entry["id"],
+                entry["access_hash"],
+                entry["type"],
+                # A username past its TTL may belong to someone else by now
+                entry["username"].lower() if entry["username"] and self.fresh(entry) else None,
+                None,
+            )
+            for entry in self.entries.values()
+            if entry.get("type")
+        ]
+        if peers:
+            await client.storage.update_peers(peers)
+        LOGGER(__name__).info(f"Loaded {len(peers)} cached peers")
+        return len(peers)
+
+    async def warm(self, client, limit: int = 0) -> int:
+        """Record every dialog of the user session, it is a member of all of them."""
+        count = 0
+        try:
+            async for dialog in client.get_dialogs(limit=limit):
+                await self.remember(client, dialog.chat, is_member=True)
+                count += 1
+                # Dialogs come in pages; let the handlers run in between
+                await asyncio.sleep(0)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Peer cache warm-up stopped after {count} dialogs: {e}")
+        self.save()
+        LOGGER(__name__).info(f"Peer cache warmed with {count} dialogs")
+        return count
+
+
+peer_cache = PeerCache(PyroConf.PEER_CACHE, PyroConf.PEER_CACHE_TTL)
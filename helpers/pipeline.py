@@ -0,0 +1,173 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, AsyncContextManager, AsyncIterable, Awaitable, Callable, Optional
+
+from logger import LOGGER
+from helpers.files import disk_owner
+
+
+class BatchPipeline:
+    """Bounded-concurrency fetch -> download -> prepare -> upload pipeline.
+
+    ``download`` and ``prepare`` run in worker pools of ``concurrency`` tasks
+    each, connected by bounded queues. ``upload`` runs in a single task that
+    consumes jobs strictly in the order the source yielded them, so output in
+    the chat keeps ascending message IDs even when later posts finish their
+    download first. At most ``concurrency`` jobs are held between fetch and
+    upload at any time, which also bounds the disk used by a batch.
+
+    ``slot``, if given, returns an async context manager that is entered
+    before a job is started and exited once its upload has finished or
+    failed, so a scheduler can hold jobs back.
+
+    Every stage runs with ``disk_owner`` set to the job's place in the
+    upload order, so a download never waits for disk space held by a job
+    that can only be uploaded after it.
+
+    ``release``, if given, is called for every job that never reached
+    ``upload`` because the run was cancelled, so whatever its download
+    holds on disk is freed. Failed stages clean up after themselves.
+    """
+
+    def __init__(
+        self,
+        download: Callable[[Any], Awaitable[Any]],
+        prepare: Callable[[Any], Awaitable[Any]],
+        upload: Callable[[Any], Awaitable[Any]],
+        on_error: Optional[Callable[[Any, Exception], Awaitable[Any]]] = None,
+        concurrency: int = 4,
+        slot: Optional[Callable[[], AsyncContextManager]] = None,
+        release: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.download = download
+        self.prepare = prepare
+        self.upload = upload
+        self.on_error = on_error
+        self.concurrency = max(1, concurrency)
+        self.slot = slot
+        self.release = release
+        self.held = set()
+        # result future -> job, for jobs upload hasn't taken over yet
+        self.pending = {}
+
+        self.completed = 0
+        self.failed = 0
+
+    async def _download_worker(self, download_q, prepare_q):
+        while True:
+            entry = await download_q.get()
+            if entry is None:
+                return
+            job, result, position = entry
+            disk_owner.set((self, position))
+            try:
+                job = self.pending[result] = await self.download(job)
+            except Exception as e:
+                result.set_exception(e)
+                continue
+            await prepare_q.put((job, result, position))
+
+    async def _prepare_worker(self, prepare_q):
+        while True:
+            entry = await prepare_q.get()
+            if entry is None:
+                return
+            job, result, position = entry
+            disk_owner.set((self, position))
+            try:
+                result.set_result(await self.prepare(job))
+            except Exception as e:
+                result.set_exception(e)
+
+    async def _upload_worker(self, order_q):
+        while True:
+            entry = await order_q.get()
+            if entry is None:
+                return
+            job, result, held, position = entry
+            disk_owner.set((self, position))
+            try:
+                try:
+                    prepared = await result
+                finally:
+                    if result.done():
+                        self.pending.pop(result, None)
+                await self.upload(prepared)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                LOGGER(__name__).error(f"Batch job failed: {e}")
+                if self.on_error is not None:
+                    await self.on_error(job, e)
+            finally:
+                self.held.discard(held)
+                await held.aclose()
+
+    def _release(self, job) -> None:
+        if self.release is None:
+            return
+        try:
+            self.release(job)
+        except Exception as e:
+            LOGGER(__name__).error(f"Releasing an unsent batch job failed: {e}")
+
+    async def run(self, source: AsyncIterable[Any]):
+        """Push every job yielded by ``source`` through the stages.
+
+        Returns ``(completed, failed)`` once the last job has been uploaded.
+        """
+        loop = asyncio.get_running_loop()
+        download_q = asyncio.Queue(maxsize=self.concurrency)
+        prepare_q = asyncio.Queue(maxsize=self.concurrency)
+        # Holds one future per job in source order; its size is the in-flight cap
+        order_q = asyncio.Queue(maxsize=self.concurrency)
+
+        downloaders = [
+            asyncio.create_task(self._download_worker(download_q, prepare_q))
+            for _ in range(self.concurrency)
+        ]
+        preparers = [
+            asyncio.create_task(self._prepare_worker(prepare_q))
+            for _ in range(self.concurrency)
+        ]
+        uploader = asyncio.create_task(self._upload_worker(order_q))
+
+        try:
+            position = 0
+            async for job in source:
+                held = AsyncExitStack()
+                self.held.add(held)
+                if self.slot is not None:
+                    await held.enter_async_context(self.slot())
+                result = loop.create_future()
+                self.pending[result] = job
+                await order_q.put((job, result, held, position))
+                await download_q.put((job, result, position))
+                position += 1
+
+            for _ in downloaders:
+                await download_q.put(None)
+            await asyncio.gather(*downloaders)
+            for _ in preparers:
+                await prepare_q.put(None)
+            await asyncio.gather(*preparers)
+            await order_q.put(None)
+            await uploader
+        finally:
+            for task in downloaders + preparers + [uploader]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*downloaders, *preparers, uploader, return_exceptions=True)
+            # Jobs still queued between stages, or cut off mid-stage
+            for job in self.pending.values():
+                self._release(job)
+            self.pending.clear()
+            # Slots of jobs that never finished uploading
+            for held in list(self.held):
+                await held.aclose()
+            self.held.clear()
+
+        return self.completed, self.failed
@@ -0,0 +1,183 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from string import Formatter
+from time import time, monotonic
+
+from logger import LOGGER
+from config import PyroConf
+from helpers.files import get_readable_file_size, get_readable_time
+
+BAR_LENGTH = 20
+FINISHED_BLOCK = "█"
+UNFINISHED_BLOCK = "░"
+# Transfers silent for this long are assumed gone (cancelled, failed, deleted)
+STALE_AFTER = 120
+
+_compiled_templates = {}
+
+
+def compile_template(template: str):
+    """Pre-parse a ``str.format`` template into literal/field pieces.
+
+    Compiled once per distinct template, so a progress tick only joins
+    strings. Unknown placeholders render empty instead of raising.
+    """
+    compiled = _compiled_templates.get(template)
+    if compiled is None:
+        compiled = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if literal:
+                compiled.append((literal, None, None))
+            if field is not None:
+                compiled.append((None, field, spec or ""))
+        _compiled_templates[template] = compiled
+    return compiled
+
+
+def render_template(template: str, values: dict) -> str:
+    parts = []
+    for literal, field, spec in compile_template(template):
+        if field is None:
+            parts.append(literal)
+            continue
+        value = values.get(field, "")
+        try:
+            parts.append(format(value, spec))
+        except (TypeError, ValueError):
+            parts.append(str(value))
+    return "".join(parts)
+
+
+def render_progress(current, total, action, start_time, template) -> str:
+    elapsed = max(time() - start_time, 0.001)
+    percentage = current * 100 / total if total else 0
+    speed = current / elapsed
+    eta = (total - current) / speed if speed and total else 0
+    filled = min(BAR_LENGTH, int(percentage / (100 / BAR_LENGTH)))
+    done = bool(total) and current >= total
+
+    body = render_template(template, {
+        "bar": FINISHED_BLOCK * filled + UNFINISHED_BLOCK * (BAR_LENGTH - filled),
+        "percentage": percentage,
+        "current": get_readable_file_size(current),
+        "total": get_readable_file_size(total),
+        "speed": get_readable_file_size(speed),
+        "elapsed": get_readable_time(elapsed),
+        "eta": get_readable_time(eta),
+        "status_emoji": "✅" if done else "⏳",
+        "status_message": "Completed" if done else "In progress...",
+    })
+    return f"{action}\n\n{body}"
+
+
+class _Transfer:
+    __slots__ = ("message", "action", "start_time", "template", "current", "total",
+                 "updated", "last_sent", "last_edit")
+
+    def __init__(self, message, action, start_time, template):
+        self.message = message
+        self.action = action
+        self.start_time = start_time
+        self.template = template
+        self.current = 0
+        self.total = 0
+        self.updated = monotonic()
+        # (current, total) the message shows now
+        self.last_sent = None
+        self.last_edit = 0.0
+
+
+class ProgressReporter:
+    """Samples transfer counters and coalesces them into few message edits.
+
+    Pyrogram's progress callbacks only record the latest counters. A single
+    ticker renders every tracked progress message each ``interval`` seconds,
+    skips transfers whose counters haven't moved since their last edit, runs
+    at most one edit per chat at a time and spends no more than
+    ``edit_budget`` edits per second overall, least recently edited first.
+    A finished transfer is dropped once its final edit is on its way.
+    """
+
+    def __init__(self, interval: float = 5.0, edit_budget: float = 5.0):
+        self.interval = interval
+        self.edit_budget = edit_budget
+        self.transfers = {}
+        self.busy_chats = set()
+        # Running edits, referenced until done so they aren't collected early
+        self.edits = set()
+        self._ticker = None
+
+    async def progress(self, current, total, action, message, start_time, template):
+        key = (message.chat.id, message.id)
+        transfer = self.transfers.get(key)
+        if transfer is None or transfer.action != action:
+            transfer = self.transfers[key] = _Transfer(message, action, start_time, template)
+        transfer.current = current
+        transfer.total = total
+        transfer.template = template
+        transfer.updated = monotonic()
+
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._run())
+
+    async def _edit(self, key, transfer, text, counters):
+        chat_id = key[0]
+        self.busy_chats.add(chat_id)
+        try:
+            await transfer.message.edit_text(text)
+            transfer.last_sent = counters
+        except Exception as e:
+            LOGGER(__name__).debug(f"Progress edit skipped: {e}")
+            if "MESSAGE_ID_INVALID" in str(e):
+                self.transfers.pop(key, None)
+        finally:
+            self.busy_chats.discard(chat_id)
+
+    def _edit_done(self, task):
+        self.edits.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER(__name__).error(f"Progress edit failed: {task.exception()}")
+
+    async def tick(self):
+        now = monotonic()
+        budget = max(1, int(self.edit_budget * self.interval))
+
+        for key, transfer in sorted(self.transfers.items(), key=lambda item: item[1].last_edit):
+            if now - transfer.updated > STALE_AFTER:
+                self.transfers.pop(key, None)
+                continue
+            counters = (transfer.current, transfer.total)
+            if counters == transfer.last_sent:
+                continue
+            if budget <= 0 or key[0] in self.busy_chats:
+                continue
+            text = render_progress(
+                transfer.current, transfer.total, transfer.action,
+                transfer.start_time, transfer.template
+            )
+            budget -= 1
+            transfer.last_edit = now
+            task = asyncio.create_task(self._edit(key, transfer, text, counters))
+            self.edits.add(task)
+            task.add_done_callback(self._edit_done)
+            if transfer.total and transfer.current >= transfer.total:
+                # Final edit sent, nothing more to report
+                self.transfers.pop(key, None)
+
+    async def _run(self):
+        while self.transfers:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                LOGGER(__name__).error(f"Progress tick failed: {e}")
+
+
+reporter = ProgressReporter(PyroConf.PROGRESS_INTERVAL, PyroConf.PROGRESS_EDIT_BUDGET)
+
+
+async def progress_for_pyrogram(current, total, action, message, start_time, template):
+    """Drop-in replacement for ``Leaves.progress_for_pyrogram``."""
+    await reporter.progress(current, total, action, message, start_time, template)
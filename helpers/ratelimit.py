@@ -0,0 +1,195 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+import functools
+from time import monotonic
+from collections import Counter
+from contextvars import ContextVar
+
+from pyrogram.errors import FloodWait
+
+from logger import LOGGER
+
+# Client method -> bucket it draws tokens from. Message.reply_*, .edit,
+# .delete, .download and .get_media_group all end up in one of these.
+METHOD_BUCKETS = {
+    "get_messages": "get_messages",
+    "get_media_group": "get_messages",
+    "get_chat": "get_messages",
+    "download_media": "download",
+    "send_message": "send",
+    "send_photo": "send",
+    "send_video": "send",
+    "send_audio": "send",
+    "send_document": "send",
+    "send_animation": "send",
+    "send_voice": "send",
+    "send_cached_media": "send",
+    "copy_message": "send",
+    "copy_media_group": "send_media_group",
+    "send_media_group": "send_media_group",
+    "edit_message_text": "edit",
+    "delete_messages": "edit",
+}
+
+# bucket -> (starting rate per second, burst size)
+DEFAULT_RATES = {
+    "get_messages": (5.0, 10),
+    "download": (4.0, 8),
+    "send": (10.0, 20),
+    "send_media_group": (1.0, 3),
+    "edit": (3.0, 5),
+}
+
+# Pyrogram pins its own flood sleep for the calls behind these buckets
+# (get_messages always sleeps, albums up to 60s, file parts up to 30s), so
+# most of their FloodWaits never reach the limiter. Without that signal
+# their rate must not probe upward; it stays capped at the starting rate.
+CAPPED_BUCKETS = {"get_messages", "send_media_group", "download"}
+
+# Progress edits are refreshed on the next tick anyway; retrying a stale one
+# after a FloodWait would only stall the transfer that triggered it.
+NO_RETRY_BUCKETS = {"edit"}
+
+# These upload their file before the send RPC, so retrying the whole call
+# after a FloodWait would upload it again. Their send RPC keeps the client's
+# sleep_threshold, which waits short floods out in place, and a longer one
+# is only recorded on the way to the caller.
+UPLOAD_METHODS = {
+    "send_photo",
+    "send_video",
+    "send_audio",
+    "send_document",
+    "send_animation",
+    "send_voice",
+    "send_media_group",
+}
+
+# Set while a limited call runs, so its RPCs raise FloodWait to the limiter
+_limited = ContextVar("rate_limited", default=False)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to what Telegram allows.
+
+    Every successful call nudges the rate up (additive increase); a FloodWait
+    halves it and blocks the bucket for exactly ``FloodWait.value`` seconds.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, min_rate: float = 0.2, max_rate: float = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.tokens = float(burst)
+        self.updated = monotonic()
+        self.blocked_until = 0.0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + 0.05)
+
+    def on_flood_wait(self, seconds: int):
+        self.flood_waits += 1
+        self.flood_wait_seconds += seconds
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, monotonic() + seconds)
+
+
+class RateLimiter:
+    """Central pacing layer for the Pyrogram calls the bot makes.
+
+    ``install`` swaps the client's methods listed in ``METHOD_BUCKETS`` for
+    wrappers on that instance, so calls made through ``Message`` helpers are
+    covered as well. RPCs made inside a wrapped call raise every FloodWait
+    to the limiter unless Pyrogram pins a threshold for them; uploads (see
+    ``UPLOAD_METHODS``) and all other calls keep the client's
+    ``sleep_threshold``. A wrapped method called from inside another one,
+    such as ``get_messages`` under ``get_media_group``, runs as part of the
+    outer call's token and retries.
+    """
+
+    def __init__(self, rates: dict = None, max_retries: int = 3):
+        self.max_retries = max_retries
+        # Per client method, the buckets only know their group
+        self.flood_waits = Counter()
+        self.flood_wait_seconds = Counter()
+        self.buckets = {
+            name: TokenBucket(name, rate, burst, max_rate=rate if name in CAPPED_BUCKETS else None)
+            for name, (rate, burst) in (rates or DEFAULT_RATES).items()
+        }
+
+    def _wrap(self, func, bucket: TokenBucket, method: str):
+        upload = method in UPLOAD_METHODS
+        retries = 0 if upload or bucket.name in NO_RETRY_BUCKETS else self.max_retries
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _limited.get():
+                # The outer call already paid for this one and retries it
+                return await func(*args, **kwargs)
+            attempt = 0
+            while True:
+                await bucket.acquire()
+                token = _limited.set(not upload)
+                try:
+                    result = await func(*args, **kwargs)
+                except FloodWait as e:
+                    bucket.on_flood_wait(e.value)
+                    self.flood_waits[method] += 1
+                    self.flood_wait_seconds[method] += e.value
+                    LOGGER(__name__).warning(
+                        f"FloodWait of {e.value}s on {method}, {bucket.name} rate now {bucket.rate:.2f}/s"
+                    )
+                    if attempt >= retries:
+                        raise
+                    attempt += 1
+                    continue
+                finally:
+                    _limited.reset(token)
+                bucket.on_success()
+                return result
+
+        return wrapper
+
+    @staticmethod
+    def _wrap_invoke(invoke):
+        @functools.wraps(invoke)
+        async def wrapper(query, *args, **kwargs):
+            # (retries, timeout, sleep_threshold) may also come positionally
+            if len(args) < 3 and kwargs.get("sleep_threshold") is None and _limited.get():
+                # The limiter waits out the exact FloodWait and adapts its rate;
+                # everything else keeps the client's sleep threshold
+                kwargs["sleep_threshold"] = 0
+            return await invoke(query, *args, **kwargs)
+
+        return wrapper
+
+    def install(self, client):
+        client.invoke = self._wrap_invoke(client.invoke)
+        for method, bucket_name in METHOD_BUCKETS.items():
+            original = getattr(client, method)
+            setattr(client, method, self._wrap(original, self.buckets[bucket_name], method))
+        return self
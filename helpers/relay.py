@@ -0,0 +1,213 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+import inspect
+import math
+from hashlib import md5
+
+from pyrogram import raw, types, utils
+from pyrogram.session import Session
+
+from logger import LOGGER
+from helpers.msg import get_file_name
+
+# Telegram's maximum upload part size; stream_media yields 1 MiB chunks
+UPLOAD_PART_SIZE = 512 * 1024
+BIG_FILE_THRESHOLD = 10 * 1024 * 1024
+# Parts uploaded concurrently while the next chunks are still streaming in
+UPLOAD_WORKERS = 4
+# FloodWaits on raw relay calls are slept inside Pyrogram up to this long
+RELAY_SLEEP_THRESHOLD = 60
+
+
+def can_relay(chat_message) -> bool:
+    """Whether the post carries a downloadable file of known size."""
+    media = getattr(chat_message, chat_message.media.value, None)
+    return bool(getattr(media, "file_size", None))
+
+
+async def relay_attributes(chat_message, user, media_type):
+    """Build upload attributes from Telegram's metadata alone.
+
+    The relay never has the whole file on disk, so nothing can be probed;
+    only the source thumbnail (a few KB) is fetched.
+    """
+    media = getattr(chat_message, chat_message.media.value)
+    attrs = {}
+
+    if media_type == "video":
+        attrs.update(
+            duration=media.duration or 0,
+            width=media.width or 0,
+            height=media.height or 0,
+        )
+    elif media_type == "audio":
+        attrs.update(
+            duration=media.duration or 0,
+            performer=media.performer,
+            title=media.title,
+        )
+
+    thumbs = getattr(media, "thumbs", None)
+    if media_type in ("video", "document") and thumbs:
+        try:
+            attrs["thumb"] = await user.download_media(thumbs[0].file_id, in_memory=True)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Failed to download Telegram thumbnail: {e}")
+
+    return attrs
+
+
+def _input_media(media_type, input_file, thumb, media, file_name, attrs):
+    if media_type == "photo":
+        return raw.types.InputMediaUploadedPhoto(file=input_file)
+
+    attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+    if media_type == "video":
+        attributes.insert(0, raw.types.DocumentAttributeVideo(
+            supports_streaming=True,
+            duration=attrs.get("duration", 0),
+            w=attrs.get("width", 0),
+            h=attrs.get("height", 0),
+        ))
+    elif media_type == "audio":
+        attributes.insert(0, raw.types.DocumentAttributeAudio(
+            duration=attrs.get("duration", 0),
+            performer=attrs.get("performer"),
+            title=attrs.get("title"),
+        ))
+
+    return raw.types.InputMediaUploadedDocument(
+        mime_type=getattr(media, "mime_type", None) or "application/octet-stream",
+        file=input_file,
+        thumb=thumb,
+        attributes=attributes,
+    )
+
+
+async def relay_upload(user, bot, chat_message, progress=None, progress_args=(), buffer_chunks=4):
+    """Stream a post's media from the user session straight into a bot upload.
+
+    Chunks from ``user.stream_media`` go through a queue of at most
+    ``buffer_chunks`` MiB and are re-cut into upload parts as they arrive, so
+    the upload starts with the first chunk and nothing touches the disk.
+    Parts are sent on a media session of their own, as ``save_file`` does,
+    so they don't queue behind the bot's other RPCs.
+    Returns the uploaded ``InputFile``, to be sent with ``relay_send``.
+    """
+    media = getattr(chat_message, chat_message.media.value)
+    file_size = media.file_size
+    file_name = getattr(media, "file_name", None) or get_file_name(chat_message.id, chat_message)
+
+    is_big = file_size > BIG_FILE_THRESHOLD
+    total_parts = max(1, math.ceil(file_size / UPLOAD_PART_SIZE))
+    file_id = bot.rnd_id()
+    md5_sum = md5() if not is_big else None
+
+    buffer = asyncio.Queue(maxsize=max(1, buffer_chunks))
+    workers = asyncio.Semaphore(UPLOAD_WORKERS)
+    uploads = set()
+    uploaded = 0
+
+    async def stream():
+        try:
+            async for chunk in user.stream_media(chat_message):
+                await buffer.put(chunk)
+            await buffer.put(None)
+        except Exception as e:
+            await buffer.put(e)
+
+    async def save_part(part, data):
+        nonlocal uploaded
+        try:
+            if is_big:
+                rpc = raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id, file_part=part, file_total_parts=total_parts, bytes=data
+                )
+            else:
+                rpc = raw.functions.upload.SaveFilePart(file_id=file_id, file_part=part, bytes=data)
+            await session.invoke(rpc, sleep_threshold=RELAY_SLEEP_THRESHOLD)
+            uploaded += len(data)
+            if progress:
+                result = progress(min(uploaded, file_size), file_size, *progress_args)
+                if inspect.isawaitable(result):
+                    await result
+        finally:
+            workers.release()
+
+    async def queue_part(part, data):
+        if md5_sum is not None:
+            md5_sum.update(data)
+        await workers.acquire()
+        for task in [t for t in uploads if t.done()]:
+            uploads.discard(task)
+            task.result()
+        uploads.add(asyncio.create_task(save_part(part, data)))
+
+    session = Session(
+        bot, await bot.storage.dc_id(), await bot.storage.auth_key(),
+        await bot.storage.test_mode(), is_media=True
+    )
+    await session.start()
+    producer = asyncio.create_task(stream())
+    try:
+        part = 0
+        pending = b""
+        while True:
+            item = await buffer.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                break
+            pending += item
+            while len(pending) >= UPLOAD_PART_SIZE:
+                await queue_part(part, pending[:UPLOAD_PART_SIZE])
+                pending = pending[UPLOAD_PART_SIZE:]
+                part += 1
+        if pending or part == 0:
+            await queue_part(part, pending)
+        await asyncio.gather(*uploads)
+    finally:
+        producer.cancel()
+        for task in uploads:
+            task.cancel()
+        await asyncio.gather(producer, *uploads, return_exceptions=True)
+        await session.stop()
+
+    LOGGER(__name__).info(f"Relayed media: {file_name} ({file_size} bytes)")
+
+    if is_big:
+        return raw.types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+    return raw.types.InputFile(
+        id=file_id, parts=total_parts, name=file_name, md5_checksum=md5_sum.hexdigest()
+    )
+
+
+async def relay_send(bot, chat_message, chat_id, media_type, input_file, caption, media_attrs):
+    """Send a file uploaded by ``relay_upload``. Returns the sent :obj:`~pyrogram.types.Message`."""
+    media = getattr(chat_message, chat_message.media.value)
+    file_name = input_file.name
+
+    thumb = media_attrs.get("thumb")
+    if thumb is not None:
+        thumb = await bot.save_file(thumb)
+
+    r = await bot.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await bot.resolve_peer(chat_id),
+            media=_input_media(media_type, input_file, thumb, media, file_name, media_attrs),
+            random_id=bot.rnd_id(),
+            **await utils.parse_text_entities(bot, caption or "", None, None)
+        ),
+        sleep_threshold=RELAY_SLEEP_THRESHOLD,
+    )
+
+    for i in r.updates:
+        if isinstance(i, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                bot, i.message,
+                {i.id: i for i in r.users},
+                {i.id: i for i in r.chats},
+            )
+
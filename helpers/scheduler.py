@@ -0,0 +1,141 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from itertools import count
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from logger import LOGGER
+from config import PyroConf
+
+# Lanes are served strictly in order: single /dl posts before bulk batches
+INTERACTIVE = 0
+BULK = 1
+
+
+class _Waiter:
+    __slots__ = ("owner", "lane", "start", "finish", "seq", "future")
+
+    def __init__(self, owner, lane, start, finish, seq, future):
+        self.owner = owner
+        self.lane = lane
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future = future
+
+    @property
+    def key(self):
+        return self.lane, self.finish, self.seq
+
+
+class FairScheduler:
+    """Admission control for post jobs across all users.
+
+    At most ``capacity`` jobs run at once, and at most ``per_user`` of them
+    belong to one user. Waiting jobs are ordered by lane first, then by
+    weighted fair queueing: each user's jobs get consecutive virtual finish
+    tags, so a user with 200 queued posts is interleaved with everyone else
+    instead of going first.
+    """
+
+    def __init__(self, capacity: int = 8, per_user: int = 4):
+        self.capacity = max(1, capacity)
+        self.per_user = max(1, per_user)
+        self.active = 0
+        self.running = Counter()  # owner -> slots held
+        self.waiters = []
+        self.vtime = 0.0
+        self.finish_tags = {}  # owner -> virtual finish of its last job
+        self.seq = count()
+
+    def _eligible(self, owner) -> bool:
+        return self.running[owner] < self.per_user
+
+    def _grant(self, owner, start: float) -> None:
+        self.active += 1
+        self.running[owner] += 1
+        self.vtime = max(self.vtime, start)
+
+    def position(self, waiter: _Waiter) -> int:
+        """1-based place of a waiter in the queue."""
+        return 1 + sum(1 for other in self.waiters if other.key < waiter.key)
+
+    async def acquire(
+        self,
+        owner,
+        lane: int = BULK,
+        weight: float = 1.0,
+        on_queued: Optional[Callable[[int], Awaitable]] = None,
+    ) -> None:
+        start = max(self.vtime, self.finish_tags.get(owner, 0.0))
+        finish = self.finish_tags[owner] = start + 1 / weight
+
+        if self.active < self.capacity and self._eligible(owner):
+            self._grant(owner, start)
+            return
+
+        waiter = _Waiter(owner, lane, start, finish, next(self.seq),
+                         asyncio.get_running_loop().create_future())
+        self.waiters.append(waiter)
+        try:
+            if on_queued is not None:
+                try:
+                    await on_queued(self.position(waiter))
+                except Exception as e:
+                    LOGGER(__name__).warning(f"Queue notice failed: {e}")
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancel arrived, hand the slot back
+                self.release(owner)
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            raise
+
+    def release(self, owner) -> None:
+        self.active -= 1
+        self.running[owner] -= 1
+        if self.running[owner] <= 0:
+            del self.running[owner]
+            if not any(waiter.owner == owner for waiter in self.waiters) \
+                    and self.finish_tags.get(owner, 0.0) <= self.vtime:
+                self.finish_tags.pop(owner, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.active < self.capacity:
+            eligible = [waiter for waiter in self.waiters if self._eligible(waiter.owner)]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: w.key)
+            self.waiters.remove(waiter)
+            if waiter.future.cancelled():
+                continue
+            self._grant(waiter.owner, waiter.start)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, owner, lane: int = BULK, weight: float = 1.0, on_queued=None):
+        """Hold one job slot for the duration of the ``async with`` block."""
+        await self.acquire(owner, lane, weight, on_queued)
+        try:
+            yield
+        finally:
+            self.release(owner)
+
+    def stats(self) -> dict:
+        lanes = Counter(waiter.lane for waiter in self.waiters)
+        return {
+            "active": self.active,
+            "capacity": self.capacity,
+            "queued": len(self.waiters),
+            "queued_interactive": lanes[INTERACTIVE],
+            "queued_bulk": lanes[BULK],
+            "users": len(self.running),
+        }
+
+
+scheduler = FairScheduler(PyroConf.MAX_ACTIVE_JOBS, PyroConf.USER_JOB_QUOTA)
@@ -0,0 +1,122 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import math
+import asyncio
+import inspect
+
+from logger import LOGGER
+from config import PyroConf
+from helpers.fileid_cache import get_media
+from helpers.files import disk_ledger, memory_budget
+
+# stream_media always works in 1 MiB chunks
+CHUNK_SIZE = 1024 * 1024
+
+
+async def download_segmented(client, chat_message, file_path, segments=4, progress=None, progress_args=()):
+    """Download a large file as several byte ranges at once.
+
+    Every range is fetched by its own ``stream_media`` call, which opens a
+    separate media-DC connection, and written straight to its offset in a
+    preallocated ``.temp`` file that is renamed into place when all ranges
+    are done.
+    """
+    file_size = get_media(chat_message).file_size
+    total_chunks = math.ceil(file_size / CHUNK_SIZE)
+    per_segment = math.ceil(total_chunks / max(1, segments))
+    temp_path = file_path + ".temp"
+    downloaded = 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(temp_path, "wb") as f:
+        f.truncate(file_size)
+    fd = os.open(temp_path, os.O_WRONLY)
+
+    async def fetch(first_chunk, count):
+        nonlocal downloaded
+        offset = first_chunk * CHUNK_SIZE
+        async for chunk in client.stream_media(chat_message, limit=count, offset=first_chunk):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            downloaded += len(chunk)
+            if progress:
+                result = progress(min(downloaded, file_size), file_size, *progress_args)
+                if inspect.isawaitable(result):
+                    await result
+
+    tasks = [
+        asyncio.create_task(fetch(first, min(per_segment, total_chunks - first)))
+        for first in range(0, total_chunks, per_segment)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    os.close(fd)
+
+    if downloaded != file_size:
+        os.remove(temp_path)
+        raise IOError(f"Segmented download incomplete: {downloaded} of {file_size} bytes")
+
+    os.replace(temp_path, file_path)
+    LOGGER(__name__).info(f"Downloaded {file_path} in {len(tasks)} segments")
+    return file_path
+
+
+async def download_media_file(client, chat_message, file_name, progress=None, progress_args=()):
+    """Download a message's media, switching to segmented mode for big files.
+
+    Files of at least ``SEGMENTED_DOWNLOAD_THRESHOLD_MB`` go through
+    ``download_segmented``; everything else uses Pyrogram's own download.
+    The file's size is reserved in the disk ledger first. Files up to
+    ``IN_MEMORY_THRESHOLD_MB`` are kept in a ``BytesIO`` instead while the
+    memory budget allows it, and never touch the disk.
+    """
+    media = get_media(chat_message)
+    file_size = getattr(media, "file_size", 0) or 0
+
+    if file_size and file_size <= PyroConf.IN_MEMORY_THRESHOLD_MB * 1024 * 1024 \
+            and memory_budget.try_reserve(file_size):
+        try:
+            buffer = await chat_message.download(
+                file_name=file_name or "",
+                in_memory=True,
+                progress=progress,
+                progress_args=progress_args,
+            )
+        except BaseException:
+            memory_budget.cancel(file_size)
+            raise
+        if buffer is None:
+            memory_budget.cancel(file_size)
+        else:
+            memory_budget.attach(buffer, file_size)
+        return buffer
+
+    # Released by cleanup_download, or right here if the download fails
+    await disk_ledger.reserve(file_name, file_size)
+    try:
+        if file_name and PyroConf.DOWNLOAD_SEGMENTS > 1 \
+                and file_size >= PyroConf.SEGMENTED_DOWNLOAD_THRESHOLD_MB * 1024 * 1024:
+            return await download_segmented(
+                client, chat_message, file_name, PyroConf.DOWNLOAD_SEGMENTS, progress, progress_args
+            )
+
+        path = await chat_message.download(
+            file_name=file_name or "",
+            progress=progress,
+            progress_args=progress_args,
+        )
+        if path:
+            disk_ledger.move(file_name, path)
+        return path
+    except BaseException:
+        disk_ledger.release(file_name)
+        raise
@@ -0,0 +1,107 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import shutil
+import asyncio
+from time import monotonic
+from collections import deque
+from typing import NamedTuple, Optional
+
+import psutil
+
+from logger import LOGGER
+from config import PyroConf
+
+# Longest window /stats reports rates over
+WINDOW_SECONDS = 15 * 60
+
+
+class Sample(NamedTuple):
+    at: float
+    cpu: float
+    memory: float
+    rss: int
+    disk_total: int
+    disk_used: int
+    disk_free: int
+    disk_percent: float
+    bytes_sent: int
+    bytes_recv: int
+
+
+class SystemSampler:
+    """Rolling window of CPU, memory, disk and network readings.
+
+    A background task takes one sample every ``interval`` seconds in a
+    worker thread, so readers like /stats only look at the last sample and
+    never wait on psutil. CPU is the average since the previous sample.
+    """
+
+    def __init__(self, interval: float = 5, path: str = "."):
+        self.interval = max(1.0, interval)
+        self.path = path
+        self.samples = deque(maxlen=int(WINDOW_SECONDS / self.interval) + 2)
+        self.process = psutil.Process(os.getpid())
+        self._task = None
+
+    def sample(self) -> Sample:
+        disk = shutil.disk_usage(self.path)
+        net = psutil.net_io_counters()
+        sample = Sample(
+            at=monotonic(),
+            cpu=psutil.cpu_percent(interval=None),
+            memory=psutil.virtual_memory().percent,
+            rss=self.process.memory_info().rss,
+            disk_total=disk.total,
+            disk_used=disk.used,
+            disk_free=disk.free,
+            disk_percent=round(disk.used * 100 / disk.total, 1) if disk.total else 0.0,
+            bytes_sent=net.bytes_sent,
+            bytes_recv=net.bytes_recv,
+        )
+        self.samples.append(sample)
+        return sample
+
+    @property
+    def latest(self) -> Optional[Sample]:
+        return self.samples[-1] if self.samples else None
+
+    def rates(self, seconds: float):
+        """Average ``(sent, recv)`` bytes per second over the last ``seconds``.
+
+        Uses whatever history exists if the bot has been up for less than
+        that; ``None`` until there are two samples.
+        """
+        if len(self.samples) < 2:
+            return None
+        latest = self.samples[-1]
+        start = self.samples[0]
+        for sample in reversed(self.samples):
+            start = sample
+            if latest.at - sample.at >= seconds:
+                break
+        elapsed = latest.at - start.at
+        if elapsed <= 0:
+            return None
+        return (
+            max(0, latest.bytes_sent - start.bytes_sent) / elapsed,
+            max(0, latest.bytes_recv - start.bytes_recv) / elapsed,
+        )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                LOGGER(__name__).warning(f"System sample failed: {e}")
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            # First reading right away, so /stats has numbers from the start
+            await asyncio.to_thread(self.sample)
+            self._task = asyncio.create_task(self._run())
+
+
+system_sampler = SystemSampler(PyroConf.SYSSTATS_INTERVAL)
@@ -0,0 +1,149 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import json
+import asyncio
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+from logger import LOGGER
+from config import PyroConf
+
+THUMB_CACHE_DIR = os.path.join(os.getcwd(), "default_thumbs", "cache")
+
+
+class ThumbnailCache:
+    """Content-addressed, size-bounded store of upload thumbnails.
+
+    Keys are ``file_unique_id`` values: the Telegram thumbnail's own for
+    downloaded thumbs, the video's for generated frames. Every ``<key>.jpg``
+    has a ``<key>.json`` sidecar with its dimensions. Entries are created
+    under a per-key lock, renamed into place atomically and evicted least
+    recently used once the total goes over ``max_bytes``. Paths handed out
+    by ``get_or_create`` are pinned until ``release`` so eviction never
+    removes a thumbnail an upload is about to read.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> size in bytes, least recent first
+        self.total = 0
+        self.pins = Counter()
+        self.locks = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                # Left over from an interrupted write
+                os.remove(path)
+            elif name.endswith(".jpg"):
+                st = os.stat(path)
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total += size
+        self.evict()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.jpg")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _hit(self, key: str) -> Optional[Tuple[str, int, int]]:
+        path = self.path(key)
+        if key not in self.entries:
+            return None
+        if not os.path.exists(path):
+            self.total -= self.entries.pop(key)
+            return None
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        self.entries.move_to_end(key)
+        # mtime carries the LRU order across restarts
+        os.utime(path)
+        return path, meta.get("width", 0), meta.get("height", 0)
+
+    def _store(self, key: str, temp_path: str, width: int, height: int) -> str:
+        path = self.path(key)
+        meta_temp = self._meta_path(key) + ".tmp"
+        with open(meta_temp, "w") as f:
+            json.dump({"width": width, "height": height}, f)
+        os.replace(meta_temp, self._meta_path(key))
+        os.replace(temp_path, path)
+
+        size = os.path.getsize(path)
+        self.total += size - self.entries.pop(key, 0)
+        self.entries[key] = size
+        return path
+
+    async def get_or_create(self, key: str, create) -> Optional[Tuple[str, int, int]]:
+        """Cached ``(path, width, height)`` for ``key``, creating it on a miss.
+
+        ``create(temp_path)`` writes the image to ``temp_path`` and returns its
+        ``(width, height)``, or ``None`` if there is no thumbnail to cache.
+        The returned path is pinned; hand it back with ``release``.
+        """
+        lock = self.locks.setdefault(key, [asyncio.Lock(), 0])
+        lock[1] += 1
+        try:
+            async with lock[0]:
+                hit = self._hit(key)
+                if hit is None:
+                    temp_path = self.path(key) + ".tmp"
+                    try:
+                        dims = await create(temp_path)
+                        if dims is None or not os.path.exists(temp_path):
+                            return None
+                        self._store(key, temp_path, *dims)
+                    finally:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                    hit = self._hit(key)
+                self.pins[hit[0]] += 1
+                self.evict()
+                return hit
+        finally:
+            lock[1] -= 1
+            if not lock[1]:
+                self.locks.pop(key, None)
+
+    def release(self, path: str) -> bool:
+        """Unpin a path from ``get_or_create``. False if the cache doesn't own it."""
+        if not self.pins.get(path):
+            return False
+        self.pins[path] -= 1
+        if not self.pins[path]:
+            del self.pins[path]
+        return True
+
+    def evict(self) -> None:
+        for key in list(self.entries):
+            if self.total <= self.max_bytes:
+                break
+            path = self.path(key)
+            if self.pins.get(path):
+                continue
+            self.total -= self.entries.pop(key)
+            for stale in (path, self._meta_path(key)):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            LOGGER(__name__).debug(f"Evicted cached thumbnail {key}")
+
+
+thumbnail_cache = (
+    ThumbnailCache(THUMB_CACHE_DIR, PyroConf.THUMBNAIL_CACHE_MB * 1024 * 1024)
+    if PyroConf.THUMBNAIL_CACHE_MB > 0
+    else None
+)
@@ -0,0 +1,127 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import asyncio
+from time import monotonic
+from asyncio.subprocess import PIPE
+
+from logger import LOGGER
+from config import PyroConf
+from helpers.metrics import timed
+
+FFMPEG_TIMEOUT = 60
+
+
+def pool_size(workers: int = 0):
+    """Concurrent ffmpeg jobs and threads per job for this machine.
+
+    ``workers`` of 0 means one job per two cores. The cores are split evenly
+    between the jobs, so a full pool never asks for more threads than exist.
+    """
+    cores = os.cpu_count() or 1
+    workers = workers if workers > 0 else max(1, cores // 2)
+    return workers, max(1, cores // workers)
+
+
+class ThumbnailPool:
+    """Bounded pool of ffmpeg frame extractions.
+
+    Jobs beyond ``workers`` wait their turn instead of starting another
+    ffmpeg. By default the ``thumbnail`` filter picks a representative frame
+    after the seek point; ``fast`` drops it and decodes keyframes only,
+    taking the first one.
+    """
+
+    def __init__(self, workers: int = 0, fast: bool = False):
+        self.workers, self.threads = pool_size(workers)
+        self.fast = fast
+        self.slots = asyncio.Semaphore(self.workers)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.run_seconds = 0.0
+
+    def command(self, video_file, seek, output):
+        # The thumbnail filter needs every frame, not just keyframes
+        decode = ["-skip_frame", "nokey"] if self.fast else []
+        filters = [] if self.fast else ["-vf", "thumbnail"]
+        return [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            *decode,
+            "-ss", f"{seek}",
+            "-i", video_file,
+            *filters,
+            "-q:v", "1",
+            "-frames:v", "1",
+            "-threads", f"{self.threads}",
+            output,
+        ]
+
+    async def extract(self, video_file, seek, output):
+        """Write one frame of ``video_file`` near ``seek`` seconds to ``output``."""
+        queued_at = monotonic()
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+
+        waited = monotonic() - queued_at
+        self.wait_seconds += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.running += 1
+        started = monotonic()
+        try:
+            with timed("ffmpeg"):
+                proc = await asyncio.create_subprocess_exec(
+                    *self.command(video_file, seek, output), stdout=PIPE, stderr=PIPE
+                )
+                try:
+                    _, err = await asyncio.wait_for(proc.communicate(), timeout=FFMPEG_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # Also on /killall or shutdown, or ffmpeg would keep running
+                    # after its slot is released
+                    if proc.returncode is None:
+                        proc.kill()
+                    await proc.wait()
+                    raise
+            if proc.returncode != 0 or not os.path.exists(output):
+                LOGGER(__name__).error(
+                    f"Error while extracting thumbnail from video. Name: {video_file} "
+                    f"stderr: {err.decode('utf-8', 'replace').strip()}"
+                )
+                self.failed += 1
+                return None
+            self.completed += 1
+            return output
+        except Exception as e:
+            LOGGER(__name__).error(
+                f"Error while extracting thumbnail from video. Name: {video_file}. Error: {e!r}"
+            )
+            self.failed += 1
+            return None
+        finally:
+            self.run_seconds += monotonic() - started
+            self.running -= 1
+            self.slots.release()
+
+    def stats(self) -> dict:
+        done = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "threads": self.threads,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait": self.wait_seconds / done if done else 0.0,
+            "max_wait": self.max_wait,
+            "avg_run": self.run_seconds / done if done else 0.0,
+        }
+
+
+thumbnail_pool = ThumbnailPool(PyroConf.THUMBNAIL_WORKERS, PyroConf.THUMBNAIL_FAST_MODE)
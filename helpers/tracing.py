@@ -0,0 +1,186 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import json
+import functools
+from weakref import WeakValueDictionary
+from time import monotonic, time
+from itertools import count
+from collections import deque
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import List, Optional
+
+from logger import LOGGER
+from config import PyroConf
+
+_current = ContextVar("trace", default=None)
+_depth = ContextVar("trace_depth", default=0)
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "depth", "error")
+
+    def __init__(self, name: str, start: float, depth: int):
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.depth = depth
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "start": round(self.start, 4),
+            "duration": round(self.duration or 0.0, 4),
+            "depth": self.depth,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Timed spans of one post job, offsets relative to its start."""
+
+    def __init__(self, trace_id: int, label: str, **attrs):
+        self.id = trace_id
+        self.label = label
+        self.attrs = attrs
+        self.started_at = time()
+        self.started = monotonic()
+        self.duration = None
+        self.error = None
+        self.spans: List[Span] = []
+
+    def stage(self, name: str) -> float:
+        """Total seconds spent in spans called ``name``."""
+        return sum(span.duration or 0.0 for span in self.spans if span.name == name)
+
+    def slowest_stage(self) -> Optional[Span]:
+        top = [span for span in self.spans if span.depth == 0 and span.duration is not None]
+        return max(top, key=lambda span: span.duration, default=None)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "attrs": self.attrs,
+            "started_at": self.started_at,
+            "duration": round(self.duration or 0.0, 4),
+            "error": self.error,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+    def waterfall(self, width: int = 20) -> str:
+        total = self.duration if self.duration is not None else monotonic() - self.started
+        scale = width / total if total > 0 else 0
+        lines = []
+        for span in self.spans:
+            duration = span.duration if span.duration is not None else total - span.start
+            offset = min(width - 1, int(span.start * scale))
+            bar = max(1, int(round(duration * scale)))
+            name = ("  " * span.depth + span.name)[:22]
+            mark = " !" if span.error else ""
+            lines.append(
+                f"{name:<22} {' ' * offset}{'█' * bar:<{width - offset}} {duration:7.2f}s{mark}"
+            )
+        return "\n".join(lines)
+
+
+class Tracer:
+    """Bounded ring buffer of finished job traces.
+
+    Spans attach to the trace made current with ``activate``, so stage code
+    only needs ``span(name)``. With ``export_path`` every finished trace is
+    also appended to that file as one JSON line.
+    """
+
+    def __init__(self, capacity: int = 500, export_path: str = ""):
+        self.traces = deque(maxlen=max(1, capacity))
+        # Running traces, dropped with their job if it never finishes
+        self.active = WeakValueDictionary()
+        self.export_path = export_path
+        self.ids = count(1)
+
+    def start(self, label: str, **attrs) -> Trace:
+        trace = Trace(next(self.ids), label, **attrs)
+        self.active[trace.id] = trace
+        return trace
+
+    def finish(self, trace: Optional[Trace], error: Optional[BaseException] = None) -> None:
+        if trace is None or trace.duration is not None:
+            return
+        trace.duration = monotonic() - trace.started
+        if error is not None:
+            trace.error = f"{type(error).__name__}: {error}"
+        self.active.pop(trace.id, None)
+        self.traces.append(trace)
+        if self.export_path:
+            try:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                LOGGER(__name__).warning(f"Could not export trace {trace.id}: {e}")
+
+    @contextmanager
+    def activate(self, trace: Optional[Trace]):
+        """Make ``trace`` the one spans in this task are recorded on."""
+        token = _current.set(trace)
+        depth = _depth.set(0)
+        try:
+            yield trace
+        finally:
+            _depth.reset(depth)
+            _current.reset(token)
+
+    def get(self, trace_id: int) -> Optional[Trace]:
+        if trace_id in self.active:
+            return self.active[trace_id]
+        return next((trace for trace in self.traces if trace.id == trace_id), None)
+
+    def latest(self) -> Optional[Trace]:
+        return self.traces[-1] if self.traces else None
+
+    def slowest(self, limit: int = 10, stage: Optional[str] = None) -> List[Trace]:
+        """Worst finished traces, by total time or by time in one stage."""
+        if stage:
+            key = lambda trace: trace.stage(stage)
+            candidates = [trace for trace in self.traces if trace.stage(stage) > 0]
+        else:
+            key = lambda trace: trace.duration
+            candidates = list(self.traces)
+        return sorted(candidates, key=key, reverse=True)[:limit]
+
+
+@contextmanager
+def span(name: str):
+    """Time a block on the current trace; a no-op outside of one."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    depth = _depth.get()
+    entry = Span(name, monotonic() - trace.started, depth)
+    trace.spans.append(entry)
+    token = _depth.set(depth + 1)
+    try:
+        yield
+    except BaseException as e:
+        entry.error = type(e).__name__
+        raise
+    finally:
+        _depth.reset(token)
+        entry.duration = monotonic() - trace.started - entry.start
+
+
+def traced(name: str):
+    """Decorator form of ``span`` for coroutine functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+tracer = Tracer(PyroConf.TRACE_BUFFER, PyroConf.TRACE_EXPORT)
@@ -3,17 +3,16 @@
 
 import os
 import json
+import asyncio
+from dataclasses import dataclass, field
 from json import JSONDecodeError
 from time import time
 from PIL import Image
-from logger import LOGGER, logger
-from typing import Optional, Union, Any
+from logger import LOGGER
+from typing import Optional, Union, Any, BinaryIO
 from asyncio.subprocess import PIPE
-from asyncio import create_subprocess_exec, create_subprocess_shell, wait_for
+from asyncio import create_subprocess_exec, create_subprocess_shell
 
-from pyleaves import Leaves
-from pyrogram.parser import Parser
-from pyrogram.utils import get_channel_id
 from pyrogram.types import (
     InputMediaPhoto,
     InputMediaVideo,
@@ -24,14 +23,47 @@ from pyrogram.types import (
 )
 
 from helpers.files import (
+    get_download_path,
+    post_folder,
     fileSizeLimit,
-    cleanup_download
+    cleanup_download,
+    media_size
 )
 
 from helpers.msg import (
+    get_file_name,
     get_parsed_msg
 )
 
+from helpers.relay import (
+    can_relay,
+    relay_attributes,
+    relay_send,
+    relay_upload
+)
+
+from helpers.fileid_cache import file_id_cache, get_media
+
+from helpers.segmented import download_media_file
+
+from helpers.thumbnail import thumbnail_pool
+
+from helpers.thumbcache import thumbnail_cache
+
+from helpers.janitor import janitor
+
+from helpers import metrics
+from helpers.tracing import span, traced
+
+from helpers.progress import progress_for_pyrogram
+
+from helpers.fastpath import (
+    can_copy,
+    copy_post
+)
+
+from config import PyroConf
+
 # VIDEO_THUMB_LOCATION = os.path.join(os.getcwd(), "assets", "video_thumb.jpg")
 CUSTOM_THUMB_DIR = os.path.join(os.getcwd(), "default_thumbs")
 os.makedirs(CUSTOM_THUMB_DIR, exist_ok=True)  # Create directory if it doesn't exist
@@ -51,7 +83,10 @@ memory_template = PROGRESS_BAR
 
 
 def get_active_template():
-    """Get the current progress bar template (prefers in-memory)."""
+    """Get the current progress bar template (prefers in-memory).
+
+    Rendering compiles each distinct template once, see helpers.progress.
+    """
     return memory_template or load_template_from_file()
 
 
@@ -99,38 +134,96 @@ async def cmd_exec(cmd, shell=False):
     return stdout, stderr, proc.returncode
 
 
-async def get_media_info(path):
+# Probe results keyed by (path, mtime, size); a rewritten file gets a new key
+PROBE_CACHE_SIZE = 256
+_probe_cache = {}
+
+EMPTY_MEDIA_INFO = {
+    "duration": 0,
+    "width": 0,
+    "height": 0,
+    "codec": None,
+    "artist": None,
+    "title": None,
+}
+
+
+def _parse_probe(output: str) -> dict:
+    data = json.loads(output)
+    fields = data.get("format") or {}
+    streams = data.get("streams") or []
+    video = next((st for st in streams if st.get("codec_type") == "video"), {})
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), {})
+
+    tags = {k.lower(): v for k, v in (fields.get("tags") or {}).items()}
+    duration = fields.get("duration") or video.get("duration") or audio.get("duration") or 0
+
+    return {
+        "duration": round(float(duration)),
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "codec": video.get("codec_name") or audio.get("codec_name"),
+        "artist": tags.get("artist"),
+        "title": tags.get("title"),
+    }
+
+
+async def _run_probe(path) -> dict:
     try:
-        result = await cmd_exec(
-            [
-                "ffprobe",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-print_format",
-                "json",
-                "-show_format",
-                path,
-            ]
-        )
+        with metrics.timed("ffprobe"):
+            result = await cmd_exec(
+                [
+                    "ffprobe",
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-print_format",
+                    "json",
+                    "-show_format",
+                    "-show_streams",
+                    path,
+                ]
+            )
     except Exception as e:
         LOGGER(__name__).error(
             f"Get Media Info: {e}. Mostly File not found! - File: {path}"
         )
-        return 0, None, None
+        return dict(EMPTY_MEDIA_INFO)
     if result[0] and result[2] == 0:
-        fields = eval(result[0]).get("format")
-        if fields is None:
-            LOGGER(__name__).info(f"get_media_info: {result}")
-            return 0, None, None
-        duration = round(float(fields.get("duration", 0)))
-        tags = fields.get("tags", {})
-        artist = tags.get("artist") or tags.get("ARTIST") or tags.get("Artist")
-        title = tags.get("title") or tags.get("TITLE") or tags.get("Title")
-        return duration, artist, title
-    return 0, None, None
+        try:
+            return _parse_probe(result[0])
+        except (JSONDecodeError, TypeError, ValueError) as e:
+            LOGGER(__name__).info(f"get_media_info: {e} {result}")
+    return dict(EMPTY_MEDIA_INFO)
 
 
+@traced("get_media_info")
+async def probe_media(path) -> dict:
+    """Run ffprobe once per file version.
+
+    Returns duration, width, height, codec and artist/title tags. Results are
+    memoised by path and mtime, and concurrent callers share one subprocess.
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return dict(EMPTY_MEDIA_INFO)
+
+    key = (path, st.st_mtime_ns, st.st_size)
+    probe = _probe_cache.get(key)
+    if probe is None:
+        probe = _probe_cache[key] = asyncio.ensure_future(_run_probe(path))
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.pop(next(iter(_probe_cache)))
+    return await asyncio.shield(probe)
+
+
+async def get_media_info(path):
+    info = await probe_media(path)
+    return info["duration"], info["artist"], info["title"]
+
+
+@traced("get_video_thumbnail")
 async def get_video_thumbnail(video_file, duration):
     os.makedirs(os.path.join(os.getcwd(), "assets"), exist_ok=True)
     # Generate a unique filename based on the video filename and timestamp
@@ -142,39 +235,88 @@ async def get_video_thumbnail(video_file, duration):
     if duration == 0:
         duration = 3
     duration = duration // 2
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-ss",
-        f"{duration}",
-        "-i",
-        video_file,
-        "-vf",
-        "thumbnail",
-        "-q:v",
-        "1",
-        "-frames:v",
-        "1",
-        "-threads",
-        f"{os.cpu_count() // 2}",
-        thumb_location,  # Use the unique path
-    ]
+    return await thumbnail_pool.extract(video_file, duration, thumb_location)
+
+
+@traced("fetch_telegram_thumb")
+async def fetch_telegram_thumb(user, media, thumb_path):
+    """Download the Telegram thumbnail of ``media``.
+
+    Goes through the thumbnail cache when it is enabled, ``thumb_path`` is
+    only used without it. Returns ``(path, width, height)`` or ``None``.
+    """
+    thumbs = getattr(media, "thumbs", None)
+    if not thumbs:
+        return None
+    source = thumbs[0]
+
+    async def download(path):
+        result = await user.download_media(source.file_id, file_name=path)
+        if not result or not os.path.exists(result):
+            return None
+        return source.width or 0, source.height or 0
+
     try:
-        _, err, code = await wait_for(cmd_exec(cmd), timeout=60)
-        if code != 0 or not os.path.exists(thumb_location):
-            logger.error(
-                f"Error while extracting thumbnail from video. Name: {video_file} stderr: {err}"
-            )
+        if thumbnail_cache is not None:
+            return await thumbnail_cache.get_or_create(source.file_unique_id, download)
+        dims = await download(thumb_path)
+        if not dims:
             return None
-    except:
-        logger.error(
-            f"Error while extracting thumbnail from video. Name: {video_file}. Error: Timeout some issues with ffmpeg with specific arch!"
-        )
+        janitor.track(thumb_path)
+        return (thumb_path, *dims)
+    except Exception as e:
+        LOGGER(__name__).warning(f"Failed to download Telegram thumbnail: {e}")
+        if os.path.exists(thumb_path):
+            os.remove(thumb_path)
+        return None
+
+
+async def generate_video_thumb(media, media_path, duration, width=0, height=0):
+    """Extract a frame from a downloaded video as its thumbnail.
+
+    Cached frames are keyed by the video's ``file_unique_id``, so reposts of
+    the same video skip ffmpeg. The frame has the video's size, so PIL only
+    opens it when ``width`` and ``height`` aren't already known from the
+    probe or Telegram. Returns ``(path, width, height)`` or ``None``.
+    """
+    def frame_size(frame):
+        if width and height:
+            return width, height
+        with Image.open(frame) as img:
+            return img.size
+
+    async def generate(path):
+        frame = await get_video_thumbnail(media_path, duration)
+        if not frame or frame == "none":
+            return None
+        dims = frame_size(frame)
+        if path != frame:
+            os.replace(frame, path)
+        return dims
+
+    if not isinstance(media_path, str):
+        # ffmpeg needs a file, in-memory downloads go without a generated frame
+        return None
+
+    if thumbnail_cache is not None and getattr(media, "file_unique_id", None):
+        return await thumbnail_cache.get_or_create(f"frame_{media.file_unique_id}", generate)
+
+    frame = await get_video_thumbnail(media_path, duration)
+    if not frame or frame == "none":
         return None
-    return thumb_location
+    janitor.track(frame)
+    return (frame, *frame_size(frame))
+
+
+def release_thumb(path) -> None:
+    """Drop a job's thumbnail. Cached thumbnails stay on disk for the next job."""
+    if not isinstance(path, str):
+        return
+    if thumbnail_cache is not None and thumbnail_cache.release(path):
+        return
+    janitor.untrack(path)
+    if os.path.exists(path):
+        os.remove(path)
 
 
 # Generate progress bar args dynamically using template
@@ -188,112 +330,91 @@ def progressArgs(action: str, progress_message, start_time):
 
 
 
-async def send_media(
-    bot, message, chat_message, user, media_path, media_type, caption, progress_message, start_time
-):
-    file_size = os.path.getsize(media_path)
+async def resolve_media_attributes(chat_message, media_path, media_type) -> dict:
+    """Upload attributes taken from Telegram's metadata first.
 
-    if not await fileSizeLimit(file_size, message, "upload"):
-        return
+    ffprobe only runs when the message leaves duration/width/height missing
+    or zero. Performer and title alone never trigger a probe: Telegram fills
+    them from the file's own tags, so an empty field means there are none.
+    """
+    media = get_media(chat_message)
 
-    progress_args = progressArgs("📥 Uploading Progress", progress_message, start_time)
-    LOGGER(__name__).info(f"Uploading media: {media_path} ({media_type})")
-    
+    if media_type == "video":
+        attrs = {
+            "duration": getattr(media, "duration", 0) or 0,
+            "width": getattr(media, "width", 0) or 0,
+            "height": getattr(media, "height", 0) or 0,
+        }
+    elif media_type == "audio":
+        attrs = {
+            "duration": getattr(media, "duration", 0) or 0,
+            "performer": getattr(media, "performer", None),
+            "title": getattr(media, "title", None),
+        }
+    else:
+        return {}
+
+    missing = [key for key in ("duration", "width", "height") if key in attrs and not attrs[key]]
+    # In-memory downloads have no file for ffprobe to read
+    if missing and isinstance(media_path, str):
+        info = await probe_media(media_path)
+        for key in missing:
+            attrs[key] = info[key]
+        if media_type == "audio":
+            attrs["performer"] = attrs["performer"] or info["artist"]
+            attrs["title"] = attrs["title"] or info["title"]
+
+    return attrs
+
+
+async def prepare_media(chat_message, user, media_path, media_type):
+    """Probe the downloaded file and fetch or generate its thumbnail.
+
+    Returns the extra upload attributes for ``send_media``, so this work can
+    run ahead of the upload when several posts are in flight.
+    """
     # Generate unique filename for the thumbnail
-    thumb_filename = f"thumb_{int(time())}.jpg"
+    thumb_filename = f"thumb_{chat_message.id}_{int(time())}.jpg"
     custom_thumb_path = os.path.join(CUSTOM_THUMB_DIR, thumb_filename)
 
-    if media_type == "photo":
-        await message.reply_photo(
-            media_path,
-            caption=caption or "",
-            progress=Leaves.progress_for_pyrogram,
-            progress_args=progress_args,
-        )
-    elif media_type == "video":
-        # Clean up old thumbnail if exists
-        duration = (await get_media_info(media_path))[0]
+    if media_type == "video":
+        attrs = await resolve_media_attributes(chat_message, media_path, media_type)
+        duration = attrs["duration"]
         thumb = None
-        width = 480
-        height = 320
+        width = attrs["width"] or 480
+        height = attrs["height"] or 320
 
         # 1. FIRST TRY TO USE EXISTING TELEGRAM THUMBNAIL
-        if hasattr(chat_message.video, 'thumbs') and chat_message.video.thumbs:
-            try:
-                # Download to our custom directory
-                thumb = await user.download_media(
-                    chat_message.video.thumbs[0].file_id,
-                    file_name=custom_thumb_path
-                )
-                if thumb and os.path.exists(thumb):
-                    with Image.open(thumb) as img:
-                        width, height = img.size
-                    LOGGER(__name__).info(f"Using existing Telegram thumbnail: {thumb} {width}, {height}")
-                else:
-                    thumb = None
-            except Exception as e:
-                LOGGER(__name__).warning(f"Failed to download Telegram thumbnail: {e}")
-                if os.path.exists(custom_thumb_path):
-                	os.remove(custom_thumb_path)
-                thumb = None
+        found = await fetch_telegram_thumb(user, chat_message.video, custom_thumb_path)
+        if found:
+            LOGGER(__name__).info(f"Using existing Telegram thumbnail: {found[0]}")
 
         # 2. IF NO EXISTING THUMBNAIL, GENERATE ONE (ORIGINAL BEHAVIOR)
-        if thumb is None:
-            thumb = await get_video_thumbnail(media_path, duration)
-            if thumb is not None and thumb != "none":
-                with Image.open(thumb) as img:
-                    width, height = img.size
-            	
-            elif thumb == "none":
-                thumb = None
+        else:
+            found = await generate_video_thumb(
+                chat_message.video, media_path, duration, attrs["width"], attrs["height"]
+            )
             LOGGER(__name__).info("Generated new thumbnail")
 
-        await message.reply_video(
-            media_path,
-            duration=duration,
-            width=width,
-            height=height,
-            thumb=thumb,
-            caption=caption or "",
-            progress=Leaves.progress_for_pyrogram,
-            progress_args=progress_args,
-        )
-        if os.path.exists(thumb):
-        	os.remove(thumb)
-        	
+        if found:
+            thumb, thumb_width, thumb_height = found
+            if not (attrs["width"] and attrs["height"]):
+                width = thumb_width or width
+                height = thumb_height or height
+
+        return {"duration": duration, "width": width, "height": height, "thumb": thumb}
+
     elif media_type == "audio":
-        duration, artist, title = await get_media_info(media_path)
-        await message.reply_audio(
-            media_path,
-            duration=duration,
-            performer=artist,
-            title=title,
-            caption=caption or "",
-            progress=Leaves.progress_for_pyrogram,
-            progress_args=progress_args,
-        )
+        return await resolve_media_attributes(chat_message, media_path, media_type)
+
     elif media_type == "document":
         thumb = None
-        width, height = 320, 320  # default fallback
 
         # 1. Try existing Telegram thumbnail (if available in chat_message.document.thumbs)
-        if hasattr(chat_message.document, 'thumbs') and chat_message.document.thumbs:
-            try:
-                thumb = await user.download_media(
-                    chat_message.document.thumbs[0].file_id,
-                    file_name=custom_thumb_path
-                )
-                if thumb and os.path.exists(thumb):
-                    with Image.open(thumb) as img:
-                        width, height = img.size
-                    LOGGER(__name__).info(f"Using existing Telegram document thumbnail: {thumb} {width}, {height}")
-                else:
-                    thumb = None
-            except Exception as e:
-                LOGGER(__name__).warning(f"Failed to download Telegram document thumbnail: {e}")
-                if os.path.exists(custom_thumb_path):
-                    os.remove(custom_thumb_path)
-                thumb = None
+        found = await fetch_telegram_thumb(user, chat_message.document, custom_thumb_path)
+        if found:
+            thumb = found[0]
+            LOGGER(__name__).info(f"Using existing Telegram document thumbnail: {thumb}")
 
         # 2. If no existing thumbnail, generate one from the document (if video/pdf) or fallback
         #if thumb is None:
@@ -310,248 +431,662 @@ async def send_media(
 #                        pages[0].save(custom_thumb_path, "JPEG")
 #                        thumb = custom_thumb_path
 #                # fallback: just skip
-#                if thumb and os.path.exists(thumb):
-#                    with Image.open(thumb) as img:
-#                        width, height = img.size
 #            except Exception as e:
 #                LOGGER(__name__).warning(f"Failed to generate document thumbnail: {e}")
 #                thumb = None
 
-        await message.reply_document(
-            media_path,
-            caption=caption or "",
-            thumb=thumb,
-            progress=Leaves.progress_for_pyrogram,
-            progress_args=progress_args,
-        )
+        return {"thumb": thumb}
+
+    return {}
+
+
+@traced("send_media")
+async def send_media(
+    bot, message, chat_message, user, media_path, media_type, caption, progress_message, start_time,
+    media_attrs=None
+):
+    owns_attrs = media_attrs is None
+    if owns_attrs:
+        media_attrs = await prepare_media(chat_message, user, media_path, media_type)
+    thumb = media_attrs.get("thumb")
+
+    try:
+        file_size = media_size(media_path)
+
+        if not await fileSizeLimit(file_size, message, "upload"):
+            return
+
+        progress_args = progressArgs("📥 Uploading Progress", progress_message, start_time)
+        LOGGER(__name__).info(f"Uploading media: {getattr(media_path, 'name', media_path)} ({media_type})")
+
+        with metrics.transfer("upload", media_type, file_size):
+            if media_type == "photo":
+                return await message.reply_photo(
+                    media_path,
+                    caption=caption or "",
+                    progress=progress_for_pyrogram,
+                    progress_args=progress_args,
+                )
+            elif media_type == "video":
+                return await message.reply_video(
+                    media_path,
+                    duration=media_attrs["duration"],
+                    width=media_attrs["width"],
+                    height=media_attrs["height"],
+                    thumb=thumb,
+                    caption=caption or "",
+                    progress=progress_for_pyrogram,
+                    progress_args=progress_args,
+                )
+            elif media_type == "audio":
+                return await message.reply_audio(
+                    media_path,
+                    duration=media_attrs["duration"],
+                    performer=media_attrs["performer"],
+                    title=media_attrs["title"],
+                    caption=caption or "",
+                    progress=progress_for_pyrogram,
+                    progress_args=progress_args,
+                )
+            elif media_type == "document":
+                return await message.reply_document(
+                    media_path,
+                    caption=caption or "",
+                    thumb=thumb,
+                    progress=progress_for_pyrogram,
+                    progress_args=progress_args,
+                )
+            elif media_type == "animation":
+                return await message.reply_animation(
+                    media_path,
+                    caption=caption or "",
+                    progress=progress_for_pyrogram,
+                    progress_args=progress_args,
+                )
+    finally:
+        # Prepared attrs belong to the caller, which releases their thumb
+        if owns_attrs:
+            release_thumb(thumb)
 
-        if thumb and os.path.exists(thumb):
-            os.remove(thumb)
-            
-    elif media_type == "animation":
-        await message.reply_animation(
-            media_path,
-            caption=caption or "",
-            progress=Leaves.progress_for_pyrogram,
-            progress_args=progress_args,
-        )    
-        
-
-async def processMediaGroup(chat_message, bot, message, user):
-    media_group_messages = await chat_message.get_media_group()
-    valid_media = []
-    temp_paths = []
-    invalid_paths = []
-    thumb_paths = []  # To track downloaded thumbnails
 
-    start_time = time()
-    progress_message = await message.reply("📥 **__Downloading media group...__**")
+def album_progress(media_group_messages, progress_message, start_time):
+    """One progress callback for a whole album.
+
+    Each member reports through ``progress(current, total, index)``; the
+    summed bytes are rendered into the single album progress message.
+    """
+    totals = [
+        getattr(get_media(msg), "file_size", 0) or 0 for msg in media_group_messages
+    ]
+    currents = [0] * len(media_group_messages)
+    progress_args = progressArgs(
+        "📥 **__Downloading Progress__**", progress_message, start_time
+    )
+
+    async def progress(current, total, index):
+        currents[index] = current
+        totals[index] = total or totals[index]
+        await progress_for_pyrogram(sum(currents), sum(totals), *progress_args)
+
+    return progress
+
+
+@traced("download_media_group")
+async def downloadMediaGroup(media_group_messages, user, message, progress_message, start_time, concurrency=None):
+    """Download every supported member of an album.
+
+    Up to ``concurrency`` members (``ALBUM_CONCURRENCY`` by default) download
+    at once, each into its own folder of the request ``message``. Returns ``(downloaded, invalid_paths)`` where ``downloaded`` is a
+    list of ``(msg, media_path, file_id)`` in album order. Members already in
+    the file_id cache are not downloaded; their ``media_path`` is ``None`` and
+    ``file_id`` is the id they are re-sent with.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or PyroConf.ALBUM_CONCURRENCY))
+    progress = album_progress(media_group_messages, progress_message, start_time)
+
     LOGGER(__name__).info(
         f"Downloading media group with {len(media_group_messages)} items..."
     )
 
-    for msg in media_group_messages:
-        if msg.photo or msg.video or msg.document or msg.audio or msg.animation:
+    async def download(index, msg):
+        # Looked up only here, so an eviction before the album is built
+        # can't leave the member without a file
+        file_id = file_id_cache.lookup(msg) if file_id_cache is not None else None
+        if file_id:
+            return None, file_id, None
+        media_path = None
+        async with semaphore:
             try:
-                media_path = await msg.download(
-                    progress=Leaves.progress_for_pyrogram,
-                    progress_args=progressArgs(
-                        "📥 **__Downloading Progress__**", progress_message, start_time
-                    ),
+                started = time()
+                media_path = await download_media_file(
+                    user,
+                    msg,
+                    # The folder is only created if the file goes to disk
+                    get_download_path(post_folder(message, msg), get_file_name(msg.id, msg), create=False),
+                    progress=progress,
+                    progress_args=(index,),
                 )
-                temp_paths.append(media_path)
-
-                caption = await get_parsed_msg(msg.caption or "", msg.caption_entities)
-                
-                if msg.photo:
-                    valid_media.append(
-                        InputMediaPhoto(media=media_path, caption=caption)
-                    )
-                elif msg.video:
-                    # Handle video thumbnails
-                    duration = (await get_media_info(media_path))[0]
-                    thumb = None
-                    width = 480
-                    height = 320
-                    
-                    # Generate unique filename for the thumbnail
-                    thumb_filename = f"group_thumb_{int(time())}.jpg"
-                    custom_thumb_path = os.path.join(CUSTOM_THUMB_DIR, thumb_filename)
-                    
-                    # 1. Try to use existing Telegram thumbnail
-                    if hasattr(msg.video, 'thumbs') and msg.video.thumbs:
-                        try:
-                            thumb = await user.download_media(msg.video.thumbs[0].file_id, file_name=custom_thumb_path)
-                            if thumb and os.path.exists(thumb):
-                                with Image.open(thumb) as img:
-                                    width, height = img.size
-                                thumb_paths.append(thumb)  # Track for cleanup
-                                LOGGER(__name__).info("Using existing Telegram thumbnail for media group video")
-                        except Exception as e:
-                            LOGGER(__name__).warning(f"Failed to download Telegram thumbnail: {e}")
-                            thumb = None
-                    
-                    # 2. If no existing thumbnail, generate one
-                    if thumb is None:
-                        thumb = await get_video_thumbnail(media_path, duration)
-                        if thumb and thumb != "none":
-                            with Image.open(thumb) as img:
-                                width, height = img.size
-                            thumb_paths.append(thumb)  # Track for cleanup
-                        elif thumb == "none":
-                            thumb = None
-                    
-                    valid_media.append(
-                        InputMediaVideo(
-                            media=media_path,
-                            caption=caption,
-                            duration=duration,
-                            thumb=thumb,
-                            width=width,
-                            height=height
-                        )
-                    )
-                elif msg.document:
-                    thumb = None
-                    width, height = 320, 320  # default fallback
-
-                    # Generate unique filename for the thumbnail
-                    thumb_filename = f"group_doc_thumb_{int(time())}.jpg"
-                    custom_thumb_path = os.path.join(CUSTOM_THUMB_DIR, thumb_filename)
-
-                    # 1. Try existing Telegram thumbnail
-                    if hasattr(msg.document, 'thumbs') and msg.document.thumbs:
-                        try:
-                            thumb = await user.download_media(
-                                msg.document.thumbs[0].file_id,
-                                file_name=custom_thumb_path
-                            )
-                            if thumb and os.path.exists(thumb):
-                                with Image.open(thumb) as img:
-                                    width, height = img.size
-                                thumb_paths.append(thumb)  # track cleanup
-                                LOGGER(__name__).info("Using existing Telegram thumbnail for document")
-                            else:
-                                thumb = None
-                        except Exception as e:
-                            LOGGER(__name__).warning(f"Failed to download document thumbnail: {e}")
-                            thumb = None
-
-                    # 2. If no existing thumbnail, generate one
-                    #if thumb is None:
-#                        try:
-#                            # video masquerading as doc
-#                            if media_path.lower().endswith((".mp4", ".mkv", ".avi")):
-#                                duration = (await get_media_info(media_path))[0]
-#                                thumb = await get_video_thumbnail(media_path, duration)
-#                            # PDF preview
-#                            elif media_path.lower().endswith(".pdf"):
-#                                from pdf2image import convert_from_path
-#                                pages = convert_from_path(media_path, first_page=1, last_page=1)
-#                                if pages:
-#                                    pages[0].save(custom_thumb_path, "JPEG")
-#                                    thumb = custom_thumb_path
-#                            if thumb and os.path.exists(thumb):
-#                                with Image.open(thumb) as img:
-#                                    width, height = img.size
-#                                thumb_paths.append(thumb)  # track cleanup
-#                        except Exception as e:
-#                            LOGGER(__name__).warning(f"Failed to generate document thumbnail: {e}")
-#                            thumb = None
-
-                    valid_media.append(
-                        InputMediaDocument(
-                            media=media_path,
-                            caption=caption,
-                            thumb=thumb
-                        )
-                    )
-                elif msg.audio:
-                    valid_media.append(
-                        InputMediaAudio(media=media_path, caption=caption)
-                    )
-                #elif msg.animation:
-                    #valid_media.append(
-                        #InputMediaAnimation(media=media_path, caption=caption)
-                    #)
-
+                metrics.observe_transfer(
+                    "download", get_media_type(msg), media_size(media_path), time() - started
+                )
+                return media_path, None, None
             except Exception as e:
                 LOGGER(__name__).info(f"Error downloading media: {e}")
-                if media_path and os.path.exists(media_path):
-                    invalid_paths.append(media_path)
-                continue
+                if isinstance(media_path, str) and os.path.exists(media_path):
+                    return None, None, media_path
+                raise
+
+    members = [
+        (index, msg) for index, msg in enumerate(media_group_messages)
+        if msg.photo or msg.video or msg.document or msg.audio or msg.animation
+    ]
+    results = await asyncio.gather(
+        *(download(index, msg) for index, msg in members), return_exceptions=True
+    )
+
+    downloaded = []
+    invalid_paths = []
+    for (index, msg), result in zip(members, results):
+        if isinstance(result, Exception):
+            continue
+        media_path, file_id, invalid_path = result
+        if invalid_path:
+            invalid_paths.append(invalid_path)
+        else:
+            downloaded.append((msg, media_path, file_id))
+
+    return downloaded, invalid_paths
+
+
+async def buildMediaGroupItem(msg, media_path, user, file_id=None):
+    """Build the ``InputMedia*`` for one album member.
+
+    Members without a ``media_path`` are sent by their cached ``file_id``.
+    Returns ``(input_media, thumb_paths)``; ``input_media`` is ``None`` for
+    members that can't go into an album.
+    """
+    thumb_paths = []  # To track downloaded thumbnails
+    caption = await get_parsed_msg(msg.caption or "", msg.caption_entities)
+
+    if media_path is None:
+        input_media = (
+            InputMediaPhoto if msg.photo
+            else InputMediaVideo if msg.video
+            else InputMediaAudio if msg.audio
+            else InputMediaDocument
+        )
+        return (input_media(media=file_id, caption=caption) if file_id else None), thumb_paths
+
+    if msg.photo:
+        return InputMediaPhoto(media=media_path, caption=caption), thumb_paths
+
+    elif msg.video:
+        # Handle video thumbnails
+        attrs = await resolve_media_attributes(msg, media_path, "video")
+        duration = attrs["duration"]
+        thumb = None
+        width = attrs["width"] or 480
+        height = attrs["height"] or 320
+
+        # Generate unique filename for the thumbnail
+        thumb_filename = f"group_thumb_{msg.id}_{int(time())}.jpg"
+        custom_thumb_path = os.path.join(CUSTOM_THUMB_DIR, thumb_filename)
+
+        # 1. Try to use existing Telegram thumbnail
+        found = await fetch_telegram_thumb(user, msg.video, custom_thumb_path)
+        if found:
+            LOGGER(__name__).info("Using existing Telegram thumbnail for media group video")
+
+        # 2. If no existing thumbnail, generate one
+        else:
+            found = await generate_video_thumb(
+                msg.video, media_path, duration, attrs["width"], attrs["height"]
+            )
+
+        if found:
+            thumb, thumb_width, thumb_height = found
+            thumb_paths.append(thumb)  # Track for cleanup
+            if not (attrs["width"] and attrs["height"]):
+                width = thumb_width or width
+                height = thumb_height or height
+
+        return InputMediaVideo(
+            media=media_path,
+            caption=caption,
+            duration=duration,
+            thumb=thumb,
+            width=width,
+            height=height
+        ), thumb_paths
+
+    elif msg.document:
+        thumb = None
+
+        # Generate unique filename for the thumbnail
+        thumb_filename = f"group_doc_thumb_{msg.id}_{int(time())}.jpg"
+        custom_thumb_path = os.path.join(CUSTOM_THUMB_DIR, thumb_filename)
+
+        # 1. Try existing Telegram thumbnail
+        found = await fetch_telegram_thumb(user, msg.document, custom_thumb_path)
+        if found:
+            thumb = found[0]
+            thumb_paths.append(thumb)  # track cleanup
+            LOGGER(__name__).info("Using existing Telegram thumbnail for document")
+
+        # 2. If no existing thumbnail, generate one
+        #if thumb is None:
+#            try:
+#                # video masquerading as doc
+#                if media_path.lower().endswith((".mp4", ".mkv", ".avi")):
+#                    duration = (await get_media_info(media_path))[0]
+#                    thumb = await get_video_thumbnail(media_path, duration)
+#                # PDF preview
+#                elif media_path.lower().endswith(".pdf"):
+#                    from pdf2image import convert_from_path
+#                    pages = convert_from_path(media_path, first_page=1, last_page=1)
+#                    if pages:
+#                        pages[0].save(custom_thumb_path, "JPEG")
+#                        thumb = custom_thumb_path
+#            except Exception as e:
+#                LOGGER(__name__).warning(f"Failed to generate document thumbnail: {e}")
+#                thumb = None
+
+        return InputMediaDocument(
+            media=media_path,
+            caption=caption,
+            thumb=thumb
+        ), thumb_paths
+
+    elif msg.audio:
+        return InputMediaAudio(media=media_path, caption=caption), thumb_paths
+
+    #elif msg.animation:
+        #return InputMediaAnimation(media=media_path, caption=caption), thumb_paths
+
+    return None, thumb_paths
+
+
+async def buildMediaGroup(downloaded, user, concurrency=None):
+    """Turn downloaded album members into ``InputMedia*`` objects.
+
+    Members are probed and thumbnailed concurrently, but the result keeps
+    album order. Returns ``(valid_media, sources, temp_paths, thumb_paths)``
+    where ``sources`` holds the album message behind each ``valid_media``
+    entry. Members without a ``media_path`` are sent by their cached bot file_id.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or PyroConf.ALBUM_CONCURRENCY))
+
+    async def build(msg, media_path, file_id):
+        async with semaphore:
+            return await buildMediaGroupItem(msg, media_path, user, file_id)
+
+    results = await asyncio.gather(
+        *(build(*member) for member in downloaded), return_exceptions=True
+    )
+
+    valid_media = []
+    sources = []
+    temp_paths = [media_path for _, media_path, _ in downloaded if media_path]
+    thumb_paths = []
+
+    for (msg, _, _), result in zip(downloaded, results):
+        if isinstance(result, Exception):
+            LOGGER(__name__).info(f"Error preparing media: {result}")
+            continue
+        input_media, item_thumbs = result
+        thumb_paths.extend(item_thumbs)
+        if input_media is not None:
+            valid_media.append(input_media)
+            sources.append(msg)
 
     LOGGER(__name__).info(f"Valid media count: {len(valid_media)}")
+    return valid_media, sources, temp_paths, thumb_paths
+
+
+@traced("send_media_group")
+async def sendMediaGroup(bot, message, valid_media, progress_message):
+    """Send an album, falling back to one upload per item.
+
+    Returns the sent messages aligned with ``valid_media`` (``None`` where an
+    individual upload failed).
+    """
+    try:
+        # Items re-sent by cached file_id carry no bytes
+        size = sum(
+            media_size(item.media) for item in valid_media
+            if not isinstance(item.media, str) or os.path.exists(item.media)
+        )
+        with metrics.transfer("upload", "album", size):
+            sent = await bot.send_media_group(chat_id=message.chat.id, media=valid_media)
+        await progress_message.delete()
+        return sent
+    except Exception as e:
+        await message.reply(
+            f"**❌ Failed to send media group, trying individual uploads**\n`{e}`"
+        )
+        sent = []
+        for media in valid_media:
+            try:
+                if isinstance(media, InputMediaPhoto):
+                    sent.append(await bot.send_photo(
+                        chat_id=message.chat.id,
+                        photo=media.media,
+                        caption=media.caption,
+                    ))
+                elif isinstance(media, InputMediaVideo):
+                    sent.append(await bot.send_video(
+                        chat_id=message.chat.id,
+                        video=media.media,
+                        caption=media.caption,
+                        thumb=media.thumb,
+                        width=media.width,
+                        height=media.height
+                    ))
+                elif isinstance(media, InputMediaDocument):
+                    sent.append(await bot.send_document(
+                        chat_id=message.chat.id,
+                        document=media.media,
+                        caption=media.caption,
+                        thumb=media.thumb if hasattr(media, "thumb") else None,
+                    ))
+                elif isinstance(media, InputMediaAudio):
+                    sent.append(await bot.send_audio(
+                        chat_id=message.chat.id,
+                        audio=media.media,
+                        caption=media.caption,
+                    ))
+                elif isinstance(media, InputMediaAnimation):
+                    sent.append(await bot.send_animation(
+                        chat_id=message.chat.id,
+                        animation=media.media,
+                        caption=media.caption,
+                    ))
+                elif isinstance(media, Voice):
+                    sent.append(await bot.send_voice(
+                        chat_id=message.chat.id,
+                        voice=media.media,
+                        caption=media.caption,
+                    ))
+                else:
+                    sent.append(None)
+            except Exception as individual_e:
+                sent.append(None)
+                await message.reply(
+                    f"Failed to upload individual media: {individual_e}"
+                )
+
+        await progress_message.delete()
+        return sent
+
+    
+@dataclass
+class PostJob:
+    """State of one post as it moves through the download pipeline."""
+    chat_message: Any
+    post_url: str
+    kind: str = "none"  # "copy", "cached", "group", "media", "relay", "text", "none" or "skip"
+    caption: str = ""
+    text: str = ""
+    start_time: float = 0.0
+    progress_message: Any = None
+    media_path: Optional[Union[str, BinaryIO]] = None
+    media_type: Optional[str] = None
+    media_attrs: dict = field(default_factory=dict)
+    downloaded: list = field(default_factory=list)
+    valid_media: list = field(default_factory=list)
+    sources: list = field(default_factory=list)
+    cached_file_id: Optional[str] = None
+    relay_file: Any = None
+    # Set once a copy or cached send failed, so the job is transferred
+    force_transfer: bool = False
+    cleanup_paths: list = field(default_factory=list)
+    thumb_paths: list = field(default_factory=list)
+    trace: Any = None
+
+
+def get_media_type(chat_message) -> str:
+    if chat_message.photo:
+        return "photo"
+    elif chat_message.video:
+        return "video"
+    elif chat_message.audio:
+        return "audio"
+    return "document"
+
+
+async def download_post(job: PostJob, bot, user, message) -> PostJob:
+    """Download stage: fetch the post's media (or whole album) to disk.
+
+    In relay mode the media is streamed into a bot upload here instead.
+    """
+    chat_message = job.chat_message
+
+    if PyroConf.COPY_FAST_PATH and not job.force_transfer and can_copy(chat_message):
+        # Copied server-side in the upload stage, keeping batch order intact
+        job.kind = "copy"
+        return job
+
+    if file_id_cache is not None and not chat_message.media_group_id:
+        job.cached_file_id = file_id_cache.lookup(chat_message)
+        if job.cached_file_id:
+            job.kind = "cached"
+            job.caption = await get_parsed_msg(
+                chat_message.caption or "", chat_message.caption_entities
+            )
+            return job
+
+    if chat_message.document or chat_message.video or chat_message.audio:
+        file_size = (
+            chat_message.document.file_size
+            if chat_message.document
+            else chat_message.video.file_size
+            if chat_message.video
+            else chat_message.audio.file_size
+        )
+
+        if not await fileSizeLimit(
+            file_size, message, "download", user.me.is_premium
+        ):
+            job.kind = "skip"
+            return job
+
+    job.caption = await get_parsed_msg(
+        chat_message.caption or "", chat_message.caption_entities
+    )
+    job.text = await get_parsed_msg(
+        chat_message.text or "", chat_message.entities
+    )
+    job.start_time = time()
+
+    if chat_message.media_group_id:
+        job.kind = "group"
+        media_group_messages = await chat_message.get_media_group()
+        job.progress_message = await message.reply("📥 **__Downloading media group...__**")
+        job.downloaded, invalid_paths = await downloadMediaGroup(
+            media_group_messages, user, message, job.progress_message, job.start_time
+        )
+        job.cleanup_paths.extend(invalid_paths)
+
+    elif chat_message.media:
+        job.kind = "media"
+        job.media_type = get_media_type(chat_message)
+        job.progress_message = await message.reply("**__📥 Downloading Progress...__**")
+
+        if PyroConf.RELAY_MODE and can_relay(chat_message):
+            # Streamed straight into a bot upload here; only the send waits
+            # for the upload stage, so batch order holds without blocking it
+            job.kind = "relay"
+            size = getattr(get_media(chat_message), "file_size", 0) or 0
+            with span("relay_upload"), metrics.transfer("relay", job.media_type, size):
+                job.relay_file = await relay_upload(
+                    user,
+                    bot,
+                    chat_message,
+                    progress=progress_for_pyrogram,
+                    progress_args=progressArgs(
+                        "📥 **__Relaying Progress__**", job.progress_message, job.start_time
+                    ),
+                    buffer_chunks=PyroConf.RELAY_BUFFER_MB,
+                )
+            return job
+
+        filename = get_file_name(chat_message.id, chat_message)
+        # The folder is only created if the file goes to disk
+        download_path = get_download_path(post_folder(message, chat_message), filename, create=False)
+
+        started = time()
+        job.media_path = await download_media_file(
+            user,
+            chat_message,
+            download_path,
+            progress=progress_for_pyrogram,
+            progress_args=progressArgs(
+                "📥 **__Downloading Progress__**", job.progress_message, job.start_time
+            ),
+        )
+        metrics.observe_transfer(
+            "download", job.media_type, media_size(job.media_path), time() - started
+        )
+
+        LOGGER(__name__).info(f"Downloaded media: {getattr(job.media_path, 'name', job.media_path)}")
 
-    if valid_media:
+    elif chat_message.text or chat_message.caption:
+        job.kind = "text"
+
+    return job
+
+
+async def prepare_post(job: PostJob, user) -> PostJob:
+    """Prepare stage: probe downloaded files and fetch or generate thumbnails."""
+    try:
+        if job.kind == "group":
+            job.valid_media, job.sources, temp_paths, thumb_paths = await buildMediaGroup(job.downloaded, user)
+            job.cleanup_paths.extend(temp_paths)
+            job.thumb_paths.extend(thumb_paths)
+        elif job.kind == "media":
+            job.media_attrs = await prepare_media(
+                job.chat_message, user, job.media_path, job.media_type
+            )
+        elif job.kind == "relay":
+            job.media_attrs = await relay_attributes(job.chat_message, user, job.media_type)
+    except Exception:
+        release_post(job)
+        raise
+    return job
+
+
+def remember_uploads(sources, sent) -> None:
+    """Record bot-side file_ids so the same source media can be re-sent instantly."""
+    if file_id_cache is None or not sent:
+        return
+    for source, sent_message in zip(sources, sent):
+        if sent_message is not None:
+            file_id_cache.remember(source, sent_message)
+        else:
+            # Failed item of an album, don't keep a file_id that may be stale
+            file_id_cache.forget(source)
+
+
+def release_post(job: PostJob) -> None:
+    """Remove every file a job still holds on disk."""
+    if job.media_path:
+        cleanup_download(job.media_path)
+    release_thumb(job.media_attrs.pop("thumb", None))
+    for path in job.thumb_paths:
+        release_thumb(path)
+    job.thumb_paths.clear()
+    for msg, path, file_id in job.downloaded:
+        if path and path not in job.cleanup_paths:
+            job.cleanup_paths.append(path)
+    for path in job.cleanup_paths:
+        cleanup_download(path)
+    job.cleanup_paths.clear()
+
+
+async def upload_post(job: PostJob, bot, message, user) -> None:
+    """Upload stage: send the prepared post back to the requesting chat."""
+    if job.kind == "copy":
+        if await copy_post(bot, message, job.chat_message):
+            return
+        # Not copyable after all, or still flood-limited: transfer this one now
+        job.kind = "none"
+        job.force_transfer = True
+        job = await download_post(job, bot, user, message)
+        job = await prepare_post(job, user)
+
+    if job.kind == "cached":
         try:
-            await bot.send_media_group(chat_id=message.chat.id, media=valid_media)
-            await progress_message.delete()
+            await bot.send_cached_media(
+                chat_id=message.chat.id, file_id=job.cached_file_id, caption=job.caption or ""
+            )
+            return
         except Exception as e:
+            # Stale or rejected file_id, drop it and transfer the file again
+            LOGGER(__name__).warning(f"Cached file_id failed for {job.post_url}: {e}")
+            file_id_cache.forget(job.chat_message)
+            job.kind = "none"
+            job.force_transfer = True
+            job = await download_post(job, bot, user, message)
+            job = await prepare_post(job, user)
+
+    if job.kind == "skip":
+        return
+
+    if job.kind == "group":
+        try:
+            if job.valid_media:
+                sent = await sendMediaGroup(bot, message, job.valid_media, job.progress_message)
+                remember_uploads(job.sources, sent)
+                return
+            await job.progress_message.delete()
+            await message.reply("❌ No valid media found in the media group.")
             await message.reply(
-                f"**❌ Failed to send media group, trying individual uploads**\n`{e}`"
+                "**Could not extract any valid media from the media group.**"
             )
-            for media in valid_media:
-                try:
-                    if isinstance(media, InputMediaPhoto):
-                        await bot.send_photo(
-                            chat_id=message.chat.id,
-                            photo=media.media,
-                            caption=media.caption,
-                        )
-                    elif isinstance(media, InputMediaVideo):
-                        await bot.send_video(
-                            chat_id=message.chat.id,
-                            video=media.media,
-                            caption=media.caption,
-                            thumb=media.thumb,
-                            width=media.width,
-                            height=media.height
-                        )
-                    elif isinstance(media, InputMediaDocument):
-                        await bot.send_document(
-                            chat_id=message.chat.id,
-                            document=media.media,
-                            caption=media.caption,
-                            thumb=media.thumb if hasattr(media, "thumb") else None,
-                        )
-                    elif isinstance(media, InputMediaAudio):
-                        await bot.send_audio(
-                            chat_id=message.chat.id,
-                            audio=media.media,
-                            caption=media.caption,
-                        )
-                    elif isinstance(media, InputMediaAnimation):
-                        await bot.send_animation(
-                            chat_id=message.chat.id,
-                            animation=media.media,
-                            caption=media.caption,
-                        )
-                    elif isinstance(media, Voice):
-                        await bot.send_voice(
-                            chat_id=message.chat.id,
-                            voice=media.media,
-                            caption=media.caption,
-                        )    
-                except Exception as individual_e:
-                    await message.reply(
-                        f"Failed to upload individual media: {individual_e}"
-                    )
-
-            await progress_message.delete()
-
-        # Cleanup all temporary files
-        for path in temp_paths + invalid_paths + thumb_paths:
-            cleanup_download(path)
-        return True
-
-    await progress_message.delete()
-    await message.reply("❌ No valid media found in the media group.")
-    for path in invalid_paths + thumb_paths:
-        cleanup_download(path)
-    return False
-    
-    
+        finally:
+            release_post(job)
+
+    elif job.kind == "media":
+        try:
+            sent = await send_media(
+                bot,
+                message,
+                job.chat_message,
+                user,
+                job.media_path,
+                job.media_type,
+                job.caption,
+                job.progress_message,
+                job.start_time,
+                job.media_attrs,
+            )
+            remember_uploads([job.chat_message], [sent])
+        finally:
+            release_post(job)
+        await job.progress_message.delete()
+
+    elif job.kind == "relay":
+        try:
+            sent = await relay_send(
+                bot,
+                job.chat_message,
+                message.chat.id,
+                job.media_type,
+                job.relay_file,
+                job.caption,
+                job.media_attrs,
+            )
+            remember_uploads([job.chat_message], [sent])
+        finally:
+            release_post(job)
+        await job.progress_message.delete()
+
+    elif job.kind == "text":
+        await message.reply(job.text or job.caption)
+    else:
+        await message.reply("**No media or text found in the post URL.**")
+
+
 def json_parser(data: Any, indent: Union[int, None] = None, ensure_ascii: bool = False) -> Any:
     """
     Parses and formats JSON-like data.
@@ -1,22 +1,94 @@
+import io
+import json
+import queue
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+from time import monotonic
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import PyroConf
+
+LOG_FILE = "logs.txt"
+LOG_FORMAT = "[%(asctime)s - %(levelname)s] - %(funcName)s() - Line %(lineno)d: %(name)s - %(message)s"
+LOG_DATEFMT = "%d-%b-%y %I:%M:%S %p"
 
 # removing old logs file if they exist.
 try:
-    os.remove("logs.txt")
+    os.remove(LOG_FILE)
 except:
     pass
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s - %(levelname)s] - %(funcName)s() - Line %(lineno)d: %(name)s - %(message)s",
-    datefmt="%d-%b-%y %I:%M:%S %p",
-    handlers=[
-        RotatingFileHandler("logs.txt", mode="w+", maxBytes=5000000, backupCount=10),
-        logging.StreamHandler(),
-    ],
-)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``limit`` INFO/DEBUG records per logger per ``window``.
+
+    Warnings and errors always pass. The first record after a throttled
+    window says how many lines were dropped.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.windows = {}  # logger name -> [window start, passed, suppressed]
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        now = monotonic()
+        state = self.windows.get(record.name)
+        if state is None or now - state[0] >= self.window:
+            suppressed = state[2] if state else 0
+            state = self.windows[record.name] = [now, 0, 0]
+            if suppressed:
+                record.msg = f"{record.getMessage()} [{suppressed} similar line(s) suppressed]"
+                record.args = None
+        if state[1] >= self.limit:
+            state[2] += 1
+            return False
+        state[1] += 1
+        return True
+
+
+formatter = JsonFormatter() if PyroConf.LOG_JSON else logging.Formatter(LOG_FORMAT, LOG_DATEFMT)
+file_handler = RotatingFileHandler(LOG_FILE, mode="w+", maxBytes=5000000, backupCount=10)
+stream_handler = logging.StreamHandler()
+for handler in (file_handler, stream_handler):
+    handler.setFormatter(formatter)
+
+# Callers only enqueue; formatting, disk writes and rotation happen on the
+# listener thread so they never stall the event loop
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+# Only renders the message (and traceback); the listener's handlers add the rest
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+queue_handler.addFilter(RateLimitFilter(PyroConf.LOG_RATE_LIMIT, PyroConf.LOG_RATE_WINDOW))
+listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+listener.start()
+atexit.register(listener.stop)
 
 logger = logging.getLogger(__name__)
 
@@ -25,3 +97,23 @@ logging.getLogger("pyrogram").setLevel(logging.ERROR)
 
 def LOGGER(name: str) -> logging.Logger:
     return logging.getLogger(name)
+
+
+def logs_snapshot():
+    """Copy of the current log file, or ``None`` if there is none yet.
+
+    Taken under the file handler's lock, so no record is half-written and
+    rotation can't happen mid-copy. Writers only queue up meanwhile.
+    """
+    file_handler.acquire()
+    try:
+        if file_handler.stream:
+            file_handler.flush()
+        if not os.path.exists(LOG_FILE):
+            return None
+        with open(LOG_FILE, "rb") as f:
+            snapshot = io.BytesIO(f.read())
+    finally:
+        file_handler.release()
+    snapshot.name = LOG_FILE
+    return snapshot
@@ -4,27 +4,28 @@
 import os
 import io
 from io import BytesIO
-import shutil
-import psutil
 from pathlib import Path
 import sys
 import logging
 import traceback
 import asyncio
 from time import time
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from pprint import pformat  # For pretty-printing
+from typing import Tuple
 
-from pyleaves import Leaves
 from pyrogram.enums import ParseMode
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.errors import PeerIdInvalid, BadRequest
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from helpers.utils import (
-    processMediaGroup,
-    progressArgs,
-    send_media,
+    PostJob,
+    download_post,
+    prepare_post,
+    upload_post,
+    release_post,
     json_parser,
     set_memory_template,
     save_template_to_file,
@@ -33,21 +34,32 @@ from helpers.utils import (
 )
 
 from helpers.files import (
-    get_download_path,
-    fileSizeLimit,
     get_readable_file_size,
     get_readable_time,
-    cleanup_download
+    disk_ledger,
+    disk_owner
 )
 
 from helpers.msg import (
     getChatMsgID,
-    get_file_name,
-    get_parsed_msg
+    parse_post_link,
+    get_messages_in_chunks,
+    MAX_MESSAGES_PER_REQUEST
 )
 
+from helpers.pipeline import BatchPipeline
+from helpers.ratelimit import RateLimiter
+from helpers.thumbnail import thumbnail_pool
+from helpers.peers import peer_cache
+from helpers.journal import Batch, journal
+from helpers.scheduler import BULK, INTERACTIVE, scheduler
+from helpers.janitor import janitor
+from helpers.sysstats import system_sampler
+from helpers.metrics import jobs_total, registry, start_metrics_server
+from helpers.tracing import Trace, span, tracer
+
 from config import PyroConf
-from logger import LOGGER
+from logger import LOGGER, logs_snapshot
 from cmd_list import COMMANDS
 
 START_TIME = time()
@@ -58,13 +70,27 @@ bot = Client(
     api_id=PyroConf.API_ID,
     api_hash=PyroConf.API_HASH,
     bot_token=PyroConf.BOT_TOKEN,
-    workers=1000
+    workers=1000,
+    max_concurrent_transmissions=PyroConf.MAX_CONCURRENT_TRANSMISSIONS,
+    sleep_threshold=PyroConf.FLOOD_SLEEP_THRESHOLD
 )
 
 # Client for user session
-user = Client("user_session", workers=1000, session_string=PyroConf.SESSION_STRING)
+user = Client(
+    "user_session",
+    workers=1000,
+    session_string=PyroConf.SESSION_STRING,
+    max_concurrent_transmissions=PyroConf.MAX_CONCURRENT_TRANSMISSIONS,
+    sleep_threshold=PyroConf.FLOOD_SLEEP_THRESHOLD
+)
+
+# Each account gets its own buckets, Telegram limits them separately
+bot_limiter = RateLimiter().install(bot)
+user_limiter = RateLimiter().install(user)
 
 RUNNING_TASKS = set()
+# Set on SIGINT/SIGTERM: batches stop taking new posts and stay resumable
+SHUTTING_DOWN = asyncio.Event()
 
 MAX_MESSAGE_LENGTH = 4096
 EVAL_TIMEOUT = 60  # Timeout in seconds
@@ -77,6 +103,42 @@ COMMAND_ALIASES = {
 }
 command_history = []
 
+registry.collected(
+    "rcd_running_tasks", "Command tasks currently tracked for shutdown.",
+    lambda: [({}, len(RUNNING_TASKS))],
+)
+registry.collected(
+    "rcd_jobs", "Post jobs holding or waiting for a scheduler slot.",
+    lambda: [
+        ({"state": state}, scheduler.stats()[key])
+        for state, key in (("running", "active"), ("queued_interactive", "queued_interactive"),
+                           ("queued_bulk", "queued_bulk"))
+    ],
+    labelnames=("state",),
+)
+registry.collected(
+    "rcd_thumbnail_queue", "ffmpeg thumbnail extractions waiting for a worker.",
+    lambda: [({}, thumbnail_pool.queued)],
+)
+registry.collected(
+    "rcd_flood_waits_total", "FloodWait errors received, by client and RPC method.",
+    lambda: [
+        ({"client": name, "method": method}, count)
+        for name, limiter in (("bot", bot_limiter), ("user", user_limiter))
+        for method, count in limiter.flood_waits.items()
+    ],
+    labelnames=("client", "method"), kind="counter",
+)
+registry.collected(
+    "rcd_flood_wait_seconds_total", "Seconds Telegram asked us to wait, by client and RPC method.",
+    lambda: [
+        ({"client": name, "method": method}, seconds)
+        for name, limiter in (("bot", bot_limiter), ("user", user_limiter))
+        for method, seconds in limiter.flood_wait_seconds.items()
+    ],
+    labelnames=("client", "method"), kind="counter",
+)
+
 def track_task(coro):
     task = asyncio.create_task(coro)
     RUNNING_TASKS.add(task)
@@ -85,6 +147,40 @@ def track_task(coro):
     task.add_done_callback(_remove)
     return task
 
+
+def requester_id(message: Message) -> int:
+    """Whose quota a request counts against."""
+    return message.from_user.id if message.from_user else message.chat.id
+
+
+async def schedule_download(bot: Client, message: Message, post_url: str):
+    """Run a single-post request once the scheduler gives it a slot."""
+    notice = None
+
+    async def on_queued(position):
+        nonlocal notice
+        notice = await message.reply(
+            f"⏳ **Queued at position {position}.** Your download starts as soon as a slot frees up."
+        )
+
+    owner = requester_id(message)
+    trace = tracer.start(post_url, user=owner)
+    try:
+        with tracer.activate(trace), span("queued"):
+            await scheduler.acquire(owner, INTERACTIVE, on_queued=on_queued)
+    except BaseException as e:
+        tracer.finish(trace, e)
+        raise
+    try:
+        if notice is not None:
+            try:
+                await notice.delete()
+            except Exception:
+                pass
+        await handle_download(bot, message, post_url, trace=trace)
+    finally:
+        scheduler.release(owner)
+
 @bot.on_message(filters.command("start") & filters.private)
 async def start(_, message: Message):
     welcome_text = (
@@ -122,6 +218,8 @@ async def help_command(_, message: Message):
         "   – Send `/logs` to download the bot’s logs file.\n\n"
         "➤ **Stats**\n"
         "   – Send `/stats` to view current status:\n\n"
+        "➤ **Tracing** (owner only)\n"
+        "   – Send `/trace <job>` to see where a job spent its time, and `/slowest [stage]` to list the slowest recent jobs.\n\n"
         "**Example**:\n"
         "  • `/dl https://t.me/itsSmartDev/547`\n"
         "  • `https://t.me/itsSmartDev/547`"
@@ -133,108 +231,127 @@ async def help_command(_, message: Message):
     await message.reply(help_text, reply_markup=markup, disable_web_page_preview=True)
 
 
-async def handle_download(bot: Client, message: Message, post_url: str):
+async def handle_download(bot: Client, message: Message, post_url: str, chat_message: Message = None,
+                          trace: Trace = None):
     # Cut off URL at '?' if present
     if "?" in post_url:
         post_url = post_url.split("?", 1)[0]
  
-    try:
-        # Special handling for t.me/b/ links
-        if 't.me/b/' in post_url:
-            parts = [p for p in post_url.split("/") if p]  # Split and remove empty parts
-            if len(parts) >= 5 and parts[2] == 'b':
-                chat_id = str(parts[3])
-                message_id = int(parts[4])
+    job = None
+    error = None
+    trace = trace or tracer.start(post_url, user=requester_id(message))
+    # The job's downloads must not wait on each other's disk space
+    owner = disk_owner.set((trace, 0))
+    with tracer.activate(trace):
+        try:
+            if chat_message is not None:
+                # Already fetched by a batch command, no need for another round trip
+                message_id = chat_message.id
             else:
-                raise ValueError("Invalid business link format")
-        else:
-            # Normal processing for other links
-            chat_id, message_id = getChatMsgID(post_url)
-            
-        chat_message = await user.get_messages(chat_id=chat_id, message_ids=message_id)
- 
-        LOGGER(__name__).info(f"Downloading media from URL: {post_url}")
- 
-        if chat_message.document or chat_message.video or chat_message.audio:
-            file_size = (
-                chat_message.document.file_size
-                if chat_message.document
-                else chat_message.video.file_size
-                if chat_message.video
-                else chat_message.audio.file_size
-            )
- 
-            if not await fileSizeLimit(
-                file_size, message, "download", user.me.is_premium
-            ):
-                return
- 
-        parsed_caption = await get_parsed_msg(
-            chat_message.caption or "", chat_message.caption_entities
-        )
-        parsed_text = await get_parsed_msg(
-            chat_message.text or "", chat_message.entities
-        )
- 
-        if chat_message.media_group_id:
-            if not await processMediaGroup(chat_message, bot, message, user):
-                await message.reply(
-                    "**Could not extract any valid media from the media group.**"
-                )
-            return
+                # Also handles t.me/b/ business links
+                chat_id, message_id = parse_post_link(post_url)
+
+                # A cached id skips resolving the username again
+                peer = peer_cache.get(chat_id)
+                if peer is not None:
+                    chat_id = peer["id"]
+
+                with span("get_messages"):
+                    chat_message = await user.get_messages(chat_id=chat_id, message_ids=message_id)
+                if peer is None and chat_message.chat:
+                    await peer_cache.remember(user, chat_message.chat)
+                    peer_cache.save()
  
-        elif chat_message.media:
-            start_time = time()
-            progress_message = await message.reply("**__📥 Downloading Progress...__**")
- 
-            filename = get_file_name(message_id, chat_message)
-            download_path = get_download_path(message.id, filename)
- 
-            media_path = await chat_message.download(
-                file_name=download_path,
-                progress=Leaves.progress_for_pyrogram,
-                progress_args=progressArgs(
-                    "📥 **__Downloading Progress__**", progress_message, start_time
-                ),
-            )
- 
-            LOGGER(__name__).info(f"Downloaded media: {media_path}")
- 
-            media_type = (
-                "photo"
-                if chat_message.photo
-                else "video"
-                if chat_message.video
-                else "audio"
-                if chat_message.audio
-                else "document"
-            )
-            await send_media(
-                bot,
-                message,
-                chat_message,
-                user,
-                media_path,
-                media_type,
-                parsed_caption,
-                progress_message,
-                start_time,
-            )
- 
-            cleanup_download(media_path)
-            await progress_message.delete()
- 
-        elif chat_message.text or chat_message.caption:
-            await message.reply(parsed_text or parsed_caption)
-        else:
-            await message.reply("**No media or text found in the post URL.**")
- 
-    except (PeerIdInvalid, BadRequest, KeyError):
+            LOGGER(__name__).info(f"Downloading media from URL: {post_url} (trace {trace.id})")
+
+            job = PostJob(chat_message=chat_message, post_url=post_url, trace=trace)
+            with span("download"):
+                job = await download_post(job, bot, user, message)
+            with span("prepare"):
+                job = await prepare_post(job, user)
+            with span("upload"):
+                await upload_post(job, bot, message, user)
+            jobs_total.inc(kind=job.kind, state="done")
+
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+            jobs_total.inc(kind=job.kind if job else "none", state="failed")
+            await report_download_error(message, e)
+        finally:
+            tracer.finish(trace, error)
+            disk_owner.reset(owner)
+
+
+async def report_download_error(message: Message, error: Exception):
+    if isinstance(error, (PeerIdInvalid, BadRequest, KeyError)):
         await message.reply("**Make sure the user client is part of the chat.**")
-    except Exception as e:
-        error_message = f"**❌ {str(e)}**"
+    else:
+        error_message = f"**❌ {str(error)}**"
         await message.reply(error_message)
-        LOGGER(__name__).error(e)
+        LOGGER(__name__).error(error)
+
+
+def batch_pipeline(bot: Client, message: Message, on_error=None, batch: Batch = None) -> BatchPipeline:
+    """Build a pipeline that runs posts through the same stages as handle_download.
+
+    With a ``batch``, every post's outcome is written to the job journal.
+    """
+    async def download(job):
+        job.trace = tracer.start(
+            job.post_url, user=requester_id(message), batch=batch.id if batch else None
+        )
+        LOGGER(__name__).info(f"Downloading media from URL: {job.post_url} (trace {job.trace.id})")
+        with tracer.activate(job.trace), span("download"):
+            return await download_post(job, bot, user, message)
+
+    async def prepare(job):
+        with tracer.activate(job.trace), span("prepare"):
+            return await prepare_post(job, user)
+
+    async def upload(job):
+        with tracer.activate(job.trace), span("upload"):
+            await upload_post(job, bot, message, user)
+        tracer.finish(job.trace)
+        jobs_total.inc(kind=job.kind, state="done")
+        if batch is not None:
+            journal.record(batch, job.chat_message.id, "done", job.chat_message.media_group_id)
+
+    admitted = False
+
+    async def on_queued(position):
+        await message.reply(
+            f"⏳ **Batch queued at position {position}.** It starts as soon as a slot frees up."
+        )
+
+    @asynccontextmanager
+    async def slot():
+        # Only the batch's first post announces the queue
+        nonlocal admitted
+        async with scheduler.slot(requester_id(message), BULK,
+                                  on_queued=None if admitted else on_queued):
+            admitted = True
+            yield
+
+    async def failed(job, e):
+        tracer.finish(job.trace, e)
+        jobs_total.inc(kind=job.kind, state="failed")
+        if batch is not None:
+            journal.record(batch, job.chat_message.id, "failed", job.chat_message.media_group_id, str(e))
+        if on_error is not None:
+            await on_error(job, e)
+
+    return BatchPipeline(
+        download,
+        prepare,
+        upload,
+        on_error=failed,
+        concurrency=PyroConf.BATCH_CONCURRENCY,
+        slot=slot,
+        release=release_post,
+    )
 
 
 @bot.on_message(filters.command("dl"))
@@ -244,7 +361,7 @@ async def download_media(bot: Client, message: Message):
         return
 
     post_url = message.command[1]
-    await track_task(handle_download(bot, message, post_url))
+    await track_task(schedule_download(bot, message, post_url))
 
 
 @bot.on_message(filters.command("bdl"))
@@ -271,52 +388,120 @@ async def download_range(bot: Client, message: Message):
     if start_id > end_id:
         return await message.reply("**❌ Invalid range: start ID cannot exceed end ID.**")
  
-    try:
-        await user.get_chat(start_chat)
-    except Exception:
-        pass
- 
-    prefix = args[1].rsplit("/", 1)[0]
-    loading = await message.reply(f"📥 **__Downloading posts {start_id}–{end_id}…__**")
- 
-    downloaded = skipped = failed = 0
- 
-    for msg_id in range(start_id, end_id + 1):
-        url = f"{prefix}/{msg_id}"
+    batch = journal.start(
+        "bdl", message.chat.id, message.id, start_chat, args[1].rsplit("/", 1)[0], start_id, end_id
+    )
+    await run_bdl(bot, message, batch)
+
+
+async def batch_posts(chat_id, batch: Batch, counts: dict, content_only: bool = False):
+    """Yield a PostJob per post of a journaled range still to be sent.
+
+    Posts fetch in chunks; a chunk that fails to fetch is logged, counted
+    in ``counts["fetch_failed"]`` and skipped. Empty or deleted posts are
+    counted in ``counts["skipped"]`` and listed in ``counts["skipped_ids"]``.
+    Albums are yielded once, for their first member. With ``content_only``, posts without media or text
+    are counted in ``counts["skipped"]`` instead of being yielded.
+    """
+    # Posts a previous run already sent, in case it stopped mid-album
+    done_ids, done_groups = journal.finished(batch)
+    seen_groups = set(done_groups)
+    next_id, end_id = batch.next_id, batch.end_id
+
+    while next_id <= end_id:
         try:
-            chat_msg = await user.get_messages(chat_id=start_chat, message_ids=msg_id)
-            if not chat_msg:
-                skipped += 1
-                continue
- 
-            has_media = bool(chat_msg.media_group_id or chat_msg.media)
-            has_text  = bool(chat_msg.text or chat_msg.caption)
-            if not (has_media or has_text):
-                skipped += 1
-                continue
- 
-            task = track_task(handle_download(bot, message, url))
-            try:
-                await task
-                downloaded += 1
-            except asyncio.CancelledError:
-                await loading.delete()
-                return await message.reply(
-                    f"**❌ Batch canceled** after downloading `{downloaded}` posts."
-                )
- 
+            async for chat_msg in get_messages_in_chunks(user, chat_id, next_id, end_id):
+                if SHUTTING_DOWN.is_set():
+                    return
+                if not chat_msg or chat_msg.empty:
+                    counts["skipped"] += 1
+                    if chat_msg:
+                        counts["skipped_ids"].append(chat_msg.id)
+                        next_id = chat_msg.id + 1
+                    continue
+                next_id = chat_msg.id + 1
+                if chat_msg.id in done_ids:
+                    continue
+
+                if content_only:
+                    has_media = bool(chat_msg.media_group_id or chat_msg.media)
+                    has_text  = bool(chat_msg.text or chat_msg.caption)
+                    if not (has_media or has_text):
+                        counts["skipped"] += 1
+                        continue
+
+                # The whole album is sent when its first member is reached
+                if chat_msg.media_group_id:
+                    if chat_msg.media_group_id in seen_groups:
+                        continue
+                    seen_groups.add(chat_msg.media_group_id)
+
+                yield PostJob(chat_message=chat_msg, post_url=f"{batch.prefix}/{chat_msg.id}")
+            break
+
         except Exception as e:
-            failed += 1
-            LOGGER(__name__).error(f"Error at {url}: {e}")
+            # Count the rest of the failing chunk and carry on with the next one
+            chunk_end = min(next_id + MAX_MESSAGES_PER_REQUEST - 1, end_id)
+            counts["fetch_failed"] += chunk_end - next_id + 1
+            LOGGER(__name__).error(f"Error fetching {batch.prefix}/{next_id}-{chunk_end}: {e}")
+            next_id = chunk_end + 1
+
+
+def format_ids(ids, limit: int = 20) -> str:
+    """``": 4, 7, 9"`` style suffix listing up to ``limit`` message IDs."""
+    if not ids:
+        return ""
+    shown = ", ".join(str(i) for i in ids[:limit])
+    more = f" and {len(ids) - limit} more" if len(ids) > limit else ""
+    return f": {shown}{more}"
+
+
+async def run_bdl(bot: Client, message: Message, batch: Batch):
+    """Download a journaled /bdl range, starting after its last finished post."""
+    start_chat, start_id, end_id = batch.source_chat, batch.next_id, batch.end_id
+    try:
+        start_chat = (await peer_cache.resolve(user, start_chat))["id"]
+    except Exception as e:
+        LOGGER(__name__).warning(f"Could not resolve {start_chat}: {e}")
  
-        await asyncio.sleep(3)
+    loading = await message.reply(f"📥 **__Downloading posts {start_id}–{end_id}…__**")
  
+    counts = {"skipped": 0, "skipped_ids": [], "fetch_failed": 0}
+
+    async def on_error(job, e):
+        LOGGER(__name__).error(f"Error at {job.post_url}: {e}")
+        await report_download_error(message, e)
+
+    pipeline = batch_pipeline(bot, message, on_error, batch)
+    task = track_task(pipeline.run(batch_posts(start_chat, batch, counts, content_only=True)))
+    try:
+        await task
+    except asyncio.CancelledError:
+        await loading.delete()
+        if SHUTTING_DOWN.is_set():
+            # Left running in the journal, resumed on the next start
+            return
+        journal.finish(batch, "cancelled")
+        return await message.reply(
+            f"**❌ Batch canceled** after downloading `{pipeline.completed}` posts."
+        )
+
+    downloaded = pipeline.completed
+    failed = pipeline.failed + counts["fetch_failed"]
+
     await loading.delete()
+    if SHUTTING_DOWN.is_set() and batch.cursor < end_id:
+        return await message.reply(
+            f"**⏸️ Bot is restarting.** The batch stopped after post `{batch.cursor}` "
+            "and resumes from there once the bot is back."
+        )
+
+    journal.finish(batch, "done")
     await message.reply(
         "**✅ Batch Process Complete!**\n"
         "━━━━━━━━━━━━━━━━━━━\n"
         f"📥 **Downloaded** : `{downloaded}` post(s)\n"
-        f"⏭️ **Skipped**    : `{skipped}` (no content)\n"
+        f"⏭️ **Skipped**    : `{counts['skipped']}` (no content)\n"
         f"❌ **Failed**     : `{failed}` error(s)"
     )
 
@@ -340,61 +525,202 @@ async def download_range(bot: Client, message: Message):
     if start_id > end_id:
         return await message.reply("❌ Start ID must be less than or equal to End ID.")
 
+    batch = journal.start(
+        "dlrange", message.chat.id, message.id, start_chat, f"https://t.me/{start_chat}", start_id, end_id
+    )
+    await run_dlrange(bot, message, batch)
+
+
+async def run_dlrange(bot: Client, message: Message, batch: Batch):
+    """Download a journaled /dlrange range, starting after its last finished post."""
+    start_chat, start_id, end_id = batch.source_chat, batch.next_id, batch.end_id
     await message.reply(f"📥 **Downloading posts from {start_id} to {end_id}...**")
 
-    for msg_id in range(start_id, end_id + 1):
+    try:
+        chat_id = (await peer_cache.resolve(user, start_chat))["id"]
+    except Exception as e:
+        LOGGER(__name__).warning(f"Could not resolve {start_chat}: {e}")
+        chat_id = start_chat
+
+    counts = {"skipped": 0, "skipped_ids": [], "fetch_failed": 0}
+
+    async def on_error(job, e):
+        await message.reply(f"❌ Error at {job.post_url}: {e}")
+
+    pipeline = batch_pipeline(bot, message, on_error, batch)
+    try:
+        await track_task(pipeline.run(batch_posts(chat_id, batch, counts)))
+    except asyncio.CancelledError:
+        if not SHUTTING_DOWN.is_set():
+            journal.finish(batch, "cancelled")
+        return
+
+    if SHUTTING_DOWN.is_set() and batch.cursor < end_id:
+        return
+    journal.finish(batch, "done")
+    await message.reply(
+        "**✅ Range Complete!**\n"
+        "━━━━━━━━━━━━━━━━━━━\n"
+        f"📥 **Downloaded** : `{pipeline.completed}` post(s)\n"
+        f"⏭️ **Skipped**    : `{counts['skipped']}` (empty or deleted{format_ids(counts['skipped_ids'])})\n"
+        f"❌ **Failed**     : `{pipeline.failed + counts['fetch_failed']}` error(s)"
+    )
+
+
+async def resume_batches():
+    """Pick up batches the previous run left unfinished."""
+    runners = {"bdl": run_bdl, "dlrange": run_dlrange}
+    for batch in journal.unfinished():
         try:
-            url = f"https://t.me/{start_chat}/{msg_id}"
-            await handle_download(bot, message, url)
-            await asyncio.sleep(2)
+            message = await bot.get_messages(batch.chat_id, batch.message_id)
+            if message is None or message.empty:
+                raise ValueError("command message no longer exists")
         except Exception as e:
-            await message.reply(f"❌ Error at {url}: {e}")
+            LOGGER(__name__).warning(f"Dropping unfinished batch {batch.id}: {e}")
+            journal.finish(batch, "abandoned")
+            continue
+
+        LOGGER(__name__).info(f"Resuming batch {batch.id} from {batch.next_id}")
+        await message.reply(f"♻️ **Resuming batch from post {batch.next_id}…**")
+        asyncio.create_task(runners[batch.command](bot, message, batch))
+
+
+async def shutdown():
+    """Let in-flight posts finish uploading, then checkpoint the journal."""
+    SHUTTING_DOWN.set()
+    if RUNNING_TASKS:
+        LOGGER(__name__).info(f"Waiting for {len(RUNNING_TASKS)} running task(s) to finish")
+        _, pending = await asyncio.wait(list(RUNNING_TASKS), timeout=PyroConf.SHUTDOWN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    journal.checkpoint()
+    peer_cache.save()
 
 
 @bot.on_message(filters.private & ~filters.command(COMMANDS))
 async def handle_any_message(bot: Client, message: Message):
     if message.text and not message.text.startswith("/"):
-        await track_task(handle_download(bot, message, message.text))
+        await track_task(schedule_download(bot, message, message.text))
+
+
+def format_rates(rates) -> Tuple[str, str]:
+    """Upload and download columns for a list of ``(sent, recv)`` rates."""
+    ups = " · ".join(
+        f"{get_readable_file_size(rate[0])}/s" if rate else "–" for rate in rates
+    )
+    downs = " · ".join(
+        f"{get_readable_file_size(rate[1])}/s" if rate else "–" for rate in rates
+    )
+    return ups, downs
 
 
 @bot.on_message(filters.command("stats") & filters.private)
 async def stats(_, message: Message):
+    # Everything comes from the background sampler, nothing here waits on psutil
+    sample = system_sampler.latest
+    if sample is None:
+        return await message.reply("**⏳ Stats are still being collected, try again in a moment.**")
+
     currentTime = get_readable_time(time() - PyroConf.BOT_START_TIME)
-    total, used, free = shutil.disk_usage(".")
-    total = get_readable_file_size(total)
-    used = get_readable_file_size(used)
-    free = get_readable_file_size(free)
-    sent = get_readable_file_size(psutil.net_io_counters().bytes_sent)
-    recv = get_readable_file_size(psutil.net_io_counters().bytes_recv)
-    cpuUsage = psutil.cpu_percent(interval=0.5)
-    memory = psutil.virtual_memory().percent
-    disk = psutil.disk_usage("/").percent
-    process = psutil.Process(os.getpid())
+    total = get_readable_file_size(sample.disk_total)
+    used = get_readable_file_size(sample.disk_used)
+    free = get_readable_file_size(sample.disk_free)
+    reserved = get_readable_file_size(disk_ledger.reserved)
+    reclaimed = get_readable_file_size(janitor.reclaimed_bytes)
+    sent = get_readable_file_size(sample.bytes_sent)
+    recv = get_readable_file_size(sample.bytes_recv)
+    up_rates, down_rates = format_rates([system_sampler.rates(minutes * 60) for minutes in (1, 5, 15)])
+    thumbs = thumbnail_pool.stats()
+    jobs = scheduler.stats()
 
     stats = (
         "**≧◉◡◉≦ Bot is Up and Running successfully.**\n\n"
         f"**➜ Bot Uptime:** `{currentTime}`\n"
         f"**➜ Total Disk Space:** `{total}`\n"
         f"**➜ Used:** `{used}`\n"
-        f"**➜ Free:** `{free}`\n"
-        f"**➜ Memory Usage:** `{round(process.memory_info()[0] / 1024**2)} MiB`\n\n"
+        f"**➜ Free:** `{free}` | **Reserved:** `{reserved}`\n"
+        f"**➜ Reclaimed:** `{reclaimed}` from `{janitor.reclaimed_files}` orphaned file(s)\n"
+        f"**➜ Memory Usage:** `{round(sample.rss / 1024**2)} MiB`\n\n"
         f"**➜ Upload:** `{sent}`\n"
-        f"**➜ Download:** `{recv}`\n\n"
-        f"**➜ CPU:** `{cpuUsage}%` | "
-        f"**➜ RAM:** `{memory}%` | "
-        f"**➜ DISK:** `{disk}%`"
+        f"   `{up_rates}` (1/5/15 min)\n"
+        f"**➜ Download:** `{recv}`\n"
+        f"   `{down_rates}` (1/5/15 min)\n\n"
+        f"**➜ Jobs:** `{jobs['active']}/{jobs['capacity']}` running, "
+        f"`{jobs['queued']}` queued, `{jobs['users']}` user(s)\n"
+        f"**➜ Tasks:** `{len(RUNNING_TASKS)}` running\n"
+        f"**➜ Thumbnails:** `{thumbs['running']}/{thumbs['workers']}` running, "
+        f"`{thumbs['queued']}` queued, avg wait `{thumbs['avg_wait']:.1f}s`\n\n"
+        f"**➜ CPU:** `{sample.cpu}%` | "
+        f"**➜ RAM:** `{sample.memory}%` | "
+        f"**➜ DISK:** `{sample.disk_percent}%`"
     )
     await message.reply(stats)
 
 
 @bot.on_message(filters.command("logs") & filters.private)
 async def logs(_, message: Message):
-    if os.path.exists("logs.txt"):
-        await message.reply_document(document="logs.txt", caption="**Logs**")
+    # A copy, so the upload doesn't race the writes that keep coming in
+    snapshot = await asyncio.to_thread(logs_snapshot)
+    if snapshot is not None:
+        await message.reply_document(document=snapshot, caption="**Logs**")
     else:
         await message.reply("**Not exists**")
 
 
+@bot.on_message(filters.command("trace") & filters.user(PyroConf.OWNER_ID))
+async def show_trace(_, message: Message):
+    if len(message.command) > 1:
+        if not message.command[1].isdigit():
+            return await message.reply("**Usage:** `/trace <job>`, or `/trace` for the latest job.")
+        trace = tracer.get(int(message.command[1]))
+    else:
+        trace = tracer.latest()
+    if trace is None:
+        return await message.reply("**No trace found for that job.**")
+
+    if trace.duration is None:
+        state, total = "running", time() - trace.started_at
+    else:
+        state, total = "failed" if trace.error else "done", trace.duration
+    text = (
+        f"**🔎 Trace {trace.id}** – `{state}` in `{total:.2f}s`\n"
+        f"**➜ Post:** `{trace.label}`\n"
+    )
+    if trace.error:
+        text += f"**➜ Error:** `{trace.error}`\n"
+    if trace.spans:
+        text += f"```\n{trace.waterfall()}\n```"
+    await message.reply(text[:MAX_MESSAGE_LENGTH], disable_web_page_preview=True)
+
+
+@bot.on_message(filters.command("slowest") & filters.user(PyroConf.OWNER_ID))
+async def show_slowest(_, message: Message):
+    args = message.command[1:]
+    stage = next((arg for arg in args if not arg.isdigit()), None)
+    limit = min(25, next((int(arg) for arg in args if arg.isdigit()), 10))
+    traces = tracer.slowest(limit, stage)
+    if not traces:
+        return await message.reply("**No finished jobs traced yet.**")
+
+    lines = []
+    for trace in traces:
+        if stage:
+            detail = f"{stage} `{trace.stage(stage):.2f}s`"
+        else:
+            worst = trace.slowest_stage()
+            detail = f"{worst.name} `{worst.duration:.2f}s`" if worst else "no stages"
+        mark = " ❌" if trace.error else ""
+        lines.append(f"`{trace.id}` `{trace.duration:.2f}s` – {detail} – {trace.label}{mark}")
+
+    title = f"by {stage}" if stage else "by total time"
+    await message.reply(
+        f"**🐢 Slowest recent jobs {title}:**\n" + "\n".join(lines)
+        + "\n\nSend `/trace <job>` for the full breakdown.",
+        disable_web_page_preview=True,
+    )
+
+
 @bot.on_message(filters.command("killall"))
 async def cancel_all_tasks(_, message: Message):
     cancelled = 0
@@ -682,15 +1008,31 @@ async def ping_command(client, message):
     
 
 
+async def main():
+    await user.start()
+    await peer_cache.install(user)
+    asyncio.create_task(peer_cache.warm(user, PyroConf.PEER_WARMUP_DIALOGS))
+    await bot.start()
+    LOGGER(__name__).info("Bot Started!")
+    janitor.start()
+    await system_sampler.start()
+    await start_metrics_server()
+
+    asyncio.create_task(resume_batches())
+    await idle()
+
+    await shutdown()
+    await bot.stop()
+    await user.stop()
+
+
 if __name__ == "__main__":
     # Create folders if they don't exist
     Path("assets").mkdir(parents=True, exist_ok=True)
     Path("default_thumbs").mkdir(parents=True, exist_ok=True)
 
     try:
-        LOGGER(__name__).info("Bot Started!")
-        user.start()
-        bot.run()
+        bot.run(main())
     except KeyboardInterrupt:
         pass
     except Exception as err:
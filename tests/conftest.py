@@ -0,0 +1,22 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+"""Shared setup for the unit tests.
+
+Run them with ``python -m pytest tests``. The bot's modules read their
+settings at import time, so the caches and the journal are switched off
+here and everything they create lands in a scratch directory.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("FILE_ID_CACHE", "")
+os.environ.setdefault("PEER_CACHE", "")
+os.environ.setdefault("JOB_JOURNAL", "")
+# Importing the bot's modules creates folders and logs.txt in the working directory
+os.chdir(tempfile.mkdtemp(prefix="rcdl-tests-"))
@@ -0,0 +1,80 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import asyncio
+
+import pytest
+from pyrogram import types
+
+os.environ.setdefault("BOT_TOKEN", "123456:test")
+os.environ.setdefault("SESSION_STRING", "test")
+os.environ.setdefault("METRICS_PORT", "0")
+
+import main  # noqa: E402
+from helpers.journal import JobJournal  # noqa: E402
+
+
+class User:
+    """Serves posts by id; ids in ``missing`` come back empty."""
+
+    def __init__(self, missing=(), albums=None, fail_chunks=()):
+        self.missing = set(missing)
+        self.albums = albums or {}
+        self.fail_chunks = set(fail_chunks)
+        self.calls = 0
+
+    async def get_messages(self, chat_id, message_ids):
+        self.calls += 1
+        if self.calls in self.fail_chunks:
+            raise ConnectionError("chunk lost")
+        return [
+            types.Message(id=i, empty=True) if i in self.missing
+            else types.Message(id=i, text=f"post {i}", media_group_id=self.albums.get(i))
+            for i in message_ids
+        ]
+
+
+@pytest.fixture
+def batch_env(monkeypatch):
+    journal = JobJournal("")
+    monkeypatch.setattr(main, "journal", journal)
+
+    def run(user, start_id=1, end_id=10, done=()):
+        monkeypatch.setattr(main, "user", user)
+        batch = journal.start("bdl", 1, 1, "chan", "https://t.me/chan", start_id, end_id)
+        for message_id in done:
+            journal.record(batch, message_id, "done", user.albums.get(message_id))
+        counts = {"skipped": 0, "skipped_ids": [], "fetch_failed": 0}
+
+        async def collect():
+            return [job.chat_message.id async for job in main.batch_posts("chan", batch, counts, True)]
+        return asyncio.run(collect()), counts
+
+    return run
+
+
+def test_yields_every_post_once_per_album(batch_env):
+    ids, counts = batch_env(User(missing={4}, albums={6: "a", 7: "a", 8: "a"}))
+    assert ids == [1, 2, 3, 5, 6, 9, 10]
+    assert counts == {"skipped": 1, "skipped_ids": [4], "fetch_failed": 0}
+
+
+def test_resume_skips_posts_and_albums_already_sent(batch_env):
+    # Stopped right after sending the album that starts at 4
+    ids, _ = batch_env(User(albums={4: "a", 5: "a", 6: "a"}), done=(1, 2, 3, 4))
+    assert ids == [7, 8, 9, 10]
+
+
+def test_failed_chunk_is_counted_and_skipped(batch_env, monkeypatch):
+    monkeypatch.setattr(main, "MAX_MESSAGES_PER_REQUEST", 5)
+    monkeypatch.setattr("helpers.msg.MAX_MESSAGES_PER_REQUEST", 5)
+    ids, counts = batch_env(User(fail_chunks={1}), end_id=400)
+    assert ids[0] == 6
+    assert counts["fetch_failed"] == 5
+
+
+def test_skipped_ids_are_listed():
+    assert main.format_ids([]) == ""
+    assert main.format_ids([4, 7]) == ": 4, 7"
+    assert main.format_ids(list(range(1, 25)), limit=3) == ": 1, 2, 3 and 21 more"
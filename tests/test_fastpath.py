@@ -0,0 +1,34 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from types import SimpleNamespace
+
+from pyrogram.errors import ChatForwardsRestricted, InternalServerError
+
+from helpers.fastpath import COPY_MODE_CACHE, copy_post
+
+
+class Bot:
+    def __init__(self, error):
+        self.error = error
+
+    async def copy_message(self, **kwargs):
+        raise self.error
+
+
+def post(chat_id):
+    chat = SimpleNamespace(id=chat_id, username=None)
+    return SimpleNamespace(chat=chat, id=1, media_group_id=None)
+
+
+def test_restricted_chat_is_remembered():
+    message = SimpleNamespace(chat=SimpleNamespace(id=99))
+    assert not asyncio.run(copy_post(Bot(ChatForwardsRestricted()), message, post(-1001)))
+    assert COPY_MODE_CACHE[-1001] is False
+
+
+def test_other_errors_fall_back_for_this_post_only():
+    message = SimpleNamespace(chat=SimpleNamespace(id=99))
+    assert not asyncio.run(copy_post(Bot(InternalServerError()), message, post(-1002)))
+    assert -1002 not in COPY_MODE_CACHE
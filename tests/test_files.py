@@ -0,0 +1,113 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import io
+import os
+import asyncio
+from collections import namedtuple
+
+import pytest
+
+from helpers.files import DiskLedger, MemoryBudget, disk_owner, get_readable_file_size
+
+Usage = namedtuple("Usage", "total used free")
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = DiskLedger(str(tmp_path), high_water=100)
+    monkeypatch.setattr(ledger, "usage", lambda: Usage(10 ** 7, 0, 10 ** 7))
+    return ledger
+
+
+def test_reservations_are_keyed_by_absolute_path(ledger):
+    asyncio.run(ledger.reserve("a.bin", 300))
+    asyncio.run(ledger.reserve("a.bin", 100))
+    assert ledger.reservations == {os.path.abspath("a.bin"): 400}
+    ledger.release("a.bin")
+    assert ledger.reserved == 0
+
+
+def test_written_bytes_are_not_counted_twice(ledger, tmp_path):
+    path = tmp_path / "partial.bin"
+    asyncio.run(ledger.reserve(str(path), 1 << 20))
+    path.write_bytes(os.urandom(256 * 1024))
+    assert ledger.pending() <= (1 << 20) - 256 * 1024
+    path.with_name("partial.bin.temp").write_bytes(os.urandom(256 * 1024))
+    assert ledger.pending() <= (1 << 20) - 512 * 1024
+
+
+def test_download_waits_for_a_release(ledger):
+    async def run():
+        await ledger.reserve("first.bin", 8 * 10 ** 6)
+        second = asyncio.create_task(ledger.reserve("second.bin", 3 * 10 ** 6))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+
+        ledger.release("first.bin")
+        await asyncio.wait_for(second, 1)
+        assert ledger.reservations == {os.path.abspath("second.bin"): 3 * 10 ** 6}
+    asyncio.run(run())
+
+
+def test_too_big_with_nothing_to_wait_for(ledger):
+    with pytest.raises(IOError):
+        asyncio.run(ledger.reserve("huge.bin", 2 * 10 ** 7))
+    assert ledger.reservations == {}
+
+
+def test_never_waits_on_its_own_job_or_later_ones(ledger):
+    async def run(owner, path):
+        disk_owner.set(owner)
+        await ledger.reserve(path, 8 * 10 ** 6)
+
+    queue = object()
+    asyncio.run(run((queue, 2), "album-1.bin"))
+    # A sibling in the same album, then the job uploaded before it
+    with pytest.raises(IOError):
+        asyncio.run(run((queue, 2), "album-2.bin"))
+    with pytest.raises(IOError):
+        asyncio.run(run((queue, 1), "previous.bin"))
+    assert list(ledger.reservations) == [os.path.abspath("album-1.bin")]
+
+
+def test_waits_on_earlier_jobs_up_to_the_timeout(ledger):
+    async def run(owner, path):
+        disk_owner.set(owner)
+        await ledger.reserve(path, 8 * 10 ** 6)
+
+    queue = object()
+    asyncio.run(run((queue, 1), "first.bin"))
+    ledger.wait_timeout = 0.05
+    with pytest.raises(IOError):
+        asyncio.run(run((queue, 2), "second.bin"))
+
+
+def test_move_keeps_the_reservation(ledger):
+    asyncio.run(ledger.reserve("planned.bin", 500))
+    ledger.move("planned.bin", "actual.bin")
+    assert ledger.reservations == {os.path.abspath("actual.bin"): 500}
+    ledger.release("planned.bin")
+    assert ledger.reserved == 500
+
+
+def test_memory_budget():
+    budget = MemoryBudget(100)
+    assert budget.try_reserve(60)
+    assert not budget.try_reserve(60)
+    buffer = io.BytesIO(b"x" * 60)
+    budget.attach(buffer, 60)
+    budget.release(buffer)
+    assert budget.used == 0
+    assert buffer.closed
+
+    assert budget.try_reserve(100)
+    budget.cancel(100)
+    assert budget.used == 0
+
+
+@pytest.mark.parametrize("size, text", [
+    (None, "0B"), (512, "512.00 B"), (1536, "1.50 KB"), (3 * 1024 ** 3, "3.00 GB"),
+])
+def test_readable_file_size(size, text):
+    assert get_readable_file_size(size) == text
@@ -0,0 +1,67 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+from helpers.journal import JobJournal
+
+
+def start(journal, source_chat="itsSmartDev", start_id=100, end_id=120):
+    return journal.start(
+        "bdl", 42, 7, source_chat, f"https://t.me/{source_chat}", start_id, end_id
+    )
+
+
+def test_new_batch_starts_at_its_first_post():
+    journal = JobJournal("")
+    batch = start(journal)
+    assert batch.state == "running"
+    assert batch.cursor == 99
+    assert batch.next_id == 100
+
+
+def test_record_moves_the_cursor_forward_only():
+    journal = JobJournal("")
+    batch = start(journal)
+    journal.record(batch, 103, "done")
+    journal.record(batch, 101, "failed", error="boom")
+    assert batch.cursor == 103
+    assert batch.next_id == 104
+    assert journal.get(batch.id).cursor == 103
+
+
+def test_finished_lists_only_done_posts_and_albums():
+    journal = JobJournal("")
+    batch = start(journal)
+    journal.record(batch, 100, "done")
+    journal.record(batch, 101, "done", media_group_id="album")
+    journal.record(batch, 104, "failed", media_group_id="other")
+    assert journal.finished(batch) == ({100, 101}, {"album"})
+
+
+def test_numeric_chats_round_trip_as_ints():
+    journal = JobJournal("")
+    assert journal.get(start(journal, -1001234567890).id).source_chat == -1001234567890
+    assert journal.get(start(journal, "itsSmartDev").id).source_chat == "itsSmartDev"
+
+
+def test_running_batches_resume_after_a_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    journal = JobJournal(path)
+    done, interrupted = start(journal), start(journal, start_id=200, end_id=300)
+    journal.record(done, 120, "done")
+    journal.finish(done, "done")
+    journal.record(interrupted, 250, "done")
+    journal.conn.close()
+
+    reopened = JobJournal(path)
+    (batch,) = reopened.unfinished()
+    assert batch.id == interrupted.id
+    assert batch.next_id == 251
+    assert reopened.finished(batch) == ({250}, set())
+
+
+def test_finished_batches_are_not_resumed():
+    journal = JobJournal("")
+    batch = start(journal)
+    journal.finish(batch, "cancelled")
+    assert journal.unfinished() == []
+    assert journal.get(batch.id).state == "cancelled"
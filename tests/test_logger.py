@@ -0,0 +1,59 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import sys
+import json
+import logging
+
+import logger as bot_logger
+from logger import JsonFormatter, RateLimitFilter
+
+
+def make_record(name="helpers.utils", level=logging.INFO, msg="line %d", args=(1,)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def passed(log_filter, records):
+    return [record for record in records if log_filter.filter(record)]
+
+
+def test_info_lines_are_capped_per_logger():
+    log_filter = RateLimitFilter(limit=3, window=60)
+    assert len(passed(log_filter, [make_record() for _ in range(10)])) == 3
+    assert log_filter.filter(make_record(name="main"))
+
+
+def test_warnings_always_pass():
+    log_filter = RateLimitFilter(limit=1, window=60)
+    records = [make_record(level=logging.WARNING) for _ in range(5)]
+    assert len(passed(log_filter, records)) == 5
+
+
+def test_zero_limit_disables_the_cap():
+    log_filter = RateLimitFilter(limit=0, window=60)
+    assert len(passed(log_filter, [make_record() for _ in range(100)])) == 100
+
+
+def test_next_window_reports_dropped_lines(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bot_logger, "monotonic", lambda: now[0])
+    log_filter = RateLimitFilter(limit=2, window=10)
+    passed(log_filter, [make_record() for _ in range(5)])
+
+    now[0] += 10
+    record = make_record(args=(42,))
+    assert log_filter.filter(record)
+    assert record.getMessage() == "line 42 [3 similar line(s) suppressed]"
+
+
+def test_json_formatter():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("main", logging.ERROR, __file__, 7, "failed %s", ("job",),
+                                   sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "failed job"
+    assert entry["line"] == 7
+    assert "ValueError: boom" in entry["exc"]
@@ -0,0 +1,164 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import os
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+import pytest
+
+from helpers.pipeline import BatchPipeline
+
+
+async def source(jobs):
+    for job in jobs:
+        yield job
+
+
+def test_uploads_keep_source_order():
+    uploaded = []
+
+    async def download(job):
+        # Later jobs often finish first
+        await asyncio.sleep(random.random() / 100)
+        return job
+
+    async def prepare(job):
+        await asyncio.sleep(random.random() / 100)
+        return job
+
+    async def upload(job):
+        uploaded.append(job)
+
+    pipeline = BatchPipeline(download, prepare, upload, concurrency=4)
+    assert asyncio.run(pipeline.run(source(range(20)))) == (20, 0)
+    assert uploaded == list(range(20))
+
+
+def test_failed_stage_is_reported_and_others_continue():
+    uploaded, errors = [], []
+
+    async def download(job):
+        if job == 2:
+            raise IOError("download failed")
+        return job
+
+    async def prepare(job):
+        if job == 4:
+            raise ValueError("prepare failed")
+        return job
+
+    async def upload(job):
+        uploaded.append(job)
+
+    async def on_error(job, e):
+        errors.append((job, str(e)))
+
+    pipeline = BatchPipeline(download, prepare, upload, on_error=on_error, concurrency=2)
+    assert asyncio.run(pipeline.run(source(range(6)))) == (4, 2)
+    assert uploaded == [0, 1, 3, 5]
+    assert errors == [(2, "download failed"), (4, "prepare failed")]
+
+
+def test_cancel_releases_unsent_jobs_and_slots():
+    uploaded, released = [], []
+    slots = 0
+
+    async def download(job):
+        return job
+
+    async def prepare(job):
+        return job
+
+    async def upload(job):
+        uploaded.append(job)
+        if job == 0:
+            # Stall the ordered upload so the rest pile up behind it
+            await asyncio.Event().wait()
+
+    @asynccontextmanager
+    async def slot():
+        nonlocal slots
+        slots += 1
+        try:
+            yield
+        finally:
+            slots -= 1
+
+    async def run():
+        pipeline = BatchPipeline(
+            download, prepare, upload, concurrency=3, slot=slot, release=released.append
+        )
+        task = asyncio.create_task(pipeline.run(source(range(10))))
+        # Let the queues fill up behind the stalled upload
+        for _ in range(50):
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return pipeline
+
+    pipeline = asyncio.run(run())
+    assert uploaded == [0]
+    # Job 0 was in upload, which cleans up after itself. Jobs 1-3 fill
+    # order_q and job 4 is waiting to get in.
+    assert sorted(released) == [1, 2, 3, 4]
+    assert not pipeline.pending
+    assert slots == 0
+
+
+
+def high_water_run(monkeypatch, tmp_path, download, jobs):
+    from collections import namedtuple
+
+    from helpers import files
+
+    # A 10 MB volume
+    ledger = files.DiskLedger(str(tmp_path), high_water=100)
+    Usage = namedtuple("Usage", "total used free")
+    monkeypatch.setattr(ledger, "usage", lambda: Usage(10 ** 7, 0, 10 ** 7))
+    uploaded = []
+
+    async def prepare(job):
+        return job
+
+    async def upload(job):
+        uploaded.append(job)
+        release(job)
+
+    async def on_error(job, e):
+        release(job)
+
+    def release(job):
+        for path in list(ledger.reservations):
+            if os.path.basename(path).startswith(f"{job}-"):
+                ledger.release(path)
+
+    pipeline = BatchPipeline(
+        lambda job: download(ledger, job), prepare, upload, on_error=on_error, concurrency=2
+    )
+    result = asyncio.run(asyncio.wait_for(pipeline.run(source(jobs)), 5))
+    assert not ledger.reservations
+    return result, uploaded
+
+
+def test_album_over_the_high_water_mark_fails_instead_of_waiting(monkeypatch, tmp_path):
+    async def download(ledger, job):
+        # Two 6 MB members can never both fit
+        await asyncio.gather(*(ledger.reserve(f"{job}-{i}.bin", 6 * 10 ** 6) for i in range(2)))
+        return job
+
+    assert high_water_run(monkeypatch, tmp_path, download, range(2)) == ((0, 2), [])
+
+
+def test_batch_head_never_waits_on_later_jobs(monkeypatch, tmp_path):
+    async def download(ledger, job):
+        if job == 0:
+            # Job 1 takes the space first, but can only be uploaded after job 0
+            await asyncio.sleep(0.01)
+        await ledger.reserve(f"{job}-0.bin", 6 * 10 ** 6)
+        return job
+
+    # Job 2 waits for job 1's upload to free its space
+    assert high_water_run(monkeypatch, tmp_path, download, range(3)) == ((2, 1), [1, 2])
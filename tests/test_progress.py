@@ -0,0 +1,53 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+from types import SimpleNamespace
+
+from helpers.progress import ProgressReporter
+
+
+class Message:
+    def __init__(self, chat_id=1, message_id=1):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.id = message_id
+        self.edits = []
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+
+
+def test_edits_only_when_counters_move():
+    async def run():
+        reporter = ProgressReporter(interval=60)
+        message = Message()
+        await reporter.progress(10, 100, "📥", message, 0, "{current}")
+        await reporter.tick()
+        await asyncio.gather(*reporter.edits)
+        # Elapsed time and speed change, the counters don't
+        await reporter.tick()
+        await asyncio.gather(*reporter.edits)
+        await reporter.progress(20, 100, "📥", message, 0, "{current}")
+        await reporter.tick()
+        await asyncio.gather(*reporter.edits)
+        reporter._ticker.cancel()
+        return message, reporter
+
+    message, reporter = asyncio.run(run())
+    assert len(message.edits) == 2
+    assert not reporter.edits
+
+
+def test_finished_transfer_gets_a_final_edit_and_is_dropped():
+    async def run():
+        reporter = ProgressReporter(interval=60)
+        message = Message()
+        await reporter.progress(100, 100, "📥", message, 0, "{status_message}")
+        await reporter.tick()
+        await asyncio.gather(*reporter.edits)
+        reporter._ticker.cancel()
+        return message, reporter
+
+    message, reporter = asyncio.run(run())
+    assert message.edits == ["📥\n\nCompleted"]
+    assert not reporter.transfers
@@ -0,0 +1,147 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+
+from pyrogram.errors import FloodWait
+
+from helpers import ratelimit
+from helpers.ratelimit import RateLimiter, TokenBucket
+
+
+class Client:
+    """Records the sleep threshold of every RPC its methods make."""
+
+    def __init__(self, floods=0):
+        self.floods = floods
+        self.uploads = 0
+        self.thresholds = []
+
+    async def invoke(self, query, retries=5, timeout=15, sleep_threshold=None):
+        self.thresholds.append((query, sleep_threshold))
+
+    async def send_message(self, chat_id, text):
+        await self.invoke("send")
+        if self.floods:
+            self.floods -= 1
+            raise FloodWait(value=0)
+        return text
+
+    async def send_video(self, chat_id, video):
+        self.uploads += 1
+        await self.invoke("send_media")
+        if self.floods:
+            self.floods -= 1
+            raise FloodWait(value=0)
+        return video
+
+    async def get_messages(self, chat_id, ids):
+        await self.invoke("get_messages", sleep_threshold=-1)
+        return ids
+
+    async def get_media_group(self, chat_id, message_id):
+        # Pyrogram fetches the album through get_messages
+        return await self.get_messages(chat_id, [message_id])
+
+    async def resolve_peer(self, peer_id):
+        await self.invoke("resolve")
+
+    def __getattr__(self, name):
+        async def method(*args, **kwargs):
+            return None
+        return method
+
+
+def test_bucket_burst_then_paced():
+    async def run():
+        bucket = TokenBucket("send", rate=1000, burst=3)
+        for _ in range(3):
+            await bucket.acquire()
+        assert bucket.tokens < 1
+        await bucket.acquire()
+    asyncio.run(run())
+
+
+def test_bucket_flood_wait_halves_and_blocks():
+    bucket = TokenBucket("send", rate=4, burst=5)
+    bucket.on_flood_wait(3)
+    assert bucket.rate == 2
+    assert bucket.tokens == 0
+    assert bucket.blocked_until > 0
+    assert (bucket.flood_waits, bucket.flood_wait_seconds) == (1, 3)
+
+    for _ in range(10):
+        bucket.on_flood_wait(1)
+    assert bucket.rate == bucket.min_rate
+
+
+def test_bucket_success_is_capped():
+    bucket = TokenBucket("send", rate=1, burst=1, max_rate=1.1)
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 1.1
+
+
+def test_capped_buckets_never_rise():
+    limiter = RateLimiter()
+    for name in ratelimit.CAPPED_BUCKETS:
+        bucket = limiter.buckets[name]
+        start = bucket.rate
+        bucket.on_success()
+        assert bucket.rate == start
+
+
+def test_retries_flood_waits_and_counts_them():
+    client = Client(floods=2)
+    limiter = RateLimiter().install(client)
+    assert asyncio.run(client.send_message(1, "hi")) == "hi"
+    assert limiter.flood_waits["send_message"] == 2
+    assert limiter.buckets["send"].flood_waits == 2
+
+
+def test_gives_up_after_max_retries():
+    client = Client(floods=5)
+    RateLimiter(max_retries=1).install(client)
+    try:
+        asyncio.run(client.send_message(1, "hi"))
+    except FloodWait:
+        pass
+    else:
+        raise AssertionError("FloodWait was swallowed")
+    assert client.floods == 3
+
+
+def test_only_limited_calls_hand_flood_waits_to_the_limiter():
+    client = Client()
+    RateLimiter().install(client)
+
+    async def run():
+        await client.send_message(1, "hi")
+        await client.resolve_peer(1)
+        await client.invoke("pinned", sleep_threshold=60)
+    asyncio.run(run())
+
+    assert client.thresholds == [("send", 0), ("resolve", None), ("pinned", 60)]
+
+
+def test_uploads_keep_the_client_threshold_and_are_not_retried():
+    client = Client(floods=1)
+    limiter = RateLimiter().install(client)
+    try:
+        asyncio.run(client.send_video(1, "video.mp4"))
+    except FloodWait:
+        pass
+    else:
+        raise AssertionError("FloodWait was swallowed")
+    # Sent once, so the file was uploaded once
+    assert client.uploads == 1
+    assert client.thresholds == [("send_media", None)]
+    assert limiter.flood_waits["send_video"] == 1
+
+
+def test_nested_calls_are_charged_once():
+    client = Client()
+    rates = dict(ratelimit.DEFAULT_RATES, get_messages=(0.001, 10))
+    limiter = RateLimiter(rates=rates).install(client)
+    assert asyncio.run(client.get_media_group(1, 5)) == [5]
+    assert 8.5 < limiter.buckets["get_messages"].tokens < 9.5
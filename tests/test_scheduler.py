@@ -0,0 +1,110 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import asyncio
+
+from helpers.scheduler import BULK, INTERACTIVE, FairScheduler
+
+
+async def admit(scheduler, owner, order, lane=BULK, hold=None):
+    async with scheduler.slot(owner, lane):
+        order.append(owner)
+        if hold is not None:
+            await hold.wait()
+
+
+def run_order(scheduler, jobs):
+    """Start ``jobs`` (owner, lane) while one blocker holds every slot; admission order."""
+    async def run():
+        order = []
+        gate = asyncio.Event()
+        blockers = [
+            asyncio.create_task(admit(scheduler, f"blocker{i}", [], hold=gate))
+            for i in range(scheduler.capacity)
+        ]
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(admit(scheduler, owner, order, lane)) for owner, lane in jobs]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*blockers, *tasks)
+        return order
+    return asyncio.run(run())
+
+
+def test_users_are_interleaved():
+    scheduler = FairScheduler(capacity=1, per_user=1)
+    jobs = [("alice", BULK)] * 4 + [("bob", BULK)] * 2
+    assert run_order(scheduler, jobs) == ["alice", "bob", "alice", "bob", "alice", "alice"]
+
+
+def test_interactive_lane_goes_first():
+    scheduler = FairScheduler(capacity=1, per_user=1)
+    jobs = [("alice", BULK), ("alice", BULK), ("bob", INTERACTIVE)]
+    assert run_order(scheduler, jobs) == ["bob", "alice", "alice"]
+
+
+def test_per_user_quota():
+    async def run():
+        scheduler = FairScheduler(capacity=4, per_user=2)
+        await scheduler.acquire("alice")
+        await scheduler.acquire("alice")
+        third = asyncio.create_task(scheduler.acquire("alice"))
+        await scheduler.acquire("bob")
+        await asyncio.sleep(0)
+        assert not third.done()
+        assert scheduler.stats()["active"] == 3
+
+        scheduler.release("alice")
+        await third
+        assert scheduler.running["alice"] == 2
+    asyncio.run(run())
+
+
+def test_queue_position_is_reported():
+    async def run():
+        scheduler = FairScheduler(capacity=1, per_user=1)
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        await scheduler.acquire("alice")
+        waiting = [
+            asyncio.create_task(scheduler.acquire(owner, on_queued=on_queued))
+            for owner in ("bob", "carol")
+        ]
+        await asyncio.sleep(0)
+        assert positions == [1, 2]
+        for _ in waiting:
+            scheduler.release(next(iter(scheduler.running)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        scheduler = FairScheduler(capacity=1, per_user=1)
+        await scheduler.acquire("alice")
+        waiter = asyncio.create_task(scheduler.acquire("bob"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.waiters == []
+
+        scheduler.release("alice")
+        assert scheduler.active == 0
+        assert not scheduler.running
+    asyncio.run(run())
+
+
+def test_slot_is_released_on_error():
+    async def run():
+        scheduler = FairScheduler(capacity=1, per_user=1)
+        try:
+            async with scheduler.slot("alice"):
+                raise ValueError
+        except ValueError:
+            pass
+        assert scheduler.active == 0
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import pytest
+
+from helpers.sysstats import Sample, SystemSampler
+
+
+def sample(at, sent, recv):
+    return Sample(at=at, cpu=0.0, memory=0.0, rss=0, disk_total=0, disk_used=0, disk_free=0,
+                  disk_percent=0.0, bytes_sent=sent, bytes_recv=recv)
+
+
+@pytest.fixture
+def sampler():
+    sampler = SystemSampler(interval=5)
+    # One sample every 5s: 1 KB/s up, 2 KB/s down for the first minute, idle after
+    for i in range(25):
+        seconds = min(i * 5, 60)
+        sampler.samples.append(sample(i * 5.0, seconds * 1000, seconds * 2000))
+    return sampler
+
+
+def test_needs_two_samples():
+    sampler = SystemSampler(interval=5)
+    assert sampler.rates(60) is None
+    sampler.samples.append(sample(0.0, 0, 0))
+    assert sampler.rates(60) is None
+    assert sampler.latest is not None
+
+
+def test_rates_over_a_window(sampler):
+    assert sampler.rates(60) == (0.0, 0.0)
+    assert sampler.rates(120) == (500.0, 1000.0)
+
+
+def test_short_history_uses_what_exists(sampler):
+    assert sampler.rates(15 * 60) == pytest.approx((60000 / 120, 120000 / 120))
+
+
+def test_counter_resets_do_not_go_negative():
+    sampler = SystemSampler(interval=5)
+    sampler.samples.append(sample(0.0, 10000, 10000))
+    sampler.samples.append(sample(5.0, 0, 0))
+    assert sampler.rates(60) == (0.0, 0.0)
+
+
+def test_window_is_bounded():
+    sampler = SystemSampler(interval=5)
+    for i in range(1000):
+        sampler.samples.append(sample(i * 5.0, 0, 0))
+    assert len(sampler.samples) == 15 * 60 // 5 + 2
+
+
+def test_sample_reads_the_system(tmp_path):
+    reading = SystemSampler(interval=5, path=str(tmp_path)).sample()
+    assert reading.disk_total > 0
+    assert 0 <= reading.disk_percent <= 100
+    assert reading.rss > 0
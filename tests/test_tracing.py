@@ -0,0 +1,110 @@
+# Copyright (C) @TheSmartBisnu
+# Channel: https://t.me/itsSmartDev
+
+import json
+import asyncio
+
+import pytest
+
+from helpers.tracing import Tracer, span, traced
+
+
+def record(tracer, label="job", error=None):
+    trace = tracer.start(label)
+    with tracer.activate(trace):
+        with span("download"):
+            with span("get_media_info"):
+                pass
+        with span("upload"):
+            pass
+    tracer.finish(trace, error)
+    return trace
+
+
+def test_spans_nest_under_the_active_trace():
+    trace = record(Tracer())
+    assert [(s.name, s.depth) for s in trace.spans] == [
+        ("download", 0), ("get_media_info", 1), ("upload", 0)
+    ]
+    assert all(s.duration is not None for s in trace.spans)
+    assert trace.slowest_stage().depth == 0
+
+
+def test_span_outside_a_trace_is_a_no_op():
+    with span("download"):
+        pass
+
+
+def test_errors_are_recorded():
+    tracer = Tracer()
+    trace = tracer.start("job")
+    with tracer.activate(trace):
+        with pytest.raises(ValueError):
+            with span("prepare"):
+                raise ValueError("bad")
+    tracer.finish(trace, ValueError("bad"))
+    assert trace.spans[0].error == "ValueError"
+    assert trace.error == "ValueError: bad"
+
+
+def test_traced_coroutines_join_the_task_trace():
+    tracer = Tracer()
+
+    @traced("probe")
+    async def probe():
+        return 1
+
+    async def job():
+        trace = tracer.start("job")
+        with tracer.activate(trace):
+            assert await probe() == 1
+        tracer.finish(trace)
+        return trace
+
+    assert [s.name for s in asyncio.run(job()).spans] == ["probe"]
+
+
+def test_ring_buffer_and_lookup():
+    tracer = Tracer(capacity=2)
+    first, second, third = (record(tracer, str(i)) for i in range(3))
+    assert list(tracer.traces) == [second, third]
+    assert tracer.get(first.id) is None
+    assert tracer.get(third.id) is third
+    assert tracer.latest() is third
+
+    running = tracer.start("running")
+    assert tracer.get(running.id) is running
+
+
+def test_finish_is_idempotent():
+    tracer = Tracer()
+    trace = record(tracer)
+    tracer.finish(trace)
+    assert len(tracer.traces) == 1
+
+
+def test_slowest_by_total_and_by_stage():
+    tracer = Tracer()
+    fast, slow = record(tracer, "fast"), record(tracer, "slow")
+    fast.duration, slow.duration = 1.0, 5.0
+    fast.spans[-1].duration, slow.spans[-1].duration = 3.0, 0.5
+    assert tracer.slowest(1) == [slow]
+    assert tracer.slowest(stage="upload") == [fast, slow]
+    assert tracer.slowest(stage="relay") == []
+
+
+def test_export_writes_one_json_line_per_trace(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(export_path=str(path))
+    record(tracer, "a")
+    record(tracer, "b")
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["label"] for line in lines] == ["a", "b"]
+    assert lines[0]["spans"][0]["name"] == "download"
+
+
+def test_waterfall_has_a_row_per_span():
+    trace = record(Tracer())
+    rows = trace.waterfall().splitlines()
+    assert len(rows) == 3
+    assert rows[1].startswith("  get_media_info")